@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from config import Config
+from metrics import percentile
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class AgentSessionPoolClosedError(RuntimeError):
+    pass
+
+
+class AgentSession:
+    def __init__(self, agents):
+        self.agents = agents
+        self.requests_served = 0
+
+
+class AgentSessionPool:
+    # Pool of reusable agent sessions (for autogen, a UserProxyAgent/AssistantAgent pair). Every request leases its
+    # own session, so concurrent requests never share chat history, and the pool size caps how many agent chats run
+    # at once. Released sessions are reset and reused; a session is rebuilt after max_requests or if reset fails.
+    def __init__(self, create, reset, size=Config.AGENT_POOL_SIZE, max_requests=Config.AGENT_MAX_REQUESTS_PER_SESSION,
+                 lease_timeout=Config.AGENT_LEASE_TIMEOUT_SECONDS):
+        self._create = create
+        self._reset = reset
+        self.size = size
+        self.max_requests = max_requests
+        self.lease_timeout = lease_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._live = 0
+        self._closed = False
+        self._lease_waits = deque(maxlen=1000)
+        self._turns = deque(maxlen=1000)
+        self.counters = {"created": 0, "reused": 0, "recycled": 0, "discarded": 0, "leases": 0}
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise AgentSessionPoolClosedError("Agent session pool has been shut down")
+                if self._idle:
+                    self.counters["reused"] += 1
+                    return self._idle.pop()
+                if self._live < self.size:
+                    self._live += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No agent session available within {timeout} seconds")
+                self._available.wait(remaining)
+
+        try:
+            session = AgentSession(self._create())
+        except Exception:
+            with self._lock:
+                self._live -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self.counters["created"] += 1
+        return session
+
+    def _drop(self, session, counter):
+        with self._lock:
+            self.counters[counter] += 1
+            self._live -= 1
+            self._available.notify()
+
+    def _release(self, session):
+        session.requests_served += 1
+        if self._closed:
+            self._drop(session, "discarded")
+            return
+        if session.requests_served >= self.max_requests:
+            self._drop(session, "recycled")
+            return
+        try:
+            self._reset(session.agents)
+        except Exception as e:
+            logging.warning(f"Failed to reset agent session, discarding it: {str(e)}")
+            self._drop(session, "discarded")
+            return
+        with self._lock:
+            self._idle.append(session)
+            self._available.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        start = time.perf_counter()
+        session = self._acquire(self.lease_timeout if timeout is None else timeout)
+        with self._lock:
+            self._lease_waits.append(time.perf_counter() - start)
+            self.counters["leases"] += 1
+        try:
+            yield session.agents
+        finally:
+            self._release(session)
+
+    def record_turns(self, turns):
+        with self._lock:
+            self._turns.append(turns)
+
+    def stats(self):
+        with self._lock:
+            waits = [wait * 1000 for wait in self._lease_waits]
+            turns = list(self._turns)
+            return {
+                **self.counters,
+                "live": self._live,
+                "idle": len(self._idle),
+                "lease_wait_ms": {"count": len(waits), "p50": percentile(waits, 50) or 0.0,
+                                  "p95": percentile(waits, 95) or 0.0, "max": max(waits, default=0.0)},
+                "turns_per_request": {"count": len(turns), "mean": sum(turns) / len(turns) if turns else 0.0,
+                                      "max": max(turns, default=0)},
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            self._live -= len(self._idle)
+            self._idle = []
+            self._available.notify_all()
+        logging.info(f"Agent session pool shut down. Stats: {self.stats()}")
@@ -1,111 +1,129 @@
-import autogen
-from autogen import UserProxyAgent, AssistantAgent, ConversableAgent
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-class AutogenCodeHandler:
-    def __init__(self):
-        self.config_list = [
-            {
-                "model": "llama-3.1-70b-versatile",
-                "api_key": os.getenv("GROQ_API_KEY"),
-                "base_url": "https://api.groq.com/openai/v1",
-            }
-        ]
-
-        self.llm_config = {
-            "config_list": self.config_list,
-            "temperature": 0,
-            "seed": 42,
-        }
-
-        self.user_proxy = UserProxyAgent(
-            name="UserProxy",
-            system_message="A human user who can execute Python code and provide feedback.",
-            code_execution_config={"work_dir": "generated_ideas"},
-            human_input_mode="NEVER",
-            max_consecutive_auto_reply=1,
-        )
-
-        self.assistant = AssistantAgent(
-            name="PythonExpert",
-            system_message="You are a Python expert. Analyze, debug, and improve Python code.",
-            llm_config=self.llm_config,
-        )
-
-    def _terminate_chat(self, sender: ConversableAgent, recipient: ConversableAgent):
-        return True
-
-    def _get_last_message(self, chat_history):
-        if not chat_history:
-            return "No response received from the assistant."
-        return chat_history[-1]['content']
-
-    def analyze_and_improve_code(self, code):
-        self.user_proxy.initiate_chat(
-            self.assistant,
-            message=f"Analyze and improve the following Python code:\n\n{code}\n\nProvide suggestions for improvements, bug fixes, and optimizations.",
-            termination_msg="TERMINATE",
-            max_turns=3
-        )
-        
-        chat_history = self.user_proxy.chat_messages[self.assistant.name]
-        return self._get_last_message(chat_history)
-
-    def test_code(self, code):
-        self.user_proxy.initiate_chat(
-            self.assistant,
-            message=f"Test the following Python code and provide a summary of the results:\n\n{code}",
-            termination_msg="TERMINATE",
-            max_turns=3
-        )
-        
-        chat_history = self.user_proxy.chat_messages[self.assistant.name]
-        return self._get_last_message(chat_history)
-
-    def debug_code(self, code, error_message):
-        self.user_proxy.initiate_chat(
-            self.assistant,
-            message=f"Debug the following Python code that produced this error:\n\nCode:\n{code}\n\nError:\n{error_message}\n\nProvide a fix for the error.",
-            termination_msg="TERMINATE",
-            max_turns=3
-        )
-        
-        chat_history = self.user_proxy.chat_messages[self.assistant.name]
-        return self._get_last_message(chat_history)
-
-# Example usage
-if __name__ == "__main__":
-    handler = AutogenCodeHandler()
-    
-    sample_code = """
-def fibonacci(n):
-    if n <= 1:
-        return n
-    else:
-        return fibonacci(n-1) + fibonacci(n-2)
-
-print(fibonacci(10))
-    """
-    
-    analysis = handler.analyze_and_improve_code(sample_code)
-    print("Code Analysis:")
-    print(analysis)
-    
-    test_results = handler.test_code(sample_code)
-    print("\nTest Results:")
-    print(test_results)
-    
-    error_code = """
-def divide_numbers(a, b):
-    return a / b
-
-result = divide_numbers(10, 0)
-print(result)
-    """
-    
-    debug_result = handler.debug_code(error_code, "ZeroDivisionError: division by zero")
-    print("\nDebug Results:")
-    print(debug_result)
\ No newline at end of file
+import autogen
+from autogen import UserProxyAgent, AssistantAgent, ConversableAgent
+import os
+from dotenv import load_dotenv
+from config import Config
+from agent_session_pool import AgentSessionPool
+from code_sandbox import describe_run, get_code_sandbox
+
+load_dotenv()
+
+class AutogenCodeHandler:
+    def __init__(self, pool_size=Config.AGENT_POOL_SIZE):
+        self.config_list = [
+            {
+                "model": "llama-3.1-70b-versatile",
+                "api_key": os.getenv("GROQ_API_KEY"),
+                "base_url": Config.API_URL,
+            }
+        ]
+
+        self.llm_config = {
+            "config_list": self.config_list,
+            "temperature": 0,
+            "seed": 42,
+            # Reuse autogen's own disk cache for completions whenever the project LLM cache is enabled.
+            "cache_seed": 42 if Config.LLM_CACHE_MODE != "off" else None,
+        }
+
+        # Each request leases its own agent pair, so concurrent tool calls do not share history.
+        self.sessions = AgentSessionPool(self._create_agents, self._reset_agents, size=pool_size)
+        self.sandbox = get_code_sandbox()
+
+    def _create_agents(self):
+        user_proxy = UserProxyAgent(
+            name="UserProxy",
+            system_message="A human user who can execute Python code and provide feedback.",
+            code_execution_config={"work_dir": "generated_ideas"},
+            human_input_mode="NEVER",
+            max_consecutive_auto_reply=1,
+        )
+
+        assistant = AssistantAgent(
+            name="PythonExpert",
+            system_message="You are a Python expert. Analyze, debug, and improve Python code.",
+            llm_config=self.llm_config,
+        )
+        return user_proxy, assistant
+
+    def _reset_agents(self, agents):
+        # Clears chat history and auto-reply counters so the next lease starts from a clean pair.
+        for agent in agents:
+            agent.reset()
+
+    def _terminate_chat(self, sender: ConversableAgent, recipient: ConversableAgent):
+        return True
+
+    def _get_last_message(self, chat_history):
+        if not chat_history:
+            return "No response received from the assistant."
+        return chat_history[-1]['content']
+
+    def _chat(self, message):
+        with self.sessions.lease() as (user_proxy, assistant):
+            result = user_proxy.initiate_chat(
+                assistant,
+                message=message,
+                termination_msg="TERMINATE",
+                max_turns=3,
+                clear_history=True,
+            )
+            self.sessions.record_turns(len(result.chat_history))
+            return self._get_last_message(result.chat_history)
+
+    def analyze_and_improve_code(self, code):
+        return self._chat(f"Analyze and improve the following Python code:\n\n{code}\n\nProvide suggestions for improvements, bug fixes, and optimizations.")
+
+    def test_code(self, code):
+        # Runs the code in the sandbox; only a failing run is escalated to the assistant for debugging.
+        return self.report(code, self.sandbox.run(code))
+
+    def test_many(self, codes):
+        # Runs all snippets in parallel in the sandbox pool, then debugs the failures one by one.
+        return [self.report(code, result) for code, result in zip(codes, self.sandbox.run_many(codes))]
+
+    def report(self, code, result):
+        # describe_run() of a finished sandbox run, with the assistant's debugging added when it failed.
+        report = describe_run(result)
+        if result["ok"]:
+            return report
+        return f"{report}\n\nDebugging:\n{self.debug_code(code, result['stderr'] or report)}"
+
+    def debug_code(self, code, error_message):
+        return self._chat(f"Debug the following Python code that produced this error:\n\nCode:\n{code}\n\nError:\n{error_message}\n\nProvide a fix for the error.")
+
+# Example usage
+if __name__ == "__main__":
+    handler = AutogenCodeHandler()
+    
+    sample_code = """
+def fibonacci(n):
+    if n <= 1:
+        return n
+    else:
+        return fibonacci(n-1) + fibonacci(n-2)
+
+print(fibonacci(10))
+    """
+    
+    analysis = handler.analyze_and_improve_code(sample_code)
+    print("Code Analysis:")
+    print(analysis)
+    
+    test_results = handler.test_code(sample_code)
+    print("\nTest Results:")
+    print(test_results)
+    
+    error_code = """
+def divide_numbers(a, b):
+    return a / b
+
+result = divide_numbers(10, 0)
+print(result)
+    """
+    
+    debug_result = handler.debug_code(error_code, "ZeroDivisionError: division by zero")
+    print("\nDebug Results:")
+    print(debug_result)
+
+    print(f"\nAgent session stats: {handler.sessions.stats()}")
\ No newline at end of file
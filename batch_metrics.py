@@ -0,0 +1,166 @@
+import math
+import sys
+import numpy as np
+
+ROUGE_TYPES = ("rouge1", "rouge2", "rougeL")
+BLEU_MAX_ORDER = 4
+# nltk's unsmoothed BLEU substitutes this for zero higher-order precisions instead of returning 0 outright.
+LOG_FLOAT_MIN = math.log(sys.float_info.min)
+
+
+class _CachedStemmer:
+    def __init__(self):
+        from nltk.stem import porter
+        self._stemmer = porter.PorterStemmer()
+        self._cache = {}
+
+    def stem(self, word):
+        stemmed = self._cache.get(word)
+        if stemmed is None:
+            stemmed = self._cache[word] = self._stemmer.stem(word)
+        return stemmed
+
+
+def default_bleu_tokenize(texts):
+    import nltk
+    return [nltk.word_tokenize(text) for text in texts]
+
+
+def lcs_length(a, b):
+    # Bit-parallel LCS (Hyyro): one big-int update per token of b instead of an |a| x |b| table.
+    if len(a) == 0 or len(b) == 0:
+        return 0
+    masks = {}
+    for i, token in enumerate(a.tolist()):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    full = (1 << len(a)) - 1
+    v = full
+    for token in b.tolist():
+        u = v & masks.get(token, 0)
+        v = ((v + u) | (v - u)) & full
+    return len(a) - bin(v).count("1")
+
+
+class BatchMetrics:
+    def __init__(self, bleu_tokenize=default_bleu_tokenize, use_stemmer=True):
+        self.bleu_tokenize = bleu_tokenize
+        self.use_stemmer = use_stemmer
+        self._stemmer = None
+        self._vocab = {}
+        self._bleu_cache = {}
+        self._rouge_cache = {}
+
+    def _encode(self, tokens):
+        vocab = self._vocab
+        return np.fromiter((vocab.setdefault(token, len(vocab)) for token in tokens), dtype=np.int64, count=len(tokens))
+
+    def bleu_tokens(self, texts):
+        # Tokenize each distinct text once; references repeat across runs and are cached as id arrays.
+        missing = list(dict.fromkeys(text for text in texts if text not in self._bleu_cache))
+        if missing:
+            for text, tokens in zip(missing, self.bleu_tokenize(missing)):
+                self._bleu_cache[text] = self._encode(tokens)
+        return [self._bleu_cache[text] for text in texts]
+
+    def rouge_tokens(self, texts):
+        from rouge_score import tokenize
+
+        if self.use_stemmer and self._stemmer is None:
+            self._stemmer = _CachedStemmer()
+        result = []
+        for text in texts:
+            ids = self._rouge_cache.get(text)
+            if ids is None:
+                ids = self._rouge_cache[text] = self._encode(tokenize.tokenize(text, self._stemmer))
+            result.append(ids)
+        return result
+
+    @staticmethod
+    def _flatten(sequences):
+        lengths = np.array([len(ids) for ids in sequences], dtype=np.int64)
+        flat = np.concatenate(sequences) if len(sequences) and lengths.sum() else np.empty(0, dtype=np.int64)
+        pairs = np.repeat(np.arange(len(sequences), dtype=np.int64), lengths)
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(sequences) else lengths
+        positions = np.arange(len(flat), dtype=np.int64) - np.repeat(offsets, lengths)
+        return flat, pairs, positions, lengths
+
+    @staticmethod
+    def _ngram_rows(flattened, n):
+        flat, pairs, positions, lengths = flattened
+        starts = np.nonzero(positions <= lengths[pairs] - n)[0]
+        return np.column_stack([pairs[starts]] + [flat[starts + k] for k in range(n)])
+
+    @classmethod
+    def _ngram_matches(cls, references, candidates, n):
+        # Counts clipped n-gram matches for every pair at once: each n-gram row is prefixed with its pair
+        # index, so one np.unique over the whole batch yields per-pair counts for both sides.
+        size = len(references[3])
+        ref_counts = np.maximum(references[3] - n + 1, 0)
+        cand_counts = np.maximum(candidates[3] - n + 1, 0)
+        ref_rows, cand_rows = cls._ngram_rows(references, n), cls._ngram_rows(candidates, n)
+        if len(ref_rows) == 0 or len(cand_rows) == 0:
+            return np.zeros(size), ref_counts, cand_counts
+
+        combined = np.ascontiguousarray(np.concatenate([ref_rows, cand_rows]))
+        keys = combined.view(np.dtype((np.void, combined.dtype.itemsize * combined.shape[1]))).ravel()
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.ravel()
+        ref_hist = np.bincount(inverse[:len(ref_rows)], minlength=len(unique_keys))
+        cand_hist = np.bincount(inverse[len(ref_rows):], minlength=len(unique_keys))
+        pair_of_key = unique_keys.view(np.int64).reshape(len(unique_keys), n + 1)[:, 0]
+        matches = np.bincount(pair_of_key, weights=np.minimum(ref_hist, cand_hist), minlength=size)
+        return matches, ref_counts, cand_counts
+
+    @staticmethod
+    def _fmeasure(precision, recall):
+        total = precision + recall
+        return np.divide(2 * precision * recall, total, out=np.zeros_like(total), where=total > 0)
+
+    def bleu(self, references, candidates):
+        references = self._flatten(self.bleu_tokens(references))
+        candidates = self._flatten(self.bleu_tokens(candidates))
+        size = len(references[3])
+        log_precisions = np.zeros((size, BLEU_MAX_ORDER))
+        unigram_matches = np.zeros(size)
+        for n in range(1, BLEU_MAX_ORDER + 1):
+            matches, _, cand_counts = self._ngram_matches(references, candidates, n)
+            if n == 1:
+                unigram_matches = matches
+            precision = matches / np.maximum(cand_counts, 1)
+            log_precisions[:, n - 1] = np.where(matches > 0, np.log(np.where(matches > 0, precision, 1.0)), LOG_FLOAT_MIN)
+
+        hyp_len = candidates[3].astype(np.float64)
+        ref_len = references[3].astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            brevity = np.where(hyp_len > ref_len, 1.0, np.where(hyp_len == 0, 0.0, np.exp(1 - ref_len / hyp_len)))
+        scores = brevity * np.exp(log_precisions.mean(axis=1))
+        return np.where(unigram_matches > 0, scores, 0.0)
+
+    def rouge(self, references, candidates):
+        references = self.rouge_tokens(references)
+        candidates = self.rouge_tokens(candidates)
+        flat_references, flat_candidates = self._flatten(references), self._flatten(candidates)
+        scores = {}
+        for n in (1, 2):
+            matches, ref_counts, cand_counts = self._ngram_matches(flat_references, flat_candidates, n)
+            precision = matches / np.maximum(cand_counts, 1)
+            recall = matches / np.maximum(ref_counts, 1)
+            scores[f"rouge{n}"] = self._fmeasure(precision, recall)
+
+        lcs = np.array([lcs_length(ref, cand) for ref, cand in zip(references, candidates)], dtype=np.float64)
+        ref_len = np.array([len(ids) for ids in references], dtype=np.float64)
+        cand_len = np.array([len(ids) for ids in candidates], dtype=np.float64)
+        precision = np.divide(lcs, cand_len, out=np.zeros_like(lcs), where=cand_len > 0)
+        recall = np.divide(lcs, ref_len, out=np.zeros_like(lcs), where=ref_len > 0)
+        scores["rougeL"] = self._fmeasure(precision, recall)
+        return scores
+
+    def score(self, references, candidates, bleu=True):
+        scores = self.rouge(references, candidates)
+        if bleu:
+            scores["bleu"] = self.bleu(references, candidates)
+        return scores
+
+    @staticmethod
+    def averages(scores):
+        return {key: float(np.mean(values)) if len(values) else 0.0 for key, values in scores.items()}
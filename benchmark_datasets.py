@@ -0,0 +1,151 @@
+import argparse
+import json
+import logging
+import mmap
+import os
+import re
+from itertools import islice
+import numpy as np
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+LOCAL_FORMATS = ("jsonl", "json", "arrow")
+# Rows of a JSONL file: every line with something besides whitespace.
+ROW_PATTERN = re.compile(rb"^[ \t\r\f\v]*\S.*$", re.MULTILINE)
+
+
+def local_dataset_path(name, config=None, split="validation", data_dir=None):
+    # <data_dir>/<name>[/<config>]/<split>.jsonl|.json|.arrow
+    directory = os.path.join(data_dir or Config.BENCHMARK_DATA_DIR, name.replace("/", "__"), *([config] if config else []))
+    for extension in LOCAL_FORMATS:
+        path = os.path.join(directory, f"{split}.{extension}")
+        if os.path.exists(path):
+            return path
+    return os.path.join(directory, f"{split}.jsonl")
+
+
+class LocalDataset:
+    """Lazily iterates a local JSONL, JSON or Arrow split, yielding one example dict at a time.
+
+    Without a seed rows are read in file order and reading stops after num_samples. With a seed the rows are
+    visited in a deterministic random order. shard=(index, count) keeps every count-th row of the selected
+    samples, so the shards of one run together cover exactly the unsharded run. Blank lines are not rows. A .json
+    file holds one array of examples and is loaded whole, so large splits are better exported as JSONL.
+    """
+
+    def __init__(self, path, num_samples=None, seed=None, shard=None):
+        self.path = path
+        self.num_samples = num_samples
+        self.seed = seed
+        self.shard_index, self.shard_count = shard or (0, 1)
+        if not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"Invalid shard {self.shard_index}/{self.shard_count}")
+
+    def __iter__(self):
+        if self.path.endswith(".arrow"):
+            return self._iter_arrow()
+        if self.path.endswith(".json"):
+            return self._iter_json()
+        if self.seed is None:
+            return self._iter_jsonl_sequential()
+        return self._iter_jsonl_indexed()
+
+    def _select(self, total):
+        order = np.random.default_rng(self.seed).permutation(total) if self.seed is not None else np.arange(total)
+        if self.num_samples is not None:
+            order = order[:self.num_samples]
+        return order[self.shard_index::self.shard_count]
+
+    def _iter_jsonl_sequential(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            rows = (line for line in f if line.strip())
+            for i, line in enumerate(islice(rows, self.num_samples)):
+                if i % self.shard_count == self.shard_index:
+                    yield json.loads(line)
+
+    def _iter_jsonl_indexed(self):
+        # Only line offsets are kept in memory; each selected row is parsed straight from the mapped file.
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                starts, ends = self._row_spans(mm)
+                for i in self._select(len(starts)):
+                    yield json.loads(mm[starts[i]:ends[i]])
+
+    @staticmethod
+    def _row_spans(mm):
+        # Blank lines are skipped here, so row numbers (and what a seed or shard selects) ignore them.
+        spans = np.array([match.span() for match in ROW_PATTERN.finditer(mm)], dtype=np.int64).reshape(-1, 2)
+        return spans[:, 0], spans[:, 1]
+
+    def _iter_json(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        if not isinstance(rows, list):
+            raise ValueError(f"{self.path} must contain a JSON array of examples")
+        for i in self._select(len(rows)):
+            yield rows[int(i)]
+
+    def _iter_arrow(self):
+        import pyarrow as pa
+
+        # Reading a memory-mapped IPC file is zero-copy; only the rows that are yielded get converted.
+        source = pa.memory_map(self.path, "r")
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()  # datasets' cache files use the streaming format
+        for i in self._select(table.num_rows):
+            yield table.slice(int(i), 1).to_pylist()[0]
+
+
+def _stream_from_hub(name, config, split, num_samples, seed, shard):
+    from datasets import load_dataset
+
+    shard_index, shard_count = shard or (0, 1)
+    dataset = load_dataset(name, config, split=split, streaming=True)
+    if seed is not None:
+        dataset = dataset.shuffle(seed=seed, buffer_size=Config.BENCHMARK_SHUFFLE_BUFFER)
+    for i, example in enumerate(islice(dataset, num_samples)):
+        if i % shard_count == shard_index:
+            yield example
+
+
+def load_benchmark_dataset(name, config=None, split="validation", num_samples=None, seed=None, shard=None):
+    path = local_dataset_path(name, config, split)
+    if os.path.exists(path):
+        logging.info(f"Reading {name} {split} from {path}")
+        return LocalDataset(path, num_samples=num_samples, seed=seed, shard=shard)
+    if Config.BENCHMARK_OFFLINE:
+        raise FileNotFoundError(f"No local copy of {name} {split} at {path}; export it with benchmark_datasets.py first")
+    logging.info(f"No local copy of {name} {split}, streaming it from the Hugging Face hub")
+    return _stream_from_hub(name, config, split, num_samples, seed, shard)
+
+
+def export_dataset(name, config=None, split="validation", limit=None):
+    # Streams a hub split into a local JSONL file so later benchmark runs need no network.
+    from datasets import load_dataset
+
+    path = local_dataset_path(name, config, split)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    count = 0
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for example in islice(load_dataset(name, config, split=split, streaming=True), limit):
+            f.write(json.dumps(example, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(path + ".tmp", path)
+    logging.info(f"Exported {count} {name} {split} examples to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a Hugging Face split to a local JSONL file for offline benchmarks.")
+    parser.add_argument("name")
+    parser.add_argument("split")
+    parser.add_argument("--config", default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+    export_dataset(args.name, args.config, args.split, args.limit)
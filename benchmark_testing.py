@@ -1,187 +1,266 @@
-import numpy as np
-from datasets import load_dataset
-from transformers import AutoTokenizer
-from nltk.translate.bleu_score import sentence_bleu
-from rouge_score import rouge_scorer
-from sklearn.metrics import accuracy_score
-from chat_flow import ChatFlow
-import nltk
-import logging
-import matplotlib.pyplot as plt
-from datetime import datetime
-
-# Download necessary NLTK data
-nltk.download('punkt')
-nltk.download('punkt_tab')
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-class BenchmarkTesting:
-    def __init__(self):
-        self.chat_flow = ChatFlow()
-        self.tokenizer = AutoTokenizer.from_pretrained("gpt2")  # Using GPT-2 tokenizer for consistency
-        self.rouge_scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
-
-    def preprocess_text(self, text):
-        return ' '.join(self.tokenizer.tokenize(text))
-
-    def calculate_bleu(self, reference, candidate):
-        try:
-            reference_tokens = nltk.word_tokenize(self.preprocess_text(reference))
-            candidate_tokens = nltk.word_tokenize(self.preprocess_text(candidate))
-            return sentence_bleu([reference_tokens], candidate_tokens)
-        except LookupError as e:
-            logging.error(f"NLTK resource error: {str(e)}")
-            return 0
-
-    def calculate_rouge(self, reference, candidate):
-        scores = self.rouge_scorer.score(reference, candidate)
-        return {key: value.fmeasure for key, value in scores.items()}
-
-    def run_qa_benchmark(self, num_samples=100):
-        dataset = load_dataset("squad", split="validation[:100]")
-        bleu_scores = []
-        rouge_scores = []
-
-        for i, example in enumerate(dataset):
-            if i >= num_samples:
-                break
-
-            context = example['context']
-            question = example['question']
-            reference_answer = example['answers']['text'][0]
-
-            prompt = f"Context: {context}\n\nQuestion: {question}\n\nAnswer:"
-            try:
-                model_answer = self.chat_flow.chat(prompt)
-                bleu_score = self.calculate_bleu(reference_answer, model_answer)
-                rouge_score = self.calculate_rouge(reference_answer, model_answer)
-
-                bleu_scores.append(bleu_score)
-                rouge_scores.append(rouge_score)
-
-                logging.info(f"Processed QA sample {i+1}/{num_samples}")
-            except Exception as e:
-                logging.error(f"Error processing QA sample {i+1}: {str(e)}")
-
-        if bleu_scores and rouge_scores:
-            avg_bleu = np.mean(bleu_scores)
-            avg_rouge = {key: np.mean([score[key] for score in rouge_scores]) for key in rouge_scores[0]}
-            return {"bleu": avg_bleu, "rouge": avg_rouge}
-        else:
-            logging.warning("No valid scores were calculated for QA benchmark")
-            return {"bleu": 0, "rouge": {}}
-
-    def run_summarization_benchmark(self, num_samples=100):
-        dataset = load_dataset("cnn_dailymail", "3.0.0", split="validation[:100]")
-        rouge_scores = []
-
-        for i, example in enumerate(dataset):
-            if i >= num_samples:
-                break
-
-            article = example['article']
-            reference_summary = example['highlights']
-
-            prompt = f"Summarize the following article:\n\n{article}\n\nSummary:"
-            model_summary = self.chat_flow.chat(prompt)
-
-            rouge_score = self.calculate_rouge(reference_summary, model_summary)
-            rouge_scores.append(rouge_score)
-
-            logging.info(f"Processed summarization sample {i+1}/{num_samples}")
-
-        avg_rouge = {key: np.mean([score[key] for score in rouge_scores]) for key in rouge_scores[0]}
-        return avg_rouge
-
-    def run_sentiment_analysis_benchmark(self, num_samples=100):
-        dataset = load_dataset("imdb", split="test[:100]")
-        predictions = []
-        true_labels = []
-
-        for i, example in enumerate(dataset):
-            if i >= num_samples:
-                break
-
-            text = example['text']
-            true_label = example['label']
-
-            prompt = f"Classify the sentiment of the following movie review as positive or negative:\n\n{text}\n\nSentiment:"
-            model_sentiment = self.chat_flow.chat(prompt).strip().lower()
-
-            predictions.append(1 if model_sentiment == "positive" else 0)
-            true_labels.append(true_label)
-
-            logging.info(f"Processed sentiment analysis sample {i+1}/{num_samples}")
-
-        accuracy = accuracy_score(true_labels, predictions)
-        return accuracy
-
-    def run_all_benchmarks(self, num_samples=100):
-        results = {}
-        
-        logging.info("Starting QA benchmark")
-        results["qa"] = self.run_qa_benchmark(num_samples)
-        
-        logging.info("Starting summarization benchmark")
-        results["summarization"] = self.run_summarization_benchmark(num_samples)
-        
-        logging.info("Starting sentiment analysis benchmark")
-        results["sentiment_analysis"] = self.run_sentiment_analysis_benchmark(num_samples)
-
-        return results
-
-    def plot_results(self, results):
-        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 15))
-        fig.suptitle('Benchmark Results', fontsize=16)
-
-        # QA Benchmark
-        qa_scores = [results['qa']['bleu']] + list(results['qa']['rouge'].values())
-        qa_labels = ['BLEU'] + list(results['qa']['rouge'].keys())
-        ax1.bar(qa_labels, qa_scores)
-        ax1.set_title('Question Answering')
-        ax1.set_ylim(0, 1)
-        for i, v in enumerate(qa_scores):
-            ax1.text(i, v, f'{v:.2f}', ha='center', va='bottom')
-
-        # Summarization Benchmark
-        summarization_scores = list(results['summarization'].values())
-        summarization_labels = list(results['summarization'].keys())
-        ax2.bar(summarization_labels, summarization_scores)
-        ax2.set_title('Summarization')
-        ax2.set_ylim(0, 1)
-        for i, v in enumerate(summarization_scores):
-            ax2.text(i, v, f'{v:.2f}', ha='center', va='bottom')
-
-        # Sentiment Analysis Benchmark
-        ax3.bar(['Accuracy'], [results['sentiment_analysis']])
-        ax3.set_title('Sentiment Analysis')
-        ax3.set_ylim(0, 1)
-        ax3.text(0, results['sentiment_analysis'], f'{results["sentiment_analysis"]:.2f}', ha='center', va='bottom')
-
-        plt.tight_layout()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f'benchmark_results_{timestamp}.png'
-        plt.savefig(filename)
-        logging.info(f"Benchmark results saved as {filename}")
-        plt.close()
-
-if __name__ == "__main__":
-    benchmark = BenchmarkTesting()
-    results = benchmark.run_all_benchmarks(num_samples=10)  # Adjust the number of samples as needed
-    
-    print("\nBenchmark Results:")
-    if "qa" in results:
-        print("Question Answering:")
-        print(f"BLEU Score: {results['qa'].get('bleu', 0):.4f}")
-        print(f"ROUGE Scores: {results['qa'].get('rouge', {})}")
-    
-    if "summarization" in results:
-        print("\nSummarization:")
-        print(f"ROUGE Scores: {results['summarization']}")
-    
-    if "sentiment_analysis" in results:
-        print("\nSentiment Analysis:")
-        print(f"Accuracy: {results['sentiment_analysis']:.4f}")
-    
+import numpy as np
+from chat_flow import ChatFlow
+from llm_cache import llm_response_cache
+from reflection_policy import reflection_stats
+from grading_engine import grading_engine
+from batch_metrics import BatchMetrics
+from benchmark_datasets import load_benchmark_dataset
+from results_journal import ResultsJournal, journal_path, sample_id
+import argparse
+import logging
+import time
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+NLTK_RESOURCES = {'punkt': 'tokenizers/punkt', 'punkt_tab': 'tokenizers/punkt_tab'}
+_nltk_ready = False
+
+def ensure_nltk_data():
+    # Only download NLTK data that is missing, and only the first time BLEU is computed.
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    import nltk
+    for resource, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(resource)
+    _nltk_ready = True
+
+class BenchmarkTesting:
+    def __init__(self, llm_cache_mode=None, seed=None, shard=None, run_id=None):
+        # "record" makes reruns on the same samples free, "replay" runs fully offline from recorded responses.
+        if llm_cache_mode is not None:
+            llm_response_cache.mode = llm_cache_mode
+        # seed shuffles the samples deterministically, shard=(index, count) runs one slice of them.
+        self.seed = seed
+        self.shard = shard
+        # Every sample result is journaled; reusing a run_id resumes that run and skips finished samples.
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.journal = ResultsJournal(journal_path(self.run_id))
+        self.chat_flow = ChatFlow()
+        self._tokenizer = None
+        self.metrics = BatchMetrics(bleu_tokenize=self.bleu_tokenize)
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained("gpt2")  # Using GPT-2 tokenizer for consistency
+        return self._tokenizer
+
+    def preprocess_text(self, text):
+        return ' '.join(self.tokenizer.tokenize(text))
+
+    def bleu_tokenize(self, texts):
+        # Same tokens as preprocess_text + word_tokenize, but one fast-tokenizer call for the whole batch.
+        import nltk
+
+        ensure_nltk_data()
+        batch = self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [nltk.word_tokenize(' '.join(self.tokenizer.convert_ids_to_tokens(ids))) for ids in batch]
+
+    def calculate_bleu(self, reference, candidate):
+        try:
+            return float(self.metrics.bleu([reference], [candidate])[0])
+        except LookupError as e:
+            logging.error(f"NLTK resource error: {str(e)}")
+            return 0
+
+    def calculate_rouge(self, reference, candidate):
+        scores = self.metrics.rouge([reference], [candidate])
+        return {key: float(values[0]) for key, values in scores.items()}
+
+    def score_pairs(self, references, candidates, bleu=True):
+        # Scores a whole benchmark run at once; returns the averaged metrics.
+        try:
+            return BatchMetrics.averages(self.metrics.score(references, candidates, bleu=bleu))
+        except LookupError as e:
+            logging.error(f"NLTK resource error: {str(e)}")
+            averages = BatchMetrics.averages(self.metrics.rouge(references, candidates))
+            averages["bleu"] = 0
+            return averages
+
+    def load_samples(self, name, config=None, split="validation", num_samples=100):
+        return load_benchmark_dataset(name, config, split, num_samples=num_samples, seed=self.seed, shard=self.shard)
+
+    def grade_answers(self, prompts, answers):
+        # One batched, tool-free grading pass for the whole benchmark instead of one call per answer.
+        grades = grading_engine.grade_batch(list(zip(prompts, answers)))
+        scores = [grade["score"] for grade in grades if grade["score"] is not None]
+        return float(np.mean(scores)) if scores else 0.0
+
+    def run_sample(self, benchmark, sample_key, sample):
+        record = dict(sample, benchmark=benchmark, sample_id=sample_key)
+        start = time.perf_counter()
+        try:
+            record.update(status="ok", output=self.chat_flow.chat(sample["prompt"]))
+        except Exception as e:
+            logging.error(f"Error processing {benchmark} sample {sample_key[:12]}: {str(e)}")
+            record.update(status="error", error=str(e))
+        record["seconds"] = time.perf_counter() - start
+        self.journal.append(record)
+        return record
+
+    def run_samples(self, benchmark, samples, num_samples):
+        # Returns the successful records of the selected samples, reusing any the journal already holds.
+        records = []
+        resumed = 0
+        for i, sample in enumerate(samples):
+            sample_key = sample_id(benchmark, sample["prompt"])
+            record = self.journal.get(benchmark, sample_key)
+            if record is not None and record["status"] == "ok":
+                resumed += 1
+            else:
+                record = self.run_sample(benchmark, sample_key, sample)
+                logging.info(f"Processed {benchmark} sample {i+1}/{num_samples}")
+            if record["status"] == "ok":
+                records.append(record)
+        if resumed:
+            logging.info(f"Took {resumed} finished {benchmark} samples from the journal")
+        return records
+
+    def qa_results(self, records, grade_with_llm=False):
+        if not records:
+            logging.warning("No valid scores were calculated for QA benchmark")
+            return {"bleu": 0, "rouge": {}}
+        averages = self.score_pairs([r["reference"] for r in records], [r["output"] for r in records])
+        avg_bleu = averages.pop("bleu")
+        results = {"bleu": avg_bleu, "rouge": averages}
+        if grade_with_llm:
+            results["llm_grade"] = self.grade_answers([r["prompt"] for r in records], [r["output"] for r in records])
+        return results
+
+    def summarization_results(self, records):
+        return self.score_pairs([r["reference"] for r in records], [r["output"] for r in records], bleu=False)
+
+    def sentiment_results(self, records):
+        from sklearn.metrics import accuracy_score
+
+        if not records:
+            return 0.0
+        predictions = [1 if r["output"].strip().lower() == "positive" else 0 for r in records]
+        return accuracy_score([r["label"] for r in records], predictions)
+
+    def aggregate(self, records):
+        # Same result shape as run_all_benchmarks, computed from journaled records (e.g. merged shard journals).
+        ok = [record for record in records if record.get("status") == "ok"]
+        return {
+            "qa": self.qa_results([r for r in ok if r["benchmark"] == "qa"]),
+            "summarization": self.summarization_results([r for r in ok if r["benchmark"] == "summarization"]),
+            "sentiment_analysis": self.sentiment_results([r for r in ok if r["benchmark"] == "sentiment_analysis"]),
+        }
+
+    def run_qa_benchmark(self, num_samples=100, grade_with_llm=False):
+        dataset = self.load_samples("squad", split="validation", num_samples=num_samples)
+        samples = (
+            {
+                "prompt": f"Context: {example['context']}\n\nQuestion: {example['question']}\n\nAnswer:",
+                "reference": example['answers']['text'][0],
+            }
+            for example in dataset
+        )
+        return self.qa_results(self.run_samples("qa", samples, num_samples), grade_with_llm)
+
+    def run_summarization_benchmark(self, num_samples=100):
+        dataset = self.load_samples("cnn_dailymail", "3.0.0", split="validation", num_samples=num_samples)
+        samples = (
+            {
+                "prompt": f"Summarize the following article:\n\n{example['article']}\n\nSummary:",
+                "reference": example['highlights'],
+            }
+            for example in dataset
+        )
+        return self.summarization_results(self.run_samples("summarization", samples, num_samples))
+
+    def run_sentiment_analysis_benchmark(self, num_samples=100):
+        dataset = self.load_samples("imdb", split="test", num_samples=num_samples)
+        samples = (
+            {
+                "prompt": f"Classify the sentiment of the following movie review as positive or negative:\n\n{example['text']}\n\nSentiment:",
+                "label": example['label'],
+            }
+            for example in dataset
+        )
+        return self.sentiment_results(self.run_samples("sentiment_analysis", samples, num_samples))
+
+    def run_all_benchmarks(self, num_samples=100):
+        results = {}
+        
+        logging.info("Starting QA benchmark")
+        results["qa"] = self.run_qa_benchmark(num_samples)
+        
+        logging.info("Starting summarization benchmark")
+        results["summarization"] = self.run_summarization_benchmark(num_samples)
+        
+        logging.info("Starting sentiment analysis benchmark")
+        results["sentiment_analysis"] = self.run_sentiment_analysis_benchmark(num_samples)
+
+        logging.info(f"LLM cache stats: {llm_response_cache.stats()}")
+        logging.info(f"Reflection stats: {reflection_stats.summary()}")
+        logging.info(f"Per-sample results journaled in {self.journal.path}")
+        return results
+
+    def plot_results(self, results):
+        import matplotlib.pyplot as plt
+
+        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 15))
+        fig.suptitle('Benchmark Results', fontsize=16)
+
+        # QA Benchmark
+        qa_scores = [results['qa']['bleu']] + list(results['qa']['rouge'].values())
+        qa_labels = ['BLEU'] + list(results['qa']['rouge'].keys())
+        ax1.bar(qa_labels, qa_scores)
+        ax1.set_title('Question Answering')
+        ax1.set_ylim(0, 1)
+        for i, v in enumerate(qa_scores):
+            ax1.text(i, v, f'{v:.2f}', ha='center', va='bottom')
+
+        # Summarization Benchmark
+        summarization_scores = list(results['summarization'].values())
+        summarization_labels = list(results['summarization'].keys())
+        ax2.bar(summarization_labels, summarization_scores)
+        ax2.set_title('Summarization')
+        ax2.set_ylim(0, 1)
+        for i, v in enumerate(summarization_scores):
+            ax2.text(i, v, f'{v:.2f}', ha='center', va='bottom')
+
+        # Sentiment Analysis Benchmark
+        ax3.bar(['Accuracy'], [results['sentiment_analysis']])
+        ax3.set_title('Sentiment Analysis')
+        ax3.set_ylim(0, 1)
+        ax3.text(0, results['sentiment_analysis'], f'{results["sentiment_analysis"]:.2f}', ha='center', va='bottom')
+
+        plt.tight_layout()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f'benchmark_results_{timestamp}.png'
+        plt.savefig(filename)
+        logging.info(f"Benchmark results saved as {filename}")
+        plt.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the QA, summarization and sentiment benchmarks.")
+    parser.add_argument("--num-samples", type=int, default=10)
+    parser.add_argument("--run-id", help="journal name; pass the id of an interrupted run to resume it")
+    args = parser.parse_args()
+
+    benchmark = BenchmarkTesting(llm_cache_mode="record", run_id=args.run_id)
+    results = benchmark.run_all_benchmarks(num_samples=args.num_samples)
+    
+    print("\nBenchmark Results:")
+    if "qa" in results:
+        print("Question Answering:")
+        print(f"BLEU Score: {results['qa'].get('bleu', 0):.4f}")
+        print(f"ROUGE Scores: {results['qa'].get('rouge', {})}")
+    
+    if "summarization" in results:
+        print("\nSummarization:")
+        print(f"ROUGE Scores: {results['summarization']}")
+    
+    if "sentiment_analysis" in results:
+        print("\nSentiment Analysis:")
+        print(f"Accuracy: {results['sentiment_analysis']:.4f}")
+    
     benchmark.plot_results(results)
\ No newline at end of file
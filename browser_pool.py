@@ -0,0 +1,235 @@
+import atexit
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class BrowserPoolClosedError(RuntimeError):
+    pass
+
+
+class PooledBrowser:
+    def __init__(self, driver, pool):
+        self.driver = driver
+        self.pages_loaded = 0
+        self.created_at = time.monotonic()
+        self._pool = pool
+
+    def load(self, url, wait_for=None, timeout=10):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        start = time.perf_counter()
+        try:
+            self.driver.get(url)
+            WebDriverWait(self.driver, timeout).until(
+                EC.presence_of_element_located(wait_for or (By.TAG_NAME, "body"))
+            )
+            return self.driver.page_source
+        finally:
+            self.pages_loaded += 1
+            self._pool._record_page_load(time.perf_counter() - start)
+
+
+class BrowserPool:
+    def __init__(self, size=Config.BROWSER_POOL_SIZE, max_pages_per_browser=Config.BROWSER_MAX_PAGES,
+                 warm=Config.BROWSER_POOL_WARM, lease_timeout=Config.BROWSER_LEASE_TIMEOUT_SECONDS):
+        self.size = size
+        self.max_pages_per_browser = max_pages_per_browser
+        self.warm = min(warm, size)
+        self.lease_timeout = lease_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._live = 0
+        self._closed = False
+        self._queue_waits = deque(maxlen=1000)
+        self._page_loads = deque(maxlen=1000)
+        self.counters = {"created": 0, "recycled": 0, "discarded": 0, "leases": 0}
+
+    def _create_driver(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        driver = webdriver.Chrome(options=chrome_options)
+        with self._lock:
+            self.counters["created"] += 1
+        return PooledBrowser(driver, self)
+
+    def start(self):
+        # Pre-launch browsers so the first tool calls do not pay Chrome startup.
+        for _ in range(self.warm):
+            with self._lock:
+                if self._live >= self.size:
+                    break
+                self._live += 1
+            try:
+                browser = self._create_driver()
+            except Exception as e:
+                with self._lock:
+                    self._live -= 1
+                logging.error(f"Failed to warm browser: {str(e)}")
+                break
+            with self._lock:
+                self._idle.append(browser)
+                self._available.notify()
+        return self
+
+    def _is_healthy(self, browser):
+        try:
+            browser.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, browser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logging.warning(f"Error quitting browser: {str(e)}")
+        with self._lock:
+            self._live -= 1
+            # A slot freed up: a waiter may now launch a replacement browser.
+            self._available.notify()
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                while True:
+                    if self._closed:
+                        raise BrowserPoolClosedError("Browser pool has been shut down")
+                    if self._idle:
+                        browser = self._idle.pop()
+                        break
+                    if self._live < self.size:
+                        self._live += 1
+                        browser = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No browser available within {timeout} seconds")
+                    self._available.wait(remaining)
+
+            if browser is None:
+                try:
+                    return self._create_driver()
+                except Exception:
+                    with self._lock:
+                        self._live -= 1
+                        self._available.notify()
+                    raise
+            if self._is_healthy(browser):
+                return browser
+            logging.warning("Discarding unhealthy browser from pool")
+            with self._lock:
+                self.counters["discarded"] += 1
+            self._quit(browser)
+
+    def _reset_tabs(self, browser):
+        # Keep the first tab and blank it so the next lease starts clean without a new browser.
+        handles = browser.driver.window_handles
+        for handle in handles[1:]:
+            browser.driver.switch_to.window(handle)
+            browser.driver.close()
+        browser.driver.switch_to.window(handles[0])
+        browser.driver.get("about:blank")
+
+    def _release(self, browser, failed):
+        if self._closed:
+            self._quit(browser)
+            return
+        if failed and not self._is_healthy(browser):
+            with self._lock:
+                self.counters["discarded"] += 1
+            self._quit(browser)
+            return
+        if browser.pages_loaded >= self.max_pages_per_browser:
+            with self._lock:
+                self.counters["recycled"] += 1
+            self._quit(browser)
+            return
+        try:
+            self._reset_tabs(browser)
+        except Exception as e:
+            logging.warning(f"Failed to reset browser tabs, discarding browser: {str(e)}")
+            with self._lock:
+                self.counters["discarded"] += 1
+            self._quit(browser)
+            return
+        with self._lock:
+            self._idle.append(browser)
+            self._available.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        start = time.perf_counter()
+        browser = self._acquire(self.lease_timeout if timeout is None else timeout)
+        with self._lock:
+            self._queue_waits.append(time.perf_counter() - start)
+            self.counters["leases"] += 1
+        failed = False
+        try:
+            yield browser
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(browser, failed)
+
+    def _record_page_load(self, seconds):
+        with self._lock:
+            self._page_loads.append(seconds)
+
+    def stats(self):
+        def summarize(samples):
+            if not samples:
+                return {"count": 0, "avg_ms": 0.0, "p50_ms": 0.0, "max_ms": 0.0}
+            return {
+                "count": len(samples),
+                "avg_ms": statistics.fmean(samples) * 1000,
+                "p50_ms": statistics.median(samples) * 1000,
+                "max_ms": max(samples) * 1000,
+            }
+
+        with self._lock:
+            return {
+                **self.counters,
+                "live": self._live,
+                "idle": len(self._idle),
+                "queue_wait": summarize(list(self._queue_waits)),
+                "page_load": summarize(list(self._page_loads)),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for browser in idle:
+            self._quit(browser)
+        logging.info(f"Browser pool shut down. Stats: {self.stats()}")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool().start()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -1,47 +1,249 @@
-import json
-from datetime import datetime, timedelta
-import os
-import logging
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-class Cache:
-    def __init__(self, cache_dir='cache'):
-        self.cache_dir = cache_dir
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-
-    def get(self, key):
-        file_path = os.path.join(self.cache_dir, f"{key}.json")
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r') as f:
-                    data = json.load(f)
-                    if 'expiry' in data and 'value' in data:
-                        if datetime.now() < datetime.fromisoformat(data['expiry']):
-                            return data['value']
-                        else:
-                            logging.info(f"Cache expired for key: {key}")
-                    else:
-                        logging.warning(f"Invalid cache structure for key: {key}")
-            except json.JSONDecodeError:
-                logging.error(f"Error decoding JSON for key: {key}")
-            except Exception as e:
-                logging.error(f"Error reading cache for key: {key}. Error: {str(e)}")
-        return None
-
-    def set(self, key, value, expiry_hours=24):
-        file_path = os.path.join(self.cache_dir, f"{key}.json")
-        expiry = datetime.now() + timedelta(hours=expiry_hours)
-        data = {
-            'value': value,
-            'expiry': expiry.isoformat()
-        }
-        try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f)
-            logging.info(f"Cache set for key: {key}")
-        except Exception as e:
-            logging.error(f"Error setting cache for key: {key}. Error: {str(e)}")
-
-cache = Cache()
\ No newline at end of file
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from config import Config
+from metrics import stage_metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class Cache:
+    def __init__(self, cache_dir=Config.CACHE_DIR, max_memory_entries=Config.CACHE_MAX_MEMORY_ENTRIES,
+                 max_entries=Config.CACHE_MAX_ENTRIES, max_bytes=Config.CACHE_MAX_MB * 1024 * 1024,
+                 sweep_interval=Config.CACHE_SWEEP_INTERVAL_SECONDS, stale_grace_hours=Config.CACHE_STALE_GRACE_HOURS):
+        self.cache_dir = cache_dir
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.max_memory_entries = max_memory_entries
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.stale_grace_seconds = stale_grace_hours * 3600
+
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()
+        self.counters = {"hits": 0, "memory_hits": 0, "misses": 0, "expired": 0, "sets": 0, "evictions": 0}
+        self._get_seconds = 0.0
+        self._get_count = 0
+
+        self._db = sqlite3.connect(os.path.join(cache_dir, "cache.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key_hash TEXT PRIMARY KEY, key TEXT, value TEXT, expiry REAL, size INTEGER, accessed REAL, validators TEXT)"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(entries)")]
+        if "validators" not in columns:
+            self._db.execute("ALTER TABLE entries ADD COLUMN validators TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_expiry ON entries (expiry)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._db.commit()
+        # Running totals keep the size caps off a full-table scan per write; the sweeper reconciles them.
+        self._entry_count, self._total_bytes = self._totals()
+
+        self._stop_event = threading.Event()
+        self._sweeper = None
+        if sweep_interval:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="cache-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _totals(self):
+        return self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+    @staticmethod
+    def _hash(key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _remember(self, key_hash, value, expiry):
+        self._memory[key_hash] = (value, expiry)
+        self._memory.move_to_end(key_hash)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        start = time.perf_counter()
+        try:
+            with stage_metrics.measure("cache_lookup"):
+                return self._get(key)
+        finally:
+            with self._lock:
+                self._get_seconds += time.perf_counter() - start
+                self._get_count += 1
+
+    def _get(self, key):
+        key_hash = self._hash(key)
+        now = time.time()
+        with self._lock:
+            if key_hash in self._memory:
+                value, expiry = self._memory[key_hash]
+                if now < expiry:
+                    self._memory.move_to_end(key_hash)
+                    self.counters["hits"] += 1
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._memory[key_hash]
+
+            try:
+                row = self._db.execute(
+                    "SELECT value, expiry FROM entries WHERE key_hash = ?", (key_hash,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logging.error(f"Error reading cache for key: {key}. Error: {str(e)}")
+                self.counters["misses"] += 1
+                return None
+
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+
+            serialized, expiry = row
+            if now >= expiry:
+                logging.info(f"Cache expired for key: {key}")
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+
+            try:
+                value = json.loads(serialized)
+            except json.JSONDecodeError:
+                logging.error(f"Error decoding JSON for key: {key}")
+                self.counters["misses"] += 1
+                return None
+
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key_hash = ?", (now, key_hash))
+            self._db.commit()
+            self._remember(key_hash, value, expiry)
+            self.counters["hits"] += 1
+            return value
+
+    def get_entry(self, key):
+        # Unlike get(), also returns expired rows together with their HTTP validators for revalidation.
+        key_hash = self._hash(key)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expiry, validators FROM entries WHERE key_hash = ?", (key_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        serialized, expiry, validators = row
+        try:
+            return {
+                "value": json.loads(serialized),
+                "expired": time.time() >= expiry,
+                "validators": json.loads(validators) if validators else None,
+            }
+        except json.JSONDecodeError:
+            logging.error(f"Error decoding JSON for key: {key}")
+            return None
+
+    def refresh(self, key, expiry_hours=24):
+        key_hash = self._hash(key)
+        now = time.time()
+        expiry = now + expiry_hours * 3600
+        with self._lock:
+            self._db.execute("UPDATE entries SET expiry = ?, accessed = ? WHERE key_hash = ?", (expiry, now, key_hash))
+            self._db.commit()
+            self._memory.pop(key_hash, None)
+        logging.info(f"Cache refreshed for key: {key}")
+
+    def set(self, key, value, expiry_hours=24, validators=None):
+        key_hash = self._hash(key)
+        now = time.time()
+        expiry = now + expiry_hours * 3600
+        try:
+            serialized = json.dumps(value)
+            with self._lock:
+                previous = self._db.execute("SELECT size FROM entries WHERE key_hash = ?", (key_hash,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key_hash, key, value, expiry, size, accessed, validators) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key_hash, key, serialized, expiry, len(serialized), now, json.dumps(validators) if validators else None)
+                )
+                self._db.commit()
+                if previous is None:
+                    self._entry_count += 1
+                else:
+                    self._total_bytes -= previous[0]
+                self._total_bytes += len(serialized)
+                self._remember(key_hash, value, expiry)
+                self.counters["sets"] += 1
+                self._enforce_size_caps()
+            logging.info(f"Cache set for key: {key}")
+        except Exception as e:
+            logging.error(f"Error setting cache for key: {key}. Error: {str(e)}")
+
+    def _enforce_size_caps(self):
+        if self._entry_count <= self.max_entries and self._total_bytes <= self.max_bytes:
+            return
+        while self._entry_count > self.max_entries or self._total_bytes > self.max_bytes:
+            # Evict least recently used rows in batches rather than one round trip per row.
+            batch = max(1, self._entry_count - self.max_entries, self._entry_count // 20)
+            rows = self._db.execute(
+                "SELECT key_hash, size FROM entries ORDER BY accessed LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                break
+            self._db.executemany("DELETE FROM entries WHERE key_hash = ?", [(row[0],) for row in rows])
+            for key_hash, size in rows:
+                self._memory.pop(key_hash, None)
+                self._entry_count -= 1
+                self._total_bytes -= size
+            self.counters["evictions"] += len(rows)
+        self._db.commit()
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM entries WHERE (validators IS NULL AND expiry <= ?) OR expiry <= ?",
+                (now, now - self.stale_grace_seconds)
+            )
+            self._db.commit()
+            self._entry_count, self._total_bytes = self._totals()
+            for key_hash in [k for k, (_, expiry) in self._memory.items() if expiry <= now]:
+                del self._memory[key_hash]
+        if cursor.rowcount:
+            logging.info(f"Cache sweeper removed {cursor.rowcount} expired entries")
+        return cursor.rowcount
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except sqlite3.Error as e:
+                logging.error(f"Cache sweep failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+                "avg_get_ms": self._get_seconds / self._get_count * 1000 if self._get_count else 0.0,
+                "entries": self._entry_count,
+                "bytes": self._total_bytes,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        self._stop_event.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=1)
+        with self._lock:
+            self._db.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    # Built on first use, so importing a module that caches neither creates cache/ nor starts the sweeper.
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = Cache()
+        return _cache
@@ -1,38 +1,198 @@
-from function_calling_usage import function_calling_usage
-from grade_response_with_llm import grade_response_with_llm
-from image_vision_usage import generate_image_vision_text
-
-class ChatFlow:
-    def __init__(self):
-        self.messages = []
-
-    def add_message(self, message):
-        self.messages.append(message)
-
-    def get_messages(self):
-        return self.messages
-    
-    def chat(self, user_prompt):
-        self.add_message({"role": "user", "content": user_prompt})
-        response = function_calling_usage(user_prompt)
-        self.add_message({"role": "assistant", "content": response})
-        grade = self.grade_response(user_prompt, response)
-        self.add_message({"role": "assistant", "content": f"Grade: {grade} \n\n this is the response: {response} that got this grade. adjust the response to improve the grade."})
-        response = function_calling_usage(user_prompt)
-        self.add_message({"role": "assistant", "content": response})
-        return response
-    
-    def grade_response(self, user_prompt, assistant_response):
-        grade = grade_response_with_llm(user_prompt, assistant_response)
-        self.add_message({"role": "assistant", "content": grade})
-        return grade
-
-    def generate_image_vision_text(self, image_url):
-        vision_text = generate_image_vision_text(image_url)
-        self.add_message({"role": "assistant", "content": vision_text})
-        return vision_text
-# # # test the chat flow
-chat_flow = ChatFlow()
-print(chat_flow.chat("test a snake game you create."))
-
-
+import asyncio
+import json
+import threading
+import time
+from function_calling_usage import async_function_calling_usage, stream_function_calling_usage, astream_function_calling_usage
+from grade_response_with_llm import grade_response_with_llm, async_grade_response_with_llm
+from image_vision_usage import generate_image_vision_text
+from conversation_memory import ConversationMemory
+from reflection_policy import ReflectionPolicy, reflection_stats
+from metrics import stage_metrics
+from model_router import model_router
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="chat-flow-loop", daemon=True).start()
+        return _loop
+
+def run_sync(coro):
+    # One long-lived loop for sync callers, so pooled async connections are reused between calls.
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result()
+
+class ChatFlow:
+    def __init__(self, memory=None, send_history=False, policy=None, stats=None, quality_floor=None):
+        # History is token-budgeted so long-lived flows (idea loops) stay bounded in memory and prompt size.
+        self.memory = memory if memory is not None else ConversationMemory()
+        self.send_history = send_history
+        self.policy = policy if policy is not None else ReflectionPolicy()
+        self.reflection_stats = stats if stats is not None else reflection_stats
+        self.quality_floor = quality_floor
+
+    @property
+    def messages(self):
+        return self.memory.messages()
+
+    def add_message(self, message):
+        self.memory.append(message)
+
+    def get_messages(self):
+        return self.messages
+
+    def model_history(self):
+        return self.memory.for_model() if self.send_history else None
+
+    def answer_task(self):
+        # An answer that will be graded (and regenerated if weak) is only a draft, so it may come from a faster model.
+        return "draft" if self.policy.should_grade(0) else "final_answer"
+
+    def route_kwargs(self, task, routes):
+        return {"task": task, "quality_floor": self.quality_floor, "routes": routes}
+
+    def credit_grade(self, routes, grade):
+        # The grade of an answer feeds back into the expected quality of the route that wrote it.
+        if routes:
+            model_router.record_quality(*routes[-1], grade.get("score"))
+    
+    def chat(self, user_prompt):
+        return run_sync(self.achat(user_prompt))
+
+    async def achat(self, user_prompt):
+        history = self.model_history()
+        self.add_message({"role": "user", "content": user_prompt})
+        routes = []
+        response = await async_function_calling_usage(user_prompt, history=history,
+                                                      **self.route_kwargs(self.answer_task(), routes))
+        self.add_message({"role": "assistant", "content": response})
+
+        rounds, grades, regeneration_seconds = 0, 0, 0.0
+        while self.policy.should_grade(rounds):
+            grade = await self.agrade_response(user_prompt, response)
+            grades += 1
+            self.credit_grade(routes, grade)
+            if not self.policy.should_regenerate(grade, rounds):
+                break
+            retry_prompt = self.policy.build_retry_prompt(user_prompt, response, grade)
+            start = time.perf_counter()
+            with stage_metrics.measure("regeneration"):
+                response = await async_function_calling_usage(retry_prompt, history=history,
+                                                              **self.route_kwargs("final_answer", routes))
+            regeneration_seconds += time.perf_counter() - start
+            rounds += 1
+            self.add_message({"role": "assistant", "content": response})
+
+        self.reflection_stats.record(grades, rounds, rounds < self.policy.max_rounds, regeneration_seconds)
+        return response
+
+    def stream(self, user_prompt):
+        # Yields (stage, text) pairs: "answer" tokens as they arrive, each "grade", then "final" tokens
+        # for every regeneration the reflection policy asks for.
+        history = self.model_history()
+        self.add_message({"role": "user", "content": user_prompt})
+        parts = []
+        routes = []
+        for token in stream_function_calling_usage(user_prompt, stage="answer", history=history,
+                                                   **self.route_kwargs(self.answer_task(), routes)):
+            parts.append(token)
+            yield "answer", token
+        response = "".join(parts)
+        self.add_message({"role": "assistant", "content": response})
+
+        rounds, grades, regeneration_seconds = 0, 0, 0.0
+        while self.policy.should_grade(rounds):
+            grade = self.grade_response(user_prompt, response)
+            grades += 1
+            self.credit_grade(routes, grade)
+            yield "grade", grade
+            if not self.policy.should_regenerate(grade, rounds):
+                break
+            retry_prompt = self.policy.build_retry_prompt(user_prompt, response, grade)
+            start = time.perf_counter()
+            parts = []
+            for token in stream_function_calling_usage(retry_prompt, stage="final", history=history,
+                                                       **self.route_kwargs("final_answer", routes)):
+                parts.append(token)
+                yield "final", token
+            regeneration_seconds += time.perf_counter() - start
+            rounds += 1
+            response = "".join(parts)
+            self.add_message({"role": "assistant", "content": response})
+
+        self.reflection_stats.record(grades, rounds, rounds < self.policy.max_rounds, regeneration_seconds)
+
+    async def astream(self, user_prompt):
+        history = self.model_history()
+        self.add_message({"role": "user", "content": user_prompt})
+        parts = []
+        routes = []
+        async for token in astream_function_calling_usage(user_prompt, stage="answer", history=history,
+                                                          **self.route_kwargs(self.answer_task(), routes)):
+            parts.append(token)
+            yield "answer", token
+        response = "".join(parts)
+        self.add_message({"role": "assistant", "content": response})
+
+        rounds, grades, regeneration_seconds = 0, 0, 0.0
+        while self.policy.should_grade(rounds):
+            grade = await self.agrade_response(user_prompt, response)
+            grades += 1
+            self.credit_grade(routes, grade)
+            yield "grade", grade
+            if not self.policy.should_regenerate(grade, rounds):
+                break
+            retry_prompt = self.policy.build_retry_prompt(user_prompt, response, grade)
+            start = time.perf_counter()
+            parts = []
+            async for token in astream_function_calling_usage(retry_prompt, stage="final", history=history,
+                                                              **self.route_kwargs("final_answer", routes)):
+                parts.append(token)
+                yield "final", token
+            regeneration_seconds += time.perf_counter() - start
+            rounds += 1
+            response = "".join(parts)
+            self.add_message({"role": "assistant", "content": response})
+
+        self.reflection_stats.record(grades, rounds, rounds < self.policy.max_rounds, regeneration_seconds)
+
+    async def abatch(self, prompts, max_concurrency=8):
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_one(prompt):
+            # Each prompt gets its own ChatFlow so concurrent conversations never share message history.
+            async with semaphore:
+                return await ChatFlow(policy=self.policy, stats=self.reflection_stats,
+                                      quality_floor=self.quality_floor).achat(prompt)
+
+        return await asyncio.gather(*(run_one(prompt) for prompt in prompts))
+
+    def batch(self, prompts, max_concurrency=8):
+        return run_sync(self.abatch(prompts, max_concurrency=max_concurrency))
+    
+    def grade_response(self, user_prompt, assistant_response):
+        with stage_metrics.measure("grading"):
+            grade = grade_response_with_llm(user_prompt, assistant_response)
+        self.add_message({"role": "assistant", "content": json.dumps(grade)})
+        return grade
+
+    async def agrade_response(self, user_prompt, assistant_response):
+        with stage_metrics.measure("grading"):
+            grade = await async_grade_response_with_llm(user_prompt, assistant_response)
+        self.add_message({"role": "assistant", "content": json.dumps(grade)})
+        return grade
+
+    def generate_image_vision_text(self, image_url):
+        vision_text = generate_image_vision_text(image_url)
+        self.add_message({"role": "assistant", "content": vision_text})
+        return vision_text
+
+if __name__ == "__main__":
+    # # # test the chat flow
+    chat_flow = ChatFlow()
+    print(chat_flow.chat("test a snake game you create."))
+
+
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from caching import get_cache
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CACHE_KEY_PREFIX = "sandbox:"
+# Runs inside the child interpreter: applies the rlimits before any snippet code, then executes the snippet as
+# __main__. Doing this in the child (rather than with preexec_fn) stays safe while other threads are running.
+LAUNCHER = """
+import sys
+try:
+    import resource
+    for name, value in (("RLIMIT_CPU", int(sys.argv[1])), ("RLIMIT_AS", int(sys.argv[2])),
+                        ("RLIMIT_FSIZE", int(sys.argv[3])), ("RLIMIT_CORE", 0)):
+        try:
+            resource.setrlimit(getattr(resource, name), (value, value))
+        except (AttributeError, ValueError, OSError):
+            pass
+except ImportError:
+    pass
+script = sys.argv[4]
+sys.argv = [script]
+sys.path.insert(0, "")
+with open(script, encoding="utf-8") as f:
+    code = compile(f.read(), script, "exec")
+exec(code, {"__name__": "__main__", "__file__": script, "__builtins__": __builtins__})
+"""
+
+
+class CodeSandbox:
+    # Runs Python snippets in fresh, isolated interpreters: one subprocess per run in its own temp dir, with no
+    # inherited environment (so no API keys), CPU/memory/file-size rlimits and a wall-clock timeout that kills the
+    # whole process group. At most max_workers snippets run at once, whether run() is called directly or through
+    # the worker pool. Results are cached by the hash of the code and limits, so resubmitting a snippet costs a
+    # cache lookup instead of a run.
+    def __init__(self, max_workers=Config.SANDBOX_MAX_WORKERS, timeout=Config.SANDBOX_TIMEOUT_SECONDS,
+                 cpu_seconds=Config.SANDBOX_CPU_SECONDS, memory_mb=Config.SANDBOX_MEMORY_MB,
+                 max_file_mb=Config.SANDBOX_MAX_FILE_MB, max_output_kb=Config.SANDBOX_MAX_OUTPUT_KB,
+                 cache=None, cache_hours=Config.SANDBOX_CACHE_HOURS):
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.file_bytes = max_file_mb * 1024 * 1024
+        self.max_output_bytes = max_output_kb * 1024
+        self.cache = cache if cache is not None else get_cache()
+        self.cache_hours = cache_hours
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sandbox")
+        # Tool calls run snippets from their own threads, so the pool alone does not bound the subprocesses.
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self.counters = {"runs": 0, "cache_hits": 0, "failures": 0, "timeouts": 0}
+
+    def code_hash(self, code):
+        limits = f"{sys.version_info[:2]}|{self.timeout}|{self.cpu_seconds}|{self.memory_bytes}|{self.file_bytes}"
+        return hashlib.sha256(f"{limits}\0{code}".encode("utf-8")).hexdigest()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _read_output(self, path):
+        with open(path, "rb") as f:
+            data = f.read(self.max_output_bytes + 1)
+        text = data[:self.max_output_bytes].decode("utf-8", errors="replace")
+        return text + "\n[output truncated]" if len(data) > self.max_output_bytes else text
+
+    def _execute(self, code):
+        with tempfile.TemporaryDirectory(prefix="sandbox_") as work_dir:
+            script = os.path.join(work_dir, "snippet.py")
+            with open(script, "w", encoding="utf-8") as f:
+                f.write(code)
+            stdout_path = os.path.join(work_dir, ".stdout")
+            stderr_path = os.path.join(work_dir, ".stderr")
+            env = {"PATH": os.environ.get("PATH", ""), "HOME": work_dir, "TMPDIR": work_dir, "TEMP": work_dir, "TMP": work_dir}
+            if os.name == "nt":
+                env["SYSTEMROOT"] = os.environ.get("SYSTEMROOT", "")
+            posix = os.name == "posix"
+
+            timed_out = False
+            start = time.perf_counter()
+            with open(stdout_path, "wb") as stdout, open(stderr_path, "wb") as stderr:
+                # -I: ignore PYTHON* variables and user site-packages; -X utf8 keeps output decoding predictable.
+                process = subprocess.Popen(
+                    [sys.executable, "-I", "-X", "utf8", "-c", LAUNCHER,
+                     str(self.cpu_seconds), str(self.memory_bytes), str(self.file_bytes), "snippet.py"],
+                    cwd=work_dir, env=env, stdin=subprocess.DEVNULL, stdout=stdout, stderr=stderr,
+                    start_new_session=posix,
+                )
+                try:
+                    exit_code = process.wait(timeout=self.timeout)
+                except subprocess.TimeoutExpired:
+                    timed_out = True
+                    if posix:
+                        os.killpg(process.pid, signal.SIGKILL)
+                    else:
+                        process.kill()
+                    exit_code = process.wait()
+            duration = time.perf_counter() - start
+
+            stderr_text = self._read_output(stderr_path)
+            if timed_out:
+                stderr_text += f"\nTimed out after {self.timeout:g}s"
+            return {
+                "ok": exit_code == 0 and not timed_out,
+                "exit_code": exit_code,
+                "stdout": self._read_output(stdout_path),
+                "stderr": stderr_text,
+                "timed_out": timed_out,
+                "duration_s": round(duration, 4),
+            }
+
+    def run(self, code, use_cache=True):
+        # Returns a dict with ok, exit_code (negative: killed by that signal), stdout, stderr, timed_out,
+        # duration_s, code_hash and cached.
+        code_hash = self.code_hash(code)
+        key = CACHE_KEY_PREFIX + code_hash
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count("cache_hits")
+                return dict(cached, code_hash=code_hash, cached=True)
+
+        self._count("runs")
+        try:
+            with self._slots:
+                result = self._execute(code)
+        except OSError as e:
+            logging.error(f"Sandbox could not run snippet {code_hash[:12]}: {str(e)}")
+            result = {"ok": False, "exit_code": None, "stdout": "", "stderr": f"Sandbox error: {str(e)}",
+                      "timed_out": False, "duration_s": 0.0}
+        if not result["ok"]:
+            self._count("failures")
+        if result["timed_out"]:
+            self._count("timeouts")
+        # Timeouts depend on machine load and sandbox errors on the host, so only real outcomes are cached.
+        elif use_cache and result["exit_code"] is not None:
+            self.cache.set(key, result, expiry_hours=self.cache_hours)
+        return dict(result, code_hash=code_hash, cached=False)
+
+    def submit(self, code, use_cache=True):
+        return self._executor.submit(self.run, code, use_cache)
+
+    def run_many(self, codes, use_cache=True):
+        # Runs the snippets in parallel on the worker pool; results come back in input order.
+        return [future.result() for future in [self.submit(code, use_cache) for code in codes]]
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+def describe_run(result):
+    # Plain-text summary of a run for tool output and debugging prompts.
+    status = "timed out" if result["timed_out"] else f"exited with status {result['exit_code']}"
+    lines = [f"Code {status} after {result['duration_s']:.2f}s{' (cached result)' if result.get('cached') else ''}."]
+    if result["stdout"]:
+        lines.append(f"Output:\n{result['stdout']}")
+    if result["stderr"]:
+        lines.append(f"Errors:\n{result['stderr']}")
+    return "\n".join(lines)
+
+
+_sandbox = None
+_sandbox_lock = threading.Lock()
+
+
+def get_code_sandbox():
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = CodeSandbox()
+        return _sandbox
@@ -1,9 +1,113 @@
-import os
-
-class Config:
-    API_KEY = os.getenv("GROQ_API_KEY")
-    API_URL = "https://api.groq.com/openai/v1"
-    text_gen_funct_call_model = "llama-3.1-70b-versatile"
-    regular_model = "llama-3.1-70b-versatile"
-    image_vision_model = "llava-v1.5-7b-4096-preview"
-    whisper_model = "distil-whisper-large-v3-en"
+import os
+
+class Config:
+    API_KEY = os.getenv("GROQ_API_KEY")
+    # Any OpenAI-compatible endpoint, e.g. the local mock_llm_server.py for load tests.
+    API_URL = os.getenv("LLM_API_URL", "https://api.groq.com/openai/v1")
+    text_gen_funct_call_model = "llama-3.1-70b-versatile"
+    regular_model = "llama-3.1-70b-versatile"
+    image_vision_model = "llava-v1.5-7b-4096-preview"
+    whisper_model = "distil-whisper-large-v3-en"
+    grading_model = "llama-3.1-70b-versatile"
+    # Fast model that model_router.py picks for tool routing, grading and drafts when the prompt is short enough.
+    small_model = "llama-3.1-8b-instant"
+    # LLM response cache: "off", "record" (read and write) or "replay" (read only, misses raise).
+    LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off")
+    LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "llm_cache")
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+    LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "512"))
+    # Search/scrape cache: single SQLite file with an in-process LRU in front of it.
+    CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+    CACHE_MAX_MEMORY_ENTRIES = int(os.getenv("CACHE_MAX_MEMORY_ENTRIES", "1024"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "100000"))
+    CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "1024"))
+    CACHE_SWEEP_INTERVAL_SECONDS = int(os.getenv("CACHE_SWEEP_INTERVAL_SECONDS", "600"))
+    # Cold import budget per core module, enforced by startup_benchmark.py.
+    STARTUP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "250"))
+    # Tool execution: all tool calls of a turn run concurrently, each with its own timeout.
+    TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+    TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "60"))
+    CODE_TOOL_TIMEOUT_SECONDS = float(os.getenv("CODE_TOOL_TIMEOUT_SECONDS", "180"))
+    MAX_TOOL_STEPS = int(os.getenv("MAX_TOOL_STEPS", "4"))
+    # Shared headless Chrome pool used by search and scraping.
+    BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+    BROWSER_POOL_WARM = int(os.getenv("BROWSER_POOL_WARM", "1"))
+    BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "50"))
+    BROWSER_LEASE_TIMEOUT_SECONDS = float(os.getenv("BROWSER_LEASE_TIMEOUT_SECONDS", "60"))
+    # HTTP-first fetching: pooled keep-alive session, browser only for pages that need JavaScript.
+    HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "32"))
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "4"))
+    HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+    HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "15"))
+    HTTP_MIN_TEXT_CHARS = int(os.getenv("HTTP_MIN_TEXT_CHARS", "200"))
+    HTTP_MAX_BODY_BYTES = int(os.getenv("HTTP_MAX_BODY_BYTES", str(5 * 1024 * 1024)))
+    # Scraped pages: main content split into chunks of this many tokens; a scrape returns the best chunks that fit
+    # the budget. HTML past SCRAPE_MAX_HTML_CHARS is not parsed.
+    SCRAPE_CHUNK_TOKENS = int(os.getenv("SCRAPE_CHUNK_TOKENS", "300"))
+    SCRAPE_TOKEN_BUDGET = int(os.getenv("SCRAPE_TOKEN_BUDGET", "1500"))
+    SCRAPE_MAX_HTML_CHARS = int(os.getenv("SCRAPE_MAX_HTML_CHARS", "2000000"))
+    # Expired entries with ETag/Last-Modified are kept this long so they can be revalidated.
+    CACHE_STALE_GRACE_HOURS = float(os.getenv("CACHE_STALE_GRACE_HOURS", "168"))
+    # Conversation memory: history is compacted to stay under this many tokens.
+    CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "6000"))
+    CONVERSATION_INLINE_TOKEN_LIMIT = int(os.getenv("CONVERSATION_INLINE_TOKEN_LIMIT", "1000"))
+    CONVERSATION_SUMMARY_TOKEN_LIMIT = int(os.getenv("CONVERSATION_SUMMARY_TOKEN_LIMIT", "800"))
+    ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "conversation_artifacts")
+    # Out-of-line message contents are removed after this long, least recently used first past the size cap.
+    ARTIFACT_MAX_MB = int(os.getenv("ARTIFACT_MAX_MB", "200"))
+    ARTIFACT_MAX_AGE_HOURS = float(os.getenv("ARTIFACT_MAX_AGE_HOURS", "24"))
+    # Self-grading: regenerate only while the 0-10 grade is below the threshold, at most this many times.
+    REFLECTION_SCORE_THRESHOLD = float(os.getenv("REFLECTION_SCORE_THRESHOLD", "8.0"))
+    REFLECTION_MAX_ROUNDS = int(os.getenv("REFLECTION_MAX_ROUNDS", "1"))
+    # Batched grading: (prompt, response) pairs are packed into requests under this token budget.
+    GRADING_BATCH_TOKEN_BUDGET = int(os.getenv("GRADING_BATCH_TOKEN_BUDGET", "6000"))
+    GRADING_MAX_BATCH_ITEMS = int(os.getenv("GRADING_MAX_BATCH_ITEMS", "25"))
+    GRADING_ITEM_TOKEN_LIMIT = int(os.getenv("GRADING_ITEM_TOKEN_LIMIT", "1200"))
+    GRADING_MAX_CONCURRENCY = int(os.getenv("GRADING_MAX_CONCURRENCY", "4"))
+    # Benchmark datasets are read from <BENCHMARK_DATA_DIR>/<name>/<split>.jsonl|.arrow before trying the hub.
+    BENCHMARK_DATA_DIR = os.getenv("BENCHMARK_DATA_DIR", "benchmark_data")
+    BENCHMARK_OFFLINE = os.getenv("BENCHMARK_OFFLINE", "0") == "1"
+    BENCHMARK_SHUFFLE_BUFFER = int(os.getenv("BENCHMARK_SHUFFLE_BUFFER", "10000"))
+    # perf_benchmark.py fails when a stage's p95 grows by more than this fraction and this many milliseconds.
+    PERF_REGRESSION_THRESHOLD = float(os.getenv("PERF_REGRESSION_THRESHOLD", "0.2"))
+    PERF_REGRESSION_MIN_MS = float(os.getenv("PERF_REGRESSION_MIN_MS", "1.0"))
+    # Per-sample benchmark results are appended here as <run_id>.jsonl so interrupted runs can resume.
+    BENCHMARK_JOURNAL_DIR = os.getenv("BENCHMARK_JOURNAL_DIR", "benchmark_runs")
+    # Population search in generate_idea.py: candidates per round, survivors refined, and a cap on total chats.
+    IDEA_POPULATION_SIZE = int(os.getenv("IDEA_POPULATION_SIZE", "6"))
+    IDEA_BEAM_WIDTH = int(os.getenv("IDEA_BEAM_WIDTH", "2"))
+    IDEA_MAX_ROUNDS = int(os.getenv("IDEA_MAX_ROUNDS", "4"))
+    IDEA_MAX_CONCURRENCY = int(os.getenv("IDEA_MAX_CONCURRENCY", "4"))
+    IDEA_CALL_BUDGET = int(os.getenv("IDEA_CALL_BUDGET", "40"))
+    # Near-duplicate ideas (estimated Jaccard over word 3-grams at or above this) reuse the earlier evaluation.
+    IDEA_INDEX_PATH = os.getenv("IDEA_INDEX_PATH", os.path.join("generated_ideas", "idea_index.jsonl"))
+    IDEA_DUPLICATE_THRESHOLD = float(os.getenv("IDEA_DUPLICATE_THRESHOLD", "0.8"))
+    # Every saved idea is written to this SQLite store; process_generated_ideas.py reads its top ideas from it.
+    IDEA_STORE_PATH = os.getenv("IDEA_STORE_PATH", os.path.join("generated_ideas", "ideas.db"))
+    # code_sandbox.py: concurrent snippet runs and per-run limits; results are cached by code hash for this long.
+    SANDBOX_MAX_WORKERS = int(os.getenv("SANDBOX_MAX_WORKERS", "4"))
+    SANDBOX_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", "10"))
+    SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "10"))
+    SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "512"))
+    SANDBOX_MAX_FILE_MB = int(os.getenv("SANDBOX_MAX_FILE_MB", "16"))
+    SANDBOX_MAX_OUTPUT_KB = int(os.getenv("SANDBOX_MAX_OUTPUT_KB", "64"))
+    SANDBOX_CACHE_HOURS = float(os.getenv("SANDBOX_CACHE_HOURS", "168"))
+    # AutogenCodeHandler agent sessions: concurrent autogen chats, requests per session before it is rebuilt.
+    AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "2"))
+    AGENT_MAX_REQUESTS_PER_SESSION = int(os.getenv("AGENT_MAX_REQUESTS_PER_SESSION", "50"))
+    AGENT_LEASE_TIMEOUT_SECONDS = float(os.getenv("AGENT_LEASE_TIMEOUT_SECONDS", "120"))
+    # Rate-limited LLM client: retries with jittered backoff, AIMD concurrency bounds and a circuit breaker
+    # that fails fast after this many consecutive server errors or timeouts.
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+    LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+    LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", "5"))
+    LLM_CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("LLM_CIRCUIT_COOLDOWN_SECONDS", "30"))
+    # model_router.py: "off" pins every task to its large model. A route's quality is its profile prior until it has
+    # ROUTER_MIN_SAMPLES graded answers; with a ROUTER_QUALITY_FLOOR (0-10) routes scoring below it are skipped.
+    MODEL_ROUTING = os.getenv("MODEL_ROUTING", "on")
+    ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "20"))
+    ROUTER_QUALITY_FLOOR = float(os.getenv("ROUTER_QUALITY_FLOOR")) if os.getenv("ROUTER_QUALITY_FLOOR") else None
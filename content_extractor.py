@@ -0,0 +1,344 @@
+import logging
+import re
+from html.parser import HTMLParser
+from config import Config
+from token_utils import CHARS_PER_TOKEN, count_tokens, truncate_to_tokens
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Never visible text.
+DROP_TAGS = {"script", "style", "noscript", "template", "svg", "math", "canvas", "iframe", "object", "head",
+             "select", "option", "button", "textarea"}
+# Page furniture: text inside is collected but only used when nothing else is left.
+BOILERPLATE_TAGS = {"nav", "footer", "aside", "form", "dialog", "menu"}
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "menu", "menubar", "dialog"}
+BOILERPLATE_PATTERN = re.compile(
+    r"(?:^|[\s_-])(?:nav|navbar|navigation|menu|breadcrumbs?|sidebar|footer|masthead|cookies?|consent|gdpr|banner|"
+    r"ads?|advert\w*|sponsor\w*|promo\w*|share|sharing|social|subscribe|newsletter|signup|related|recommended|"
+    r"comments?|popup|modal|overlay|skip-link|pagination)(?:$|[\s_-])",
+    re.IGNORECASE
+)
+CONTENT_TAGS = {"article", "main"}
+STRUCTURAL_TAGS = {"html", "body", "article", "main"}
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "header", "h1", "h2", "h3", "h4", "h5", "h6", "li", "ul",
+              "ol", "dl", "dt", "dd", "pre", "blockquote", "table", "tr", "td", "th", "caption", "figure",
+              "figcaption", "details", "summary", "br", "hr"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+SENTENCE_END_PATTERN = re.compile(r"[.!?](?:\s|$)")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"\w{3,}")
+# Blocks that are mostly link text (menus, tag clouds, "related" lists) are boilerplate.
+MAX_LINK_DENSITY = 0.5
+# Later chunks score slightly lower: articles front-load what they are about.
+POSITION_DECAY = 0.02
+
+
+def _lxml_html_parser(target):
+    try:
+        from lxml import etree
+    except ImportError:
+        return None
+    return etree.HTMLParser(target=target, remove_comments=True, remove_pis=True, no_network=True)
+
+
+class BlockCollector:
+    # Turns a stream of start/data/end events into text blocks (paragraphs, headings, list items, ...) without ever
+    # building a document tree. The same collector serves lxml's C parser and the standard library's HTMLParser.
+    def __init__(self):
+        self.blocks = []
+        self._stack = []
+        self._drop_depth = None
+        self._boilerplate_depth = None
+        self._content_depth = 0
+        self._pre_depth = 0
+        self._link_depth = 0
+        self._parts = []
+        self._link_chars = 0
+        self._heading = False
+
+    def _flush(self):
+        raw = "".join(self._parts)
+        self._parts = []
+        link_chars, self._link_chars = self._link_chars, 0
+        heading, self._heading = self._heading, False
+        if self._pre_depth:
+            text = "\n".join(line.rstrip() for line in raw.strip("\n").splitlines())
+        else:
+            text = " ".join(raw.split())
+        if text.strip():
+            self.blocks.append({
+                "text": text,
+                "link_chars": min(link_chars, len(text)),
+                "heading": heading,
+                "pre": bool(self._pre_depth),
+                "boilerplate": self._boilerplate_depth is not None,
+            })
+
+    def _is_boilerplate(self, tag, attrib):
+        if tag in STRUCTURAL_TAGS:
+            return False
+        if tag in BOILERPLATE_TAGS or (tag == "header" and not self._content_depth):
+            return True
+        if attrib.get("role", "").lower() in BOILERPLATE_ROLES or attrib.get("aria-hidden") == "true" or "hidden" in attrib:
+            return True
+        if "display:none" in attrib.get("style", "").replace(" ", "").lower():
+            return True
+        return bool(BOILERPLATE_PATTERN.search(f"{attrib.get('id', '')} {attrib.get('class', '')}"))
+
+    def start(self, tag, attrib):
+        tag = tag.lower()
+        if tag in BLOCK_TAGS and self._drop_depth is None:
+            self._flush()
+        if tag in VOID_TAGS:
+            return
+        self._stack.append(tag)
+        depth = len(self._stack)
+        if self._drop_depth is None:
+            if tag in DROP_TAGS:
+                self._drop_depth = depth
+            elif self._boilerplate_depth is None and self._is_boilerplate(tag, attrib):
+                # Boilerplate may open on an inline or non-block tag; text before it belongs to another block.
+                self._flush()
+                self._boilerplate_depth = depth
+        if tag in CONTENT_TAGS:
+            self._content_depth += 1
+        if tag == "pre":
+            self._pre_depth += 1
+        elif tag == "a":
+            self._link_depth += 1
+        elif tag in HEADING_TAGS:
+            self._heading = True
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag not in self._stack:
+            return
+        # Unclosed children (implicit </li>, </p>, ...) are closed along with their parent.
+        while self._stack:
+            closed = self._stack.pop()
+            depth = len(self._stack) + 1
+            if (closed in BLOCK_TAGS or self._boilerplate_depth == depth) and self._drop_depth is None:
+                self._flush()
+            if self._drop_depth == depth:
+                self._drop_depth = None
+            if self._boilerplate_depth == depth:
+                self._boilerplate_depth = None
+            if closed in CONTENT_TAGS:
+                self._content_depth -= 1
+            elif closed == "pre":
+                self._pre_depth -= 1
+            elif closed == "a":
+                self._link_depth -= 1
+            if closed == tag:
+                break
+
+    def data(self, text):
+        if self._drop_depth is not None:
+            return
+        self._parts.append(text)
+        if self._link_depth:
+            self._link_chars += len(text.strip())
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        self._flush()
+        return self.blocks
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {name: value or "" for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+    def close(self):
+        super().close()
+        return self.target.close()
+
+
+def available_backends():
+    return (["lxml"] if _lxml_html_parser(None) is not None else []) + ["html.parser"]
+
+
+class ContentExtractor:
+    # Incremental page-to-chunks extraction: feed() HTML as it arrives, close() returns the page's main content as
+    # ranked chunks of at most chunk_tokens tokens. Uses lxml's C parser when installed, else html.parser; both
+    # stream events into BlockCollector, and input past max_chars is ignored.
+    def __init__(self, chunk_tokens=Config.SCRAPE_CHUNK_TOKENS, max_chars=Config.SCRAPE_MAX_HTML_CHARS, backend=None):
+        self.chunk_tokens = chunk_tokens
+        self.max_chars = max_chars
+        self.collector = BlockCollector()
+        self.parser = None
+        if backend in (None, "lxml"):
+            self.parser = _lxml_html_parser(self.collector)
+            if self.parser is None and backend == "lxml":
+                raise ImportError("lxml is not installed")
+        self.backend = "lxml" if self.parser is not None else "html.parser"
+        if self.parser is None:
+            self.parser = _StdlibParser(self.collector)
+        self.chars_fed = 0
+        self.truncated = False
+
+    def feed(self, html):
+        if self.truncated or not html:
+            return
+        remaining = self.max_chars - self.chars_fed
+        if len(html) > remaining:
+            html = html[:remaining]
+            self.truncated = True
+        self.chars_fed += len(html)
+        self.parser.feed(html)
+
+    def close(self):
+        try:
+            blocks = self.parser.close()
+        except Exception as e:
+            # lxml raises on documents it could not parse at all; whatever was collected is still usable.
+            logging.warning(f"HTML parser error, using partial content: {str(e)}")
+            blocks = self.collector.close()
+        if self.truncated:
+            logging.info(f"HTML cut at {self.max_chars} characters before extraction")
+        return build_chunks(clean_blocks(blocks), self.chunk_tokens)
+
+
+def clean_blocks(blocks):
+    # Drops link-heavy blocks and repeats; boilerplate blocks are only used for pages that have nothing else.
+    seen = set()
+    content, fallback = [], []
+    for block in blocks:
+        text = block["text"]
+        if block["link_chars"] > MAX_LINK_DENSITY * len(text) or text in seen:
+            continue
+        if not (block["heading"] or block["pre"]) and len(text.split()) < 2:
+            continue
+        seen.add(text)
+        (fallback if block["boilerplate"] else content).append(block)
+    return content or fallback
+
+
+def _split_text(text, max_tokens):
+    # Splits an oversized block at sentence boundaries, and a sentence that alone is too long at max_tokens.
+    pieces, current = [], ""
+    for sentence in SENTENCE_SPLIT_PATTERN.split(text):
+        candidate = f"{current} {sentence}".strip()
+        if count_tokens(candidate) <= max_tokens:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        while count_tokens(sentence) > max_tokens:
+            cut = sentence.rfind(" ", 0, max_tokens * CHARS_PER_TOKEN)
+            cut = cut if cut > 0 else max_tokens * CHARS_PER_TOKEN
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        current = sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _chunk_score(text, link_chars, tokens, index, chunk_tokens):
+    # Prose-like, link-free, well-filled chunks near the top of the page rank first.
+    link_density = link_chars / max(1, len(text))
+    fill = min(1.0, tokens / chunk_tokens)
+    prose = min(1.0, len(SENTENCE_END_PATTERN.findall(text)) * 40 / max(1, tokens))
+    return round((1 - link_density) * (0.4 + 0.3 * fill + 0.3 * prose) / (1 + POSITION_DECAY * index), 4)
+
+
+def build_chunks(blocks, chunk_tokens=Config.SCRAPE_CHUNK_TOKENS):
+    # Groups consecutive blocks into chunks of up to chunk_tokens tokens. A heading starts a new chunk and is kept
+    # as that chunk's (and its continuations') heading instead of in its text.
+    chunks = []
+    heading = ""
+    parts, tokens, link_chars = [], 0, 0
+
+    def emit():
+        text = "\n".join(parts)
+        index = len(chunks)
+        chunks.append({"index": index, "heading": heading, "text": text, "tokens": tokens,
+                       "score": _chunk_score(text, link_chars, tokens, index, chunk_tokens)})
+
+    for block in blocks:
+        if block["heading"]:
+            if parts:
+                emit()
+                parts, tokens, link_chars = [], 0, 0
+            heading = block["text"]
+            continue
+        block_tokens = count_tokens(block["text"])
+        pieces = [block["text"]] if block_tokens <= chunk_tokens or block["pre"] else _split_text(block["text"], chunk_tokens)
+        for piece in pieces:
+            piece_tokens = block_tokens if len(pieces) == 1 else count_tokens(piece)
+            if parts and tokens + piece_tokens > chunk_tokens:
+                emit()
+                parts, tokens, link_chars = [], 0, 0
+            parts.append(piece)
+            tokens += piece_tokens
+            link_chars += block["link_chars"] if len(pieces) == 1 else 0
+    if parts:
+        emit()
+    elif heading and not chunks:
+        chunks.append({"index": 0, "heading": "", "text": heading, "tokens": count_tokens(heading), "score": 0.0})
+    return chunks
+
+
+def extract_chunks(html, chunk_tokens=Config.SCRAPE_CHUNK_TOKENS, backend=None, piece_chars=64 * 1024):
+    # html is a string or an iterable of string pieces (e.g. a streamed response body).
+    extractor = ContentExtractor(chunk_tokens, backend=backend)
+    pieces = [html[i:i + piece_chars] for i in range(0, len(html), piece_chars)] if isinstance(html, str) else html
+    for piece in pieces:
+        extractor.feed(piece)
+        if extractor.truncated:
+            break
+    return extractor.close()
+
+
+def select_chunks(chunks, token_budget=Config.SCRAPE_TOKEN_BUDGET, query=None):
+    # Best chunks that fit the budget, returned in page order. With a query, chunks sharing its words rank higher.
+    terms = {term.lower() for term in WORD_PATTERN.findall(query or "")}
+
+    def rank(chunk):
+        if not terms:
+            return chunk["score"]
+        words = {word.lower() for word in WORD_PATTERN.findall(f"{chunk['heading']} {chunk['text']}")}
+        return chunk["score"] * (1 + 3 * len(terms & words) / len(terms))
+
+    selected, used = [], 0
+    for chunk in sorted(chunks, key=rank, reverse=True):
+        if used + chunk["tokens"] <= token_budget:
+            selected.append(chunk)
+            used += chunk["tokens"]
+    if not selected and chunks:
+        # Only oversized chunks (long code blocks): keep the start of the best one.
+        best = max(chunks, key=rank)
+        selected = [dict(best, text=truncate_to_tokens(best["text"], token_budget), tokens=token_budget)]
+    return sorted(selected, key=lambda chunk: chunk["index"])
+
+
+def render_chunks(chunks):
+    # Gaps between non-adjacent chunks are marked so the model knows text was left out.
+    parts = []
+    previous = None
+    for chunk in chunks:
+        if previous is not None and chunk["index"] != previous["index"] + 1:
+            parts.append("[...]")
+        continues_section = previous is not None and chunk["index"] == previous["index"] + 1 and chunk["heading"] == previous["heading"]
+        parts.append(chunk["text"] if not chunk["heading"] or continues_section else f"{chunk['heading']}\n{chunk['text']}")
+        previous = chunk
+    return "\n\n".join(parts)
@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from config import Config
+from token_utils import count_message_tokens, count_tokens, truncate_to_tokens
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MODEL_ROLES = ("system", "user", "assistant")
+
+
+class ArtifactStore:
+    # Large tool outputs (scraped pages, prototypes) live on disk and are referenced from the history by hash. The
+    # directory is bounded: files unused for max_age_hours are removed, and past max_bytes the least recently used
+    # go first, so get() returns None for a reference whose content has been removed.
+    def __init__(self, root=Config.ARTIFACT_DIR, max_bytes=Config.ARTIFACT_MAX_MB * 1024 * 1024,
+                 max_age_hours=Config.ARTIFACT_MAX_AGE_HOURS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_hours * 3600
+        self._lock = threading.Lock()
+        self._entries = None
+        self._total_bytes = 0
+
+    def _path(self, ref):
+        return os.path.join(self.root, f"{ref}.txt")
+
+    def _load_index(self):
+        # LRU order rebuilt from modification times, which get() and put() refresh on every use.
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        if os.path.isdir(self.root):
+            files = [entry for entry in os.scandir(self.root) if entry.name.endswith(".txt")]
+            for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+                stat = entry.stat()
+                self._entries[entry.name[:-len(".txt")]] = (stat.st_size, stat.st_mtime)
+                self._total_bytes += stat.st_size
+
+    def _touch(self, ref):
+        now = time.time()
+        os.utime(self._path(ref), (now, now))
+        self._entries[ref] = (self._entries[ref][0], now)
+        self._entries.move_to_end(ref)
+
+    def _forget(self, ref):
+        size, _ = self._entries.pop(ref)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(ref))
+        except OSError:
+            pass
+
+    def _evict(self, keep):
+        expired_before = time.time() - self.max_age_seconds
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if oldest == keep or (self._entries[oldest][1] >= expired_before and self._total_bytes <= self.max_bytes):
+                return
+            self._forget(oldest)
+
+    def put(self, text):
+        ref = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._load_index()
+            if ref in self._entries and os.path.exists(self._path(ref)):
+                self._touch(ref)
+            else:
+                if ref in self._entries:
+                    self._forget(ref)
+                os.makedirs(self.root, exist_ok=True)
+                data = text.encode("utf-8")
+                with open(self._path(ref), "wb") as f:
+                    f.write(data)
+                self._entries[ref] = (len(data), time.time())
+                self._total_bytes += len(data)
+            self._evict(keep=ref)
+        return ref
+
+    def get(self, ref):
+        with self._lock:
+            self._load_index()
+            if ref not in self._entries:
+                return None
+            try:
+                with open(self._path(ref), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except OSError:
+                self._forget(ref)
+                return None
+            self._touch(ref)
+            return text
+
+    def stats(self):
+        with self._lock:
+            self._load_index()
+            return {"artifacts": len(self._entries), "bytes": self._total_bytes}
+
+
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    # One store per process, so its size accounting covers every conversation writing to the directory.
+    global _artifact_store
+    with _artifact_store_lock:
+        if _artifact_store is None:
+            _artifact_store = ArtifactStore()
+        return _artifact_store
+
+
+def extractive_summary(previous_summary, dropped_messages):
+    # Default compaction without a model call: keep the first sentence of every dropped turn.
+    lines = [previous_summary] if previous_summary else []
+    for message in dropped_messages:
+        content = " ".join((message.get("content") or "").split())
+        first_sentence = re.split(r"(?<=[.!?])\s", content, maxsplit=1)[0]
+        lines.append(f"{message['role']}: {first_sentence[:300]}")
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    def __init__(self, token_budget=Config.CONVERSATION_TOKEN_BUDGET,
+                 inline_token_limit=Config.CONVERSATION_INLINE_TOKEN_LIMIT,
+                 summary_token_limit=Config.CONVERSATION_SUMMARY_TOKEN_LIMIT,
+                 summarizer=extractive_summary, artifact_store=None, min_recent_messages=2):
+        self.token_budget = token_budget
+        self.inline_token_limit = inline_token_limit
+        self.summary_token_limit = summary_token_limit
+        self.summarizer = summarizer
+        self.artifact_store = artifact_store if artifact_store is not None else get_artifact_store()
+        self.min_recent_messages = min_recent_messages
+        self._entries = deque()
+        self._tokens = 0
+        self.summary = ""
+        self._summary_tokens = 0
+        self.compactions = 0
+
+    @property
+    def total_tokens(self):
+        return self._tokens + self._summary_tokens
+
+    def append(self, message):
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = str(content)
+        message = dict(message, content=content)
+        if count_tokens(content) > self.inline_token_limit:
+            ref = self.artifact_store.put(content)
+            preview = truncate_to_tokens(content, self.inline_token_limit // 2)
+            message["content"] = f"{preview}\n[... full content stored out of line, ref={ref}]"
+            message["artifact_ref"] = ref
+        tokens = count_message_tokens(message)
+        self._entries.append((message, tokens))
+        self._tokens += tokens
+        if self.total_tokens > self.token_budget:
+            self.compact()
+
+    def compact(self):
+        # Compact down to a low-water mark so the summarizer runs once per many turns, not on every append.
+        target = int(self.token_budget * 0.75)
+        dropped = []
+        while self.total_tokens > target and len(self._entries) > self.min_recent_messages:
+            message, tokens = self._entries.popleft()
+            self._tokens -= tokens
+            dropped.append(message)
+        if not dropped:
+            return
+        summary = self.summarizer(self.summary, dropped)
+        # Oldest summary lines go first so the summary keeps tracking the recent past.
+        while count_tokens(summary) > self.summary_token_limit and "\n" in summary:
+            summary = summary.split("\n", 1)[1]
+        self.summary = truncate_to_tokens(summary, self.summary_token_limit)
+        self._summary_tokens = count_tokens(self.summary)
+        self.compactions += 1
+        logging.info(f"Compacted {len(dropped)} messages; history now {self.total_tokens} tokens")
+
+    def resolve(self, ref):
+        # The full content behind an artifact_ref, or None once the store has removed it.
+        return self.artifact_store.get(ref)
+
+    def messages(self):
+        messages = [message for message, _ in self._entries]
+        if self.summary:
+            messages.insert(0, {"role": "system", "content": f"Summary of earlier conversation:\n{self.summary}"})
+        return messages
+
+    def for_model(self):
+        return [
+            {"role": message["role"], "content": message["content"]}
+            for message in self.messages() if message["role"] in MODEL_ROLES
+        ]
+
+    def __len__(self):
+        return len(self._entries)
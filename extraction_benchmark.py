@@ -0,0 +1,144 @@
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import time
+from config import Config
+from content_extractor import available_backends, extract_chunks, select_chunks
+from metrics import percentile
+from token_utils import count_tokens
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BOILERPLATE_HTML = (
+    "<header><a href='/'>Home</a> <a href='/news'>News</a> <a href='/about'>About</a></header>"
+    "<nav class='menu'><ul>" + "<li><a href='/section'>Section link</a></li>" * 40 + "</ul></nav>"
+    "<div class='cookie-banner'>We use cookies to improve your experience on this site.</div>"
+)
+FOOTER_HTML = (
+    "<aside class='sidebar'>" + "<p><a href='/related'>Related article headline</a></p>" * 20 + "</aside>"
+    "<footer><p>Copyright Example Corp. All rights reserved.</p></footer>"
+    "<script>" + "var tracking = {id: 1, events: []};" * 200 + "</script>"
+)
+
+
+def synthetic_corpus(paragraph_counts=(20, 200, 2000)):
+    # Article-like pages with navigation, sidebars, footers and scripts around the content, from ~10 KB to ~1 MB.
+    pages = []
+    for count in paragraph_counts:
+        sections = "".join(
+            (f"<h2>Section {i // 10}</h2>" if i % 10 == 0 else "") +
+            f"<p>Paragraph {i} explains one part of the topic in plain sentences. It links to a "
+            f"<a href='/ref/{i}'>reference</a> and ends with a full stop.</p>"
+            for i in range(count)
+        )
+        html = (f"<html><head><title>Synthetic {count}</title><style>p {{margin: 0}}</style></head><body>"
+                f"{BOILERPLATE_HTML}<main><article><h1>Synthetic article</h1>{sections}</article></main>{FOOTER_HTML}"
+                f"</body></html>")
+        pages.append((f"synthetic_{count}.html", html))
+    return pages
+
+
+def load_corpus(folder):
+    pages = []
+    if os.path.isdir(folder):
+        for name in sorted(os.listdir(folder)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(folder, name), "r", encoding="utf-8", errors="replace") as f:
+                    pages.append((name, f.read()))
+    return pages
+
+
+def save_pages(urls, folder):
+    from http_fetcher import get_http_fetcher
+
+    os.makedirs(folder, exist_ok=True)
+    for url in urls:
+        result = get_http_fetcher().fetch(url)
+        if not result.ok:
+            logging.warning(f"Skipping {url}: status {result.status_code}")
+            continue
+        name = re.sub(r"[^A-Za-z0-9.-]+", "_", url.split("://", 1)[-1]).strip("_")[:120] + ".html"
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+            f.write(result.text)
+        logging.info(f"Saved {url} as {name}")
+
+
+def bs4_text(html):
+    # What WebsiteScraper returned before chunked extraction: the whole page's text.
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
+
+
+def extraction_methods(token_budget):
+    methods = {}
+    try:
+        import bs4  # noqa: F401
+        methods["bs4 get_text"] = lambda html: (count_tokens(bs4_text(html)),) * 2
+    except ImportError:
+        pass
+    for backend in available_backends():
+        def run(html, backend=backend):
+            chunks = extract_chunks(html, backend=backend)
+            return sum(chunk["tokens"] for chunk in chunks), sum(chunk["tokens"] for chunk in select_chunks(chunks, token_budget))
+        methods[f"chunks ({backend})"] = run
+    return methods
+
+
+def run_extraction_benchmark(pages, repeats=5, token_budget=Config.SCRAPE_TOKEN_BUDGET):
+    # Median time per page over repeats, plus the tokens extracted and the tokens that would go into the prompt.
+    results = {}
+    for method, run in extraction_methods(token_budget).items():
+        per_page = []
+        for name, html in pages:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                content_tokens, prompt_tokens = run(html)
+                timings.append(time.perf_counter() - start)
+            per_page.append({"page": name, "html_kb": len(html.encode("utf-8")) / 1024,
+                             "ms": statistics.median(timings) * 1000,
+                             "content_tokens": content_tokens, "prompt_tokens": prompt_tokens})
+        total_mb = sum(page["html_kb"] for page in per_page) / 1024
+        total_seconds = sum(page["ms"] for page in per_page) / 1000
+        latencies = [page["ms"] for page in per_page]
+        results[method] = {
+            "pages": len(per_page),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "mb_per_second": total_mb / total_seconds if total_seconds else None,
+            "content_tokens_mean": statistics.mean(page["content_tokens"] for page in per_page),
+            "prompt_tokens_mean": statistics.mean(page["prompt_tokens"] for page in per_page),
+            "per_page": per_page,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse time and output size of HTML content extraction on a corpus of saved pages.")
+    parser.add_argument("--corpus", default="html_corpus", help="folder of saved .html pages (synthetic pages are used if empty)")
+    parser.add_argument("--fetch", nargs="*", default=[], metavar="URL", help="save these pages into the corpus first")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--token-budget", type=int, default=Config.SCRAPE_TOKEN_BUDGET)
+    parser.add_argument("--output", default="extraction_results.json")
+    args = parser.parse_args()
+
+    if args.fetch:
+        save_pages(args.fetch, args.corpus)
+    pages = load_corpus(args.corpus)
+    if not pages:
+        logging.info(f"No pages in {args.corpus}, using the synthetic corpus")
+        pages = synthetic_corpus()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = run_extraction_benchmark(pages, args.repeats, args.token_budget)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'method':<22}{'pages':>7}{'p50 ms':>10}{'p95 ms':>10}{'MB/s':>8}{'content tok':>13}{'prompt tok':>12}")
+    for method, summary in results.items():
+        print(f"{method:<22}{summary['pages']:>7}{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}"
+              f"{summary['mb_per_second'] or 0:>8.2f}{summary['content_tokens_mean']:>13.0f}{summary['prompt_tokens_mean']:>12.0f}")
+    print(f"Results written to {args.output}")
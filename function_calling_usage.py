@@ -1,60 +1,196 @@
-from load_client import load_client
-from config import Config
-from image_vision_usage import generate_image_vision_text
-from google_search_return_urls import google_search
-from website_scraper import WebsiteScraper
-from autogen_code_handler import AutogenCodeHandler
-import json
-import logging
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-client = load_client()
-autogen_handler = AutogenCodeHandler()
-
-def function_calling_usage(user_prompt):
-    with open('tools_functions.json', 'r') as f:
-        tools = json.load(f)
-
-    try:
-        response = client.chat.completions.create(
-            model=Config.text_gen_funct_call_model,
-            messages=[{"role": "user", "content": user_prompt}],
-            tools=tools,
-            tool_choice="auto"
-        )
-
-        if response.choices[0].message.tool_calls:
-            for tool_call in response.choices[0].message.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-
-                logging.info(f"Function called: {function_name}")
-                logging.info(f"Function arguments: {function_args}")
-
-                if function_name == "google_search":
-                    search_results = google_search(function_args["query"])
-                    return f"Search results for '{function_args['query']}': {search_results}"
-                elif function_name == "scrape_website":
-                    scraper = WebsiteScraper()
-                    content = scraper.scrape(function_args["url"])
-                    if content:
-                        return f"Content from {function_args['url']}: {content}"
-                    else:
-                        return f"Failed to scrape content from {function_args['url']}"
-                elif function_name == "analyze_and_improve_code":
-                    analysis = autogen_handler.analyze_and_improve_code(function_args["code"])
-                    return f"Code analysis and improvement suggestions:\n{analysis}"
-                elif function_name == "test_code":
-                    test_results = autogen_handler.test_code(function_args["code"])
-                    return f"Code test results:\n{test_results}"
-                elif function_name == "debug_code":
-                    debug_result = autogen_handler.debug_code(function_args["code"], function_args["error_message"])
-                    return f"Code debugging results:\n{debug_result}"
-                else:
-                    return f"Unknown function: {function_name}"
-        else:
-            return response.choices[0].message.content
-    except Exception as e:
-        logging.error(f"Error in function_calling_usage: {str(e)}")
-        return f"An error occurred: {str(e)}"
\ No newline at end of file
+from load_client import get_client, get_async_client
+from config import Config
+from tool_registry import get_tool_registry
+from metrics import StreamMetrics, stream_metrics
+from rate_limited_client import LLMError
+from model_router import model_router, routed_completion, arouted_completion
+from types import SimpleNamespace
+import logging
+import time
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def assistant_message(message):
+    return {
+        "role": "assistant",
+        "content": message.content or "",
+        "tool_calls": [
+            {
+                "id": tool_call.id,
+                "type": "function",
+                "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments},
+            }
+            for tool_call in message.tool_calls
+        ],
+    }
+
+class StreamAccumulator:
+    # Rebuilds a complete assistant message from streamed deltas; tool call names, ids and
+    # argument fragments arrive spread over many chunks keyed by the tool call index.
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.content_parts = []
+        self.tool_calls = {}
+
+    def add(self, chunk):
+        usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+        self.metrics.on_usage(usage)
+        if not chunk.choices:
+            return ""
+        delta = chunk.choices[0].delta
+        for tool_call in delta.tool_calls or []:
+            entry = self.tool_calls.setdefault(tool_call.index, {"id": None, "name": "", "arguments": ""})
+            if tool_call.id:
+                entry["id"] = tool_call.id
+            if tool_call.function is not None:
+                if tool_call.function.name:
+                    entry["name"] += tool_call.function.name
+                if tool_call.function.arguments:
+                    entry["arguments"] += tool_call.function.arguments
+        text = delta.content or ""
+        if text:
+            self.metrics.on_token(text)
+            self.content_parts.append(text)
+        return text
+
+    def message(self):
+        tool_calls = [
+            SimpleNamespace(id=entry["id"], function=SimpleNamespace(name=entry["name"], arguments=entry["arguments"]))
+            for _, entry in sorted(self.tool_calls.items())
+        ]
+        return SimpleNamespace(content="".join(self.content_parts), tool_calls=tool_calls)
+
+def note_route(routes, task, model):
+    # Callers pass a list to learn which model wrote the answer, so its grade can be credited to that route.
+    if routes is not None:
+        routes.append((task, model))
+
+# Steps that offer tools go to the tool_routing model when the task accepts that model's answer as well (see
+# ModelRouter.choose_step), else to the task's model. Either way a plain answer from a step is the answer.
+def function_calling_usage(user_prompt, max_steps=Config.MAX_TOOL_STEPS, history=None, task="final_answer",
+                           quality_floor=None, routes=None):
+    registry = get_tool_registry()
+    messages = list(history or []) + [{"role": "user", "content": user_prompt}]
+
+    try:
+        for _ in range(max_steps):
+            route, model = model_router.choose_step(task, messages, quality_floor)
+            response = routed_completion(
+                get_client(), route,
+                model=model,
+                messages=messages,
+                tools=registry.schemas,
+                tool_choice="auto"
+            )
+            message = response.choices[0].message
+            if not message.tool_calls:
+                note_route(routes, task, model)
+                return message.content
+            messages.append(assistant_message(message))
+            messages.extend(registry.run_tool_calls(message.tool_calls))
+
+        # Out of tool steps: answer from what has been gathered so far.
+        model = model_router.choose(task, messages, quality_floor)
+        response = routed_completion(get_client(), task, model=model, messages=messages)
+        note_route(routes, task, model)
+        return response.choices[0].message.content
+    except LLMError as e:
+        # Typed errors reach the caller instead of posing as the model's answer.
+        logging.error(f"Error in function_calling_usage: {str(e)}")
+        raise
+
+async def async_function_calling_usage(user_prompt, max_steps=Config.MAX_TOOL_STEPS, history=None, task="final_answer",
+                                       quality_floor=None, routes=None):
+    registry = get_tool_registry()
+    messages = list(history or []) + [{"role": "user", "content": user_prompt}]
+
+    try:
+        for _ in range(max_steps):
+            route, model = model_router.choose_step(task, messages, quality_floor)
+            response = await arouted_completion(
+                get_async_client(), route,
+                model=model,
+                messages=messages,
+                tools=registry.schemas,
+                tool_choice="auto"
+            )
+            message = response.choices[0].message
+            if not message.tool_calls:
+                note_route(routes, task, model)
+                return message.content
+            messages.append(assistant_message(message))
+            messages.extend(await registry.arun_tool_calls(message.tool_calls))
+
+        model = model_router.choose(task, messages, quality_floor)
+        response = await arouted_completion(get_async_client(), task, model=model, messages=messages)
+        note_route(routes, task, model)
+        return response.choices[0].message.content
+    except LLMError as e:
+        logging.error(f"Error in async_function_calling_usage: {str(e)}")
+        raise
+
+def stream_function_calling_usage(user_prompt, max_steps=Config.MAX_TOOL_STEPS, stage="answer", history=None,
+                                  task="final_answer", quality_floor=None, routes=None):
+    registry = get_tool_registry()
+    messages = list(history or []) + [{"role": "user", "content": user_prompt}]
+
+    try:
+        for step in range(max_steps + 1):
+            if step < max_steps:
+                route, model = model_router.choose_step(task, messages, quality_floor)
+            else:
+                route, model = task, model_router.choose(task, messages, quality_floor)
+            request = {"model": model, "messages": messages, "stream": True}
+            if step < max_steps:
+                request.update(tools=registry.schemas, tool_choice="auto")
+            accumulator = StreamAccumulator(StreamMetrics(model, stage, stream_metrics))
+            start = time.perf_counter()
+            for chunk in get_client().chat.completions.create(**request):
+                text = accumulator.add(chunk)
+                if text:
+                    yield text
+            accumulator.metrics.finish()
+            model_router.record(route, model, time.perf_counter() - start)
+
+            message = accumulator.message()
+            if not message.tool_calls:
+                note_route(routes, task, model)
+                return
+            messages.append(assistant_message(message))
+            messages.extend(registry.run_tool_calls(message.tool_calls))
+    except LLMError as e:
+        logging.error(f"Error in stream_function_calling_usage: {str(e)}")
+        raise
+
+async def astream_function_calling_usage(user_prompt, max_steps=Config.MAX_TOOL_STEPS, stage="answer", history=None,
+                                         task="final_answer", quality_floor=None, routes=None):
+    registry = get_tool_registry()
+    messages = list(history or []) + [{"role": "user", "content": user_prompt}]
+
+    try:
+        for step in range(max_steps + 1):
+            if step < max_steps:
+                route, model = model_router.choose_step(task, messages, quality_floor)
+            else:
+                route, model = task, model_router.choose(task, messages, quality_floor)
+            request = {"model": model, "messages": messages, "stream": True}
+            if step < max_steps:
+                request.update(tools=registry.schemas, tool_choice="auto")
+            accumulator = StreamAccumulator(StreamMetrics(model, stage, stream_metrics))
+            start = time.perf_counter()
+            async for chunk in await get_async_client().chat.completions.create(**request):
+                text = accumulator.add(chunk)
+                if text:
+                    yield text
+            accumulator.metrics.finish()
+            model_router.record(route, model, time.perf_counter() - start)
+
+            message = accumulator.message()
+            if not message.tool_calls:
+                note_route(routes, task, model)
+                return
+            messages.append(assistant_message(message))
+            messages.extend(await registry.arun_tool_calls(message.tool_calls))
+    except LLMError as e:
+        logging.error(f"Error in astream_function_calling_usage: {str(e)}")
+        raise
\ No newline at end of file
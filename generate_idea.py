@@ -1,112 +1,259 @@
-import re
-import os
-from textblob import TextBlob
-from chat_flow import ChatFlow
-
-CONSTRAINTS = """
-* Must be created in Python code and runnable on any PC.
-* Must not use credentials ever or it can create its own credentials on its own autonomously.
-* Must not cost anything to start at all.
-* Can't rely on selling stuff that a person "already" has on hand.
-* Can't rely on cash or trading stocks/crypto as that requires capital.
-* Must be UBI (Universal Basic Income) temporary solutions for masses so it can't be saturated or able to be saturated.
-"""
-
-class IdeaGenerator:
-    def __init__(self):
-        self.chat_flow = ChatFlow()
-        self.best_idea = None
-        self.best_score = 0
-
-    def analyze_sentiment(self, text):
-        blob = TextBlob(text)
-        return blob.sentiment.polarity
-
-    def extract_overall_score(self, evaluation):
-        match = re.search(r"Overall score: (\d+(\.\d+)?)", evaluation)
-        return float(match.group(1)) if match else 0
-
-    def extract_improvement_suggestions(self, evaluation):
-        match = re.search(r"Improvement suggestions:(.*?)(?=\n\n|\Z)", evaluation, re.DOTALL)
-        return match.group(1).strip() if match else ""
-
-    def generate_idea(self, is_refinement=False):
-        if is_refinement:
-            improvement_suggestions = self.extract_improvement_suggestions(
-                self.chat_flow.chat(f"Evaluate the following idea:\n{self.best_idea}")
-            )
-            prompt = f"Refine this idea based on these suggestions:\n{self.best_idea}\n\nSuggestions:{improvement_suggestions}"
-        else:
-            prompt = f"""Generate an innovative idea for a Universal Basic Income (UBI) temporary solution that meets the following constraints:
-
-            {CONSTRAINTS}
-
-            The idea should leverage technology, particularly Python, to create a solution that can help people generate basic income without requiring initial capital or resources. Focus on digital solutions that can be easily distributed and scaled.
-            """
-
-        idea = self.chat_flow.chat(prompt)
-        sentiment = self.analyze_sentiment(idea)
-        evaluation = self.chat_flow.chat(f"Evaluate this idea:\n{idea}")
-        overall_score = self.extract_overall_score(evaluation)
-
-        return idea, sentiment, evaluation, overall_score
-
-    def save_idea(self, idea, evaluation, score, sentiment, iteration):
-        folder = "generated_ideas"
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-        
-        filename = f"{folder}/idea_{iteration:03d}_score_{score:.2f}.txt"
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"Idea:\n{idea}\n\nEvaluation:\n{evaluation}\n\nOverall Score: {score:.2f}\nSentiment: {sentiment:.2f}")
-
-    def generate_python_prototype(self):
-        prompt = f"Generate a Python prototype for this idea:\n{self.best_idea}"
-        prototype = self.chat_flow.chat(prompt)
-        
-        with open("generated_ideas/best_idea_prototype.py", "w", encoding="utf-8") as f:
-            f.write(prototype)
-        
-        return prototype
-
-    def gen_idea_loop(self, max_iterations=20, refinement_threshold=7.5, excellent_idea_threshold=8.0):
-        for iteration in range(1, max_iterations + 1):
-            try:
-                idea, sentiment, evaluation, overall_score = self.generate_idea(
-                    is_refinement=(iteration > 1 and self.best_score >= refinement_threshold)
-                )
-
-                print(f"\n{'Refined' if iteration > 1 else 'Generated'} idea {iteration}:\n{idea}")
-                print(f"Sentiment score: {sentiment:.2f}")
-                print(f"Idea evaluation:\n{evaluation}")
-
-                self.save_idea(idea, evaluation, overall_score, sentiment, iteration)
-
-                if overall_score > self.best_score:
-                    self.best_idea = idea
-                    self.best_score = overall_score
-                    print(f"New best idea! Score: {self.best_score:.2f}")
-
-                if overall_score >= excellent_idea_threshold and sentiment > 0.5:
-                    print(f"Excellent idea found after {iteration} iterations!")
-                    break
-
-            except Exception as e:
-                print(f"Error occurred during iteration {iteration}: {e}")
-                continue
-
-        print(f"\nBest idea found after {iteration} iterations:")
-        print(self.best_idea)
-        print(f"Best idea score: {self.best_score:.2f}")
-
-        try:
-            print("\nGenerating Python prototype for the best idea...")
-            prototype = self.generate_python_prototype()
-            print("\nPython Prototype:")
-            print(prototype)
-        except Exception as e:
-            print(f"Error generating or saving prototype: {e}")
-
-if __name__ == "__main__":
-    idea_generator = IdeaGenerator()
-    idea_generator.gen_idea_loop()
\ No newline at end of file
+import argparse
+import asyncio
+import re
+import os
+from datetime import datetime
+from chat_flow import ChatFlow, run_sync
+from config import Config
+from idea_store import get_idea_store, idea_text
+
+CONSTRAINTS = """
+* Must be created in Python code and runnable on any PC.
+* Must not use credentials ever or it can create its own credentials on its own autonomously.
+* Must not cost anything to start at all.
+* Can't rely on selling stuff that a person "already" has on hand.
+* Can't rely on cash or trading stocks/crypto as that requires capital.
+* Must be UBI (Universal Basic Income) temporary solutions for masses so it can't be saturated or able to be saturated.
+"""
+
+IDEA_PROMPT = f"""Generate an innovative idea for a Universal Basic Income (UBI) temporary solution that meets the following constraints:
+
+            {CONSTRAINTS}
+
+            The idea should leverage technology, particularly Python, to create a solution that can help people generate basic income without requiring initial capital or resources. Focus on digital solutions that can be easily distributed and scaled.
+            """
+
+# Fresh candidates of one population start from different directions so they do not all converge on the same idea.
+SEARCH_ANGLES = [
+    "micro-tasks and crowdsourced data work",
+    "education and tutoring",
+    "open-source software and maintenance bounties",
+    "local community services",
+    "content creation and curation",
+    "accessibility and assistive tools",
+    "research and citizen science",
+    "skills exchange and mentoring",
+]
+
+class CallBudget:
+    # Caps the total number of ChatFlow chats a search may make; each candidate reserves its chats up front.
+    def __init__(self, total):
+        self.total = total
+        self.used = 0
+
+    def reserve(self, calls):
+        if self.used + calls > self.total:
+            return False
+        self.used += calls
+        return True
+
+    def refund(self, calls):
+        self.used -= calls
+
+class IdeaGenerator:
+    def __init__(self, run_id=None):
+        from idea_index import IdeaIndex
+
+        self.chat_flow = ChatFlow()
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.idea_store = get_idea_store()
+        self.best_idea = None
+        self.best_score = 0
+        # Every evaluated idea is indexed, so near-duplicates reuse an earlier evaluation instead of a new chat.
+        self.idea_index = IdeaIndex()
+
+    def analyze_sentiment(self, text):
+        from textblob import TextBlob
+        blob = TextBlob(text)
+        return blob.sentiment.polarity
+
+    def extract_overall_score(self, evaluation):
+        match = re.search(r"Overall score: (\d+(\.\d+)?)", evaluation)
+        return float(match.group(1)) if match else 0
+
+    def extract_improvement_suggestions(self, evaluation):
+        match = re.search(r"Improvement suggestions:(.*?)(?=\n\n|\Z)", evaluation, re.DOTALL)
+        return match.group(1).strip() if match else ""
+
+    def known_evaluation(self, idea):
+        duplicate = self.idea_index.find_duplicate(idea)
+        if duplicate is None:
+            return None
+        print(f"Near-duplicate of idea #{duplicate['id']} (similarity {duplicate['similarity']:.2f}), reusing its evaluation")
+        return duplicate
+
+    def remember_evaluation(self, idea, evaluation, score):
+        self.idea_index.add(idea, evaluation=evaluation, score=score)
+
+    def generate_idea(self, is_refinement=False):
+        # Returns (idea, sentiment, evaluation, overall_score, is_duplicate).
+        if is_refinement:
+            known = self.known_evaluation(self.best_idea)
+            evaluation = known["evaluation"] if known else self.chat_flow.chat(f"Evaluate the following idea:\n{self.best_idea}")
+            improvement_suggestions = self.extract_improvement_suggestions(evaluation)
+            prompt = f"Refine this idea based on these suggestions:\n{self.best_idea}\n\nSuggestions:{improvement_suggestions}"
+        else:
+            prompt = IDEA_PROMPT
+
+        idea = self.chat_flow.chat(prompt)
+        sentiment = self.analyze_sentiment(idea)
+        known = self.known_evaluation(idea)
+        if known:
+            return idea, sentiment, known["evaluation"], known["score"], True
+        evaluation = self.chat_flow.chat(f"Evaluate this idea:\n{idea}")
+        overall_score = self.extract_overall_score(evaluation)
+        self.remember_evaluation(idea, evaluation, overall_score)
+
+        return idea, sentiment, evaluation, overall_score, False
+
+    async def agenerate_candidate(self, semaphore, budget, parent=None, angle=None):
+        # One candidate of a population: its own ChatFlow, so concurrent candidates never share history.
+        # Refinements reuse the parent's evaluation instead of asking for a new one.
+        chat_flow = ChatFlow()
+
+        async def chat(prompt):
+            async with semaphore:
+                return await chat_flow.achat(prompt)
+
+        if parent is not None:
+            suggestions = self.extract_improvement_suggestions(parent["evaluation"])
+            prompt = f"Refine this idea based on these suggestions:\n{parent['idea']}\n\nSuggestions:{suggestions}"
+        else:
+            prompt = IDEA_PROMPT + (f"\nExplore this direction: {angle}." if angle else "")
+
+        idea = await chat(prompt)
+        sentiment = self.analyze_sentiment(idea)
+        known = self.known_evaluation(idea)
+        if known:
+            budget.refund(1)
+            return {"idea": idea, "sentiment": sentiment, "evaluation": known["evaluation"], "score": known["score"], "duplicate": True}
+        evaluation = await chat(f"Evaluate this idea:\n{idea}")
+        score = self.extract_overall_score(evaluation)
+        self.remember_evaluation(idea, evaluation, score)
+        return {"idea": idea, "sentiment": sentiment, "evaluation": evaluation, "score": score, "duplicate": False}
+
+    def save_idea(self, idea, evaluation, score, sentiment, iteration):
+        folder = "generated_ideas"
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        
+        self.idea_store.add(idea, evaluation, score, sentiment, iteration, run_id=self.run_id)
+        filename = f"{folder}/idea_{iteration:03d}_score_{score:.2f}.txt"
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(idea_text(idea, evaluation, score, sentiment))
+
+    def generate_python_prototype(self):
+        prompt = f"Generate a Python prototype for this idea:\n{self.best_idea}"
+        prototype = self.chat_flow.chat(prompt)
+        
+        with open("generated_ideas/best_idea_prototype.py", "w", encoding="utf-8") as f:
+            f.write(prototype)
+        
+        return prototype
+
+    def report_best(self, iterations, unit="iterations"):
+        print(f"\nBest idea found after {iterations} {unit}:")
+        print(self.best_idea)
+        print(f"Best idea score: {self.best_score:.2f}")
+
+        try:
+            print("\nGenerating Python prototype for the best idea...")
+            prototype = self.generate_python_prototype()
+            print("\nPython Prototype:")
+            print(prototype)
+        except Exception as e:
+            print(f"Error generating or saving prototype: {e}")
+
+    async def apopulation_search(self, population_size=Config.IDEA_POPULATION_SIZE, beam_width=Config.IDEA_BEAM_WIDTH,
+                                 max_rounds=Config.IDEA_MAX_ROUNDS, max_concurrency=Config.IDEA_MAX_CONCURRENCY,
+                                 call_budget=Config.IDEA_CALL_BUDGET, excellent_idea_threshold=8.0):
+        # Beam search over ideas: every round evaluates up to population_size candidates concurrently, then the
+        # beam_width best ideas seen so far are each refined into the next round's candidates. Returns the number
+        # of rounds run.
+        semaphore = asyncio.Semaphore(max_concurrency)
+        budget = CallBudget(call_budget)
+        beam = []
+        saved = 0
+        rounds = 0
+        for round_number in range(1, max_rounds + 1):
+            if beam:
+                parents = [beam[i % len(beam)] for i in range(population_size)]
+                jobs = [self.agenerate_candidate(semaphore, budget, parent=parent) for parent in parents if budget.reserve(2)]
+            else:
+                angles = [SEARCH_ANGLES[i % len(SEARCH_ANGLES)] for i in range(population_size)]
+                jobs = [self.agenerate_candidate(semaphore, budget, angle=angle) for angle in angles if budget.reserve(2)]
+            if not jobs:
+                print(f"Call budget of {call_budget} chats used up before round {round_number}")
+                break
+
+            results = await asyncio.gather(*jobs, return_exceptions=True)
+            rounds = round_number
+            candidates = []
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"Error occurred while generating a candidate in round {round_number}: {result}")
+                    continue
+                if result["duplicate"]:
+                    continue
+                saved += 1
+                self.save_idea(result["idea"], result["evaluation"], result["score"], result["sentiment"], saved)
+                candidates.append(result)
+
+            beam = sorted(beam + candidates, key=lambda candidate: candidate["score"], reverse=True)[:beam_width]
+            if beam and beam[0]["score"] > self.best_score:
+                self.best_idea = beam[0]["idea"]
+                self.best_score = beam[0]["score"]
+                print(f"New best idea in round {round_number}! Score: {self.best_score:.2f}")
+            print(f"Round {round_number}: {len(candidates)} candidates, beam scores "
+                  f"{[round(candidate['score'], 2) for candidate in beam]}, {budget.used}/{call_budget} chats used")
+
+            if any(c["score"] >= excellent_idea_threshold and c["sentiment"] > 0.5 for c in candidates):
+                print(f"Excellent idea found in round {round_number}!")
+                break
+        return rounds
+
+    def gen_idea_population_search(self, **kwargs):
+        rounds = run_sync(self.apopulation_search(**kwargs))
+        self.report_best(rounds, "rounds")
+
+    def gen_idea_loop(self, max_iterations=20, refinement_threshold=7.5, excellent_idea_threshold=8.0):
+        for iteration in range(1, max_iterations + 1):
+            try:
+                idea, sentiment, evaluation, overall_score, is_duplicate = self.generate_idea(
+                    is_refinement=(iteration > 1 and self.best_score >= refinement_threshold)
+                )
+                if is_duplicate:
+                    continue
+
+                print(f"\n{'Refined' if iteration > 1 else 'Generated'} idea {iteration}:\n{idea}")
+                print(f"Sentiment score: {sentiment:.2f}")
+                print(f"Idea evaluation:\n{evaluation}")
+
+                self.save_idea(idea, evaluation, overall_score, sentiment, iteration)
+
+                if overall_score > self.best_score:
+                    self.best_idea = idea
+                    self.best_score = overall_score
+                    print(f"New best idea! Score: {self.best_score:.2f}")
+
+                if overall_score >= excellent_idea_threshold and sentiment > 0.5:
+                    print(f"Excellent idea found after {iteration} iterations!")
+                    break
+
+            except Exception as e:
+                print(f"Error occurred during iteration {iteration}: {e}")
+                continue
+
+        self.report_best(iteration)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate and refine UBI ideas.")
+    parser.add_argument("--population", action="store_true", help="parallel beam search instead of the sequential loop")
+    parser.add_argument("--run-id", help="tags the ideas of this run in the idea store; defaults to a timestamp")
+    args = parser.parse_args()
+
+    idea_generator = IdeaGenerator(run_id=args.run_id)
+    if args.population:
+        idea_generator.gen_idea_population_search()
+    else:
+        idea_generator.gen_idea_loop()
\ No newline at end of file
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import re
+from config import Config
+from load_client import get_client, get_async_client
+from model_router import model_router, routed_completion, arouted_completion
+from rate_limited_client import LLMError
+from token_utils import count_tokens, truncate_to_tokens
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SCORE_PATTERN = re.compile(r"(?:score|grade)\W{0,3}(\d+(?:\.\d+)?)(?:\s*/\s*10)?", re.IGNORECASE)
+
+GRADES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "grades": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "score": {"type": "number", "minimum": 0, "maximum": 10},
+                    "critique": {"type": "string"},
+                },
+                "required": ["id", "score", "critique"],
+            },
+        }
+    },
+    "required": ["grades"],
+}
+
+SYSTEM_PROMPT = f"""You grade assistant responses.
+For every item, judge how well the response gives the user what they were looking for.
+Score each item from 0 (useless) to 10 (excellent) and give a short critique saying what to improve.
+Reply with a single JSON object matching this schema and nothing else:
+{json.dumps(GRADES_SCHEMA)}
+Return exactly one grade per item id."""
+
+# Tokens reserved per item for the grade the model writes back.
+OUTPUT_TOKENS_PER_ITEM = 120
+
+
+def normalize_score(score):
+    return max(0.0, min(10.0, float(score)))
+
+
+def parse_grade(text):
+    # Models sometimes wrap the JSON in prose or code fences; fall back to a "score: N" pattern.
+    text = text or ""
+    score = None
+    critique = text.strip()
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+            if "grades" in data and data["grades"]:
+                data = data["grades"][0]
+            score = float(data["score"])
+            critique = str(data.get("critique", "")).strip()
+        except (ValueError, KeyError, TypeError):
+            score = None
+    if score is None:
+        match = SCORE_PATTERN.search(text)
+        if match:
+            score = float(match.group(1))
+    return {"score": normalize_score(score) if score is not None else None, "critique": critique}
+
+
+def missing_grade(reason):
+    return {"score": None, "critique": reason}
+
+
+def not_graded(reason):
+    # The grader could not be reached (rate limit, open breaker, ...). Unlike a missing grade this says nothing about
+    # the answer, so the reflection policy does not regenerate on it.
+    return {"score": None, "critique": reason, "graded": False}
+
+
+class GradingEngine:
+    # model=None lets the router pick the grading model per batch (see model_router.ROUTE_PROFILES).
+    def __init__(self, model=None, batch_token_budget=Config.GRADING_BATCH_TOKEN_BUDGET,
+                 max_batch_items=Config.GRADING_MAX_BATCH_ITEMS, item_token_limit=Config.GRADING_ITEM_TOKEN_LIMIT):
+        self.model = model
+        self.batch_token_budget = batch_token_budget
+        self.max_batch_items = max_batch_items
+        self.item_token_limit = item_token_limit
+        self.calls = 0
+
+    def _items(self, pairs):
+        # Long prompts/responses are clipped so one item can never blow the batch budget on its own.
+        half = self.item_token_limit // 2
+        return [
+            {"id": index, "prompt": truncate_to_tokens(prompt, half), "response": truncate_to_tokens(response or "", half)}
+            for index, (prompt, response) in enumerate(pairs)
+        ]
+
+    def chunk(self, items):
+        chunks = []
+        current = []
+        current_tokens = count_tokens(SYSTEM_PROMPT)
+        for item in items:
+            item_tokens = count_tokens(json.dumps(item)) + OUTPUT_TOKENS_PER_ITEM
+            if current and (current_tokens + item_tokens > self.batch_token_budget or len(current) >= self.max_batch_items):
+                chunks.append(current)
+                current = []
+                current_tokens = count_tokens(SYSTEM_PROMPT)
+            current.append(item)
+            current_tokens += item_tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _request(self, chunk):
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps({"items": chunk})},
+        ]
+        return {
+            "model": self.model or model_router.choose("grading", messages),
+            "messages": messages,
+            "temperature": 0,
+            "response_format": {"type": "json_object"},
+            "max_tokens": OUTPUT_TOKENS_PER_ITEM * len(chunk) + 64,
+        }
+
+    def _parse(self, text, chunk):
+        ids = {item["id"] for item in chunk}
+        grades = {}
+        try:
+            data = json.loads(text or "")
+        except json.JSONDecodeError:
+            logging.error("Grader returned invalid JSON")
+            return grades
+        for entry in data.get("grades", []) if isinstance(data, dict) else []:
+            try:
+                grade_id = int(entry["id"])
+                if grade_id in ids:
+                    grades[grade_id] = {"score": normalize_score(entry["score"]), "critique": str(entry.get("critique", "")).strip()}
+            except (KeyError, TypeError, ValueError):
+                continue
+        return grades
+
+    def _unavailable(self, chunk, error):
+        # The client has already retried; asking again for these items would only add load.
+        logging.error(f"Grading batch failed: {str(error)}")
+        return {item["id"]: not_graded(f"Grader unavailable: {type(error).__name__}") for item in chunk}
+
+    def _grade_chunk(self, chunk):
+        self.calls += 1
+        try:
+            response = routed_completion(get_client(), "grading", **self._request(chunk))
+        except LLMError as e:
+            return self._unavailable(chunk, e)
+        return self._parse(response.choices[0].message.content, chunk)
+
+    async def _agrade_chunk(self, chunk):
+        self.calls += 1
+        try:
+            response = await arouted_completion(get_async_client(), "grading", **self._request(chunk))
+        except LLMError as e:
+            return self._unavailable(chunk, e)
+        return self._parse(response.choices[0].message.content, chunk)
+
+    def grade_batch(self, pairs):
+        items = self._items(pairs)
+        grades = {}
+        for chunk in self.chunk(items):
+            grades.update(self._grade_chunk(chunk))
+        # Items the model skipped get one more try in their own, smaller batch.
+        missing = [item for item in items if item["id"] not in grades]
+        for chunk in self.chunk(missing):
+            grades.update(self._grade_chunk(chunk))
+        return [grades.get(index, missing_grade("Grader returned no result")) for index in range(len(pairs))]
+
+    async def agrade_batch(self, pairs, max_concurrency=Config.GRADING_MAX_CONCURRENCY):
+        items = self._items(pairs)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(chunk):
+            async with semaphore:
+                return await self._agrade_chunk(chunk)
+
+        grades = {}
+        for result in await asyncio.gather(*(run(chunk) for chunk in self.chunk(items))):
+            grades.update(result)
+        missing = [item for item in items if item["id"] not in grades]
+        for result in await asyncio.gather(*(run(chunk) for chunk in self.chunk(missing))):
+            grades.update(result)
+        return [grades.get(index, missing_grade("Grader returned no result")) for index in range(len(pairs))]
+
+    def grade(self, user_prompt, assistant_response):
+        return self.grade_batch([(user_prompt, assistant_response)])[0]
+
+    async def agrade(self, user_prompt, assistant_response):
+        return (await self.agrade_batch([(user_prompt, assistant_response)]))[0]
+
+
+grading_engine = GradingEngine()
@@ -0,0 +1,145 @@
+import logging
+import re
+import threading
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Markers of client-rendered pages whose HTML is an empty shell until JavaScript runs.
+SPA_ROOT_PATTERN = re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.IGNORECASE)
+NOSCRIPT_PATTERN = re.compile(r'<noscript[^>]*>[^<]*(enable|requires?)\s+javascript', re.IGNORECASE)
+SCRIPT_PATTERN = re.compile(r'<script\b[^>]*>.*?</script>|<style\b[^>]*>.*?</style>', re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def _accept_encoding():
+    try:
+        import brotli  # noqa: F401  (urllib3 decodes br responses when brotli is installed)
+        return "gzip, deflate, br"
+    except ImportError:
+        return "gzip, deflate"
+
+
+def needs_javascript(html, min_text_chars=Config.HTTP_MIN_TEXT_CHARS):
+    if SPA_ROOT_PATTERN.search(html) or NOSCRIPT_PATTERN.search(html):
+        return True
+    visible_text = TAG_PATTERN.sub(" ", SCRIPT_PATTERN.sub(" ", html))
+    return len(" ".join(visible_text.split())) < min_text_chars
+
+
+class FetchResult:
+    def __init__(self, url, status_code, text=None, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    @property
+    def not_modified(self):
+        return self.status_code == 304
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 300
+
+    @property
+    def is_html(self):
+        return "html" in self.headers.get("Content-Type", "").lower()
+
+    @property
+    def validators(self):
+        validators = {}
+        if self.headers.get("ETag"):
+            validators["etag"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            validators["last_modified"] = self.headers["Last-Modified"]
+        return validators or None
+
+
+class HTTPFetcher:
+    def __init__(self, max_hosts=Config.HTTP_POOL_HOSTS, max_connections_per_host=Config.HTTP_MAX_CONNECTIONS_PER_HOST,
+                 connect_timeout=Config.HTTP_CONNECT_TIMEOUT_SECONDS, read_timeout=Config.HTTP_READ_TIMEOUT_SECONDS):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        # pool_block caps concurrent connections per host instead of opening throwaway extras.
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_connections_per_host, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Encoding": _accept_encoding(),
+        })
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def fetch(self, url, validators=None, max_bytes=Config.HTTP_MAX_BODY_BYTES):
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        # Streamed so an oversized page stops downloading at max_bytes instead of being read into memory whole.
+        with self.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304:
+                logging.info(f"Not modified: {url}")
+                return FetchResult(url, 304, headers=response.headers)
+            body = bytearray()
+            for piece in response.iter_content(64 * 1024):
+                body += piece
+                if len(body) >= max_bytes:
+                    logging.info(f"Body of {url} cut at {max_bytes} bytes")
+                    break
+        # Without a charset header requests assumes ISO-8859-1 for text/*; today's pages are far more often UTF-8.
+        charset = "charset" in response.headers.get("Content-Type", "").lower()
+        encoding = response.encoding if charset and response.encoding else "utf-8"
+        try:
+            text = bytes(body[:max_bytes]).decode(encoding, errors="replace")
+        except LookupError:
+            text = bytes(body[:max_bytes]).decode("utf-8", errors="replace")
+        return FetchResult(url, response.status_code, text, response.headers)
+
+    def close(self):
+        self.session.close()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def get_http_fetcher():
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = HTTPFetcher()
+        return _fetcher
+
+
+if __name__ == "__main__":
+    # Local fixture: serve a static page and show that the second fetch revalidates with a 304.
+    import http.server
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "index.html"), "w", encoding="utf-8") as f:
+            f.write("<html><body><p>" + "Static page content. " * 20 + "</p></body></html>")
+
+        handler = lambda *args: http.server.SimpleHTTPRequestHandler(*args, directory=root)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/index.html"
+
+        fetcher = HTTPFetcher()
+        first = fetcher.fetch(url)
+        print(f"First fetch: {first.status_code}, needs JavaScript: {needs_javascript(first.text)}")
+        second = fetcher.fetch(url, first.validators)
+        print(f"Revalidation: {second.status_code} (not modified: {second.not_modified})")
+        server.shutdown()
@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from collections import defaultdict
+import numpy as np
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MAX_HASH = np.uint64(2 ** 64 - 1)
+SPLITMIX_MULTIPLIERS = (np.uint64(0xbf58476d1ce4e5b9), np.uint64(0x94d049bb133111eb))
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text, size=3):
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class IdeaIndex:
+    # MinHash signatures over word 3-grams with LSH banding: a lookup only compares against ideas that share
+    # at least one band bucket, so it stays cheap as the index grows. Estimated Jaccard similarity at or above
+    # `threshold` counts as a near-duplicate. Entries (signature + evaluation) are appended to a JSONL file.
+    def __init__(self, path=Config.IDEA_INDEX_PATH, num_perm=128, bands=16, threshold=Config.IDEA_DUPLICATE_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        # Fixed seed: signatures are persisted, so the permutations must be the same in every process.
+        self._seeds = np.random.default_rng(1).integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._entries = []
+        self._signatures = []
+        self._buckets = defaultdict(list)
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._insert(np.array(entry.pop("signature"), dtype=np.uint64), entry)
+        logging.info(f"Loaded {len(self._entries)} ideas into the duplicate index")
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+        if hashes.size == 0:
+            return np.full(len(self._seeds), MAX_HASH, dtype=np.uint64)
+        # One independent hash per permutation: splitmix64 finalizer over (shingle hash XOR seed), for every
+        # shingle and permutation at once. uint64 multiplication wraps, which the mixer relies on.
+        z = hashes[:, None] ^ self._seeds[None, :]
+        z = (z ^ (z >> np.uint64(30))) * SPLITMIX_MULTIPLIERS[0]
+        z = (z ^ (z >> np.uint64(27))) * SPLITMIX_MULTIPLIERS[1]
+        return (z ^ (z >> np.uint64(31))).min(axis=0)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _insert(self, signature, entry):
+        index = len(self._entries)
+        self._entries.append(entry)
+        self._signatures.append(signature)
+        for key in self._band_keys(signature):
+            self._buckets[key].append(index)
+
+    def find_duplicate(self, text):
+        # Returns the most similar stored entry (with its "similarity") if it is a near-duplicate, else None.
+        signature = self.signature(text)
+        with self._lock:
+            candidates = {index for key in self._band_keys(signature) for index in self._buckets.get(key, ())}
+            if not candidates:
+                return None
+            candidates = sorted(candidates)
+            similarities = (np.stack([self._signatures[i] for i in candidates]) == signature).mean(axis=1)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return dict(self._entries[candidates[best]], similarity=float(similarities[best]))
+
+    def add(self, text, **fields):
+        signature = self.signature(text)
+        with self._lock:
+            entry = dict(fields, id=len(self._entries))
+            self._insert(signature, entry)
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(dict(entry, signature=signature.tolist())) + "\n")
+            return entry["id"]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,179 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+COLUMNS = ("id", "run_id", "iteration", "idea", "evaluation", "score", "sentiment", "created")
+LEGACY_FILE_PATTERN = re.compile(r"idea_(\d+)_score_(\d+\.\d+)\.txt$")
+LEGACY_CONTENT_PATTERN = re.compile(
+    r"Idea:\n(.*?)\n\nEvaluation:\n(.*)\n\nOverall Score: ([\d.]+)\nSentiment: (-?[\d.]+)\s*$", re.DOTALL
+)
+# PRAGMA user_version once the idea_*.txt files have been imported.
+TEXT_FILES_IMPORTED = 1
+
+
+def match_expression(query):
+    # Each word as an FTS5 phrase, so user text ("open-source", quotes, AND/OR/NEAR) is never read as query syntax.
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def idea_text(idea, evaluation, score, sentiment):
+    # Same layout as the idea_*.txt files, so prompts built from stored ideas read like the files did.
+    return f"Idea:\n{idea}\n\nEvaluation:\n{evaluation}\n\nOverall Score: {score:.2f}\nSentiment: {sentiment:.2f}"
+
+
+class IdeaStore:
+    # SQLite table of every saved idea. Top-k by score walks the score index instead of sorting all ideas, run and
+    # iteration filters use their own index, and an FTS5 table (when SQLite has it) serves full-text search.
+    def __init__(self, path=Config.IDEA_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ideas ("
+            "id INTEGER PRIMARY KEY, run_id TEXT, iteration INTEGER, idea TEXT, evaluation TEXT, "
+            "score REAL, sentiment REAL, created REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ideas_score ON ideas (score DESC)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ideas_run ON ideas (run_id, iteration)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ideas_run_score ON ideas (run_id, score DESC)")
+        try:
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS ideas_fts USING fts5(idea, evaluation, content='ideas', content_rowid='id')"
+            )
+            self._db.execute(
+                "CREATE TRIGGER IF NOT EXISTS ideas_fts_insert AFTER INSERT ON ideas BEGIN "
+                "INSERT INTO ideas_fts (rowid, idea, evaluation) VALUES (new.id, new.idea, new.evaluation); END"
+            )
+            self.full_text = True
+        except sqlite3.OperationalError:
+            logging.warning("SQLite was built without FTS5; idea search falls back to LIKE")
+            self.full_text = False
+        self._db.commit()
+
+    def add(self, idea, evaluation, score, sentiment, iteration, run_id=None):
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO ideas (run_id, iteration, idea, evaluation, score, sentiment, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, iteration, idea, evaluation, score, sentiment, time.time())
+            )
+            self._db.commit()
+            return cursor.lastrowid
+
+    def _where(self, run_id=None, iteration=None, min_score=None):
+        clauses, params = [], []
+        for clause, value in (("run_id = ?", run_id), ("iteration = ?", iteration), ("score >= ?", min_score)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _select(self, sql, params):
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    def top(self, k=3, run_id=None, iteration=None, min_score=None):
+        where, params = self._where(run_id, iteration, min_score)
+        return self._select(
+            f"SELECT {', '.join(COLUMNS)} FROM ideas{where} ORDER BY score DESC, id LIMIT ?", params + [k]
+        )
+
+    def ideas(self, run_id=None, iteration=None, min_score=None):
+        where, params = self._where(run_id, iteration, min_score)
+        return self._select(f"SELECT {', '.join(COLUMNS)} FROM ideas{where} ORDER BY id", params)
+
+    def search(self, query, k=10, run_id=None):
+        # Best full-text matches first; without FTS5 a plain substring match ordered by score.
+        if self.full_text:
+            expression = match_expression(query)
+            if not expression:
+                return []
+            where, params = self._where(run_id)
+            where = where.replace(" WHERE ", " AND ")
+            columns = ", ".join(f"ideas.{column}" for column in COLUMNS)
+            return self._select(
+                f"SELECT {columns} FROM ideas_fts JOIN ideas ON ideas.id = ideas_fts.rowid "
+                f"WHERE ideas_fts MATCH ?{where} ORDER BY ideas_fts.rank LIMIT ?", [expression] + params + [k]
+            )
+        where, params = self._where(run_id)
+        where = (where + " AND" if where else " WHERE") + " (idea LIKE ? OR evaluation LIKE ?)"
+        return self._select(
+            f"SELECT {', '.join(COLUMNS)} FROM ideas{where} ORDER BY score DESC LIMIT ?",
+            params + [f"%{query}%", f"%{query}%", k]
+        )
+
+    def runs(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT run_id FROM ideas WHERE run_id IS NOT NULL GROUP BY run_id ORDER BY MIN(id)"
+            )]
+
+    def import_text_files(self, folder="generated_ideas"):
+        # One-off migration of idea_*.txt files written before the store existed, recorded in the database's
+        # user_version. Since then save_idea writes every idea to the store as well as its file, so files whose idea
+        # is already stored are skipped.
+        with self._lock:
+            if self._db.execute("PRAGMA user_version").fetchone()[0] >= TEXT_FILES_IMPORTED:
+                return 0
+        if not os.path.isdir(folder):
+            return 0
+        imported = 0
+        for entry in os.scandir(folder):
+            name_match = LEGACY_FILE_PATTERN.match(entry.name)
+            if not name_match:
+                continue
+            with open(entry.path, "r", encoding="utf-8") as f:
+                content = f.read()
+            content_match = LEGACY_CONTENT_PATTERN.match(content)
+            if content_match:
+                idea, evaluation, score, sentiment = content_match.groups()
+                score, sentiment = float(score), float(sentiment)
+            else:
+                idea, evaluation, score, sentiment = content, "", float(name_match.group(2)), 0.0
+            if self._stored(idea, int(name_match.group(1))):
+                continue
+            self.add(idea, evaluation, score, sentiment, int(name_match.group(1)), run_id="legacy")
+            imported += 1
+        with self._lock:
+            self._db.execute(f"PRAGMA user_version = {TEXT_FILES_IMPORTED}")
+            self._db.commit()
+        if imported:
+            logging.info(f"Imported {imported} idea files from {folder} into {self.path}")
+        return imported
+
+    def _stored(self, idea, iteration):
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM ideas WHERE iteration = ? AND idea = ? LIMIT 1", (iteration, idea)
+            ).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM ideas").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_idea_store = None
+_idea_store_lock = threading.Lock()
+
+
+def get_idea_store():
+    global _idea_store
+    with _idea_store_lock:
+        if _idea_store is None:
+            _idea_store = IdeaStore()
+        return _idea_store
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from config import Config
+from metrics import stage_metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Request fields that change the completion; anything else (timeouts, headers) is left out of the key.
+KEY_FIELDS = (
+    "model", "messages", "tools", "tool_choice", "temperature", "top_p", "max_tokens",
+    "seed", "stop", "n", "presence_penalty", "frequency_penalty", "response_format",
+)
+
+MODES = ("off", "record", "replay")
+# Placeholder for tool output in replay keys: search results and scraped pages change between runs.
+TOOL_RESULT_KEY = "<tool result>"
+
+
+class CacheMissError(Exception):
+    pass
+
+
+def _to_jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _key_message(message, replay):
+    # Tool call ids are random, so a tool turn is keyed by the calls that were made (name and arguments). Replay
+    # keys leave out the tool output too, so they match recordings from another day; otherwise a live conversation
+    # whose search or scrape results differ would get the recorded answer.
+    if not isinstance(message, dict):
+        message = _to_jsonable(message)
+    message = {name: value for name, value in message.items() if name != "tool_call_id"}
+    if replay and message.get("role") == "tool":
+        message["content"] = TOOL_RESULT_KEY
+    if message.get("tool_calls"):
+        calls = [call if isinstance(call, dict) else _to_jsonable(call) for call in message["tool_calls"]]
+        message["tool_calls"] = [
+            {"name": call["function"]["name"], "arguments": call["function"]["arguments"]} for call in calls
+        ]
+    return message
+
+
+class LLMResponseCache:
+    def __init__(self, cache_dir=Config.LLM_CACHE_DIR, mode=Config.LLM_CACHE_MODE,
+                 max_entries=Config.LLM_CACHE_MAX_ENTRIES, max_bytes=Config.LLM_CACHE_MAX_MB * 1024 * 1024):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}. Expected one of {MODES}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self._lock = threading.Lock()
+        self._entries = None
+        self._total_bytes = 0
+
+    def _load_index(self):
+        # Rebuild LRU order from file access times so eviction survives restarts.
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        files = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".json")]
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            size = entry.stat().st_size
+            self._entries[entry.name[:-len(".json")]] = size
+            self._total_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def make_key(self, request_kwargs, replay=None):
+        # The model stays in the key: replay only matches recordings made with the same (routed) model per request.
+        if replay is None:
+            replay = self.mode == "replay"
+        payload = {field: request_kwargs[field] for field in KEY_FIELDS if request_kwargs.get(field) is not None}
+        if "messages" in payload:
+            payload["messages"] = [_key_message(message, replay) for message in payload["messages"]]
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=_to_jsonable)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def count_api_call(self):
+        with self._lock:
+            self.api_calls += 1
+
+    def is_cacheable(self, request_kwargs):
+        return self.mode != "off" and not request_kwargs.get("stream")
+
+    def get(self, key):
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.error(f"Error reading LLM cache entry {key}: {str(e)}")
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            os.utime(self._path(key))
+            self.hits += 1
+            return data
+
+    def set(self, key, data):
+        if self.mode != "record":
+            return
+        serialized = json.dumps(data, default=_to_jsonable)
+        with self._lock:
+            self._load_index()
+            try:
+                with open(self._path(key), "w", encoding="utf-8") as f:
+                    f.write(serialized)
+            except OSError as e:
+                logging.error(f"Error writing LLM cache entry {key}: {str(e)}")
+                return
+            if key in self._entries:
+                self._total_bytes -= self._entries[key]
+            self._entries[key] = len(serialized)
+            self._entries.move_to_end(key)
+            self._total_bytes += len(serialized)
+            self._evict()
+
+    def record(self, request_kwargs, key, data):
+        # Stored under the lookup key and, for requests with tool output, also under the replay key.
+        self.set(key, data)
+        replay_key = self.make_key(request_kwargs, replay=True)
+        if replay_key != key:
+            self.set(replay_key, data)
+
+    def _forget(self, key):
+        size = self._entries.pop(key, 0)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._forget(oldest)
+            logging.info(f"Evicted LLM cache entry: {oldest}")
+
+    def lookup(self, request_kwargs):
+        from openai.types.chat import ChatCompletion
+
+        key = self.make_key(request_kwargs)
+        data = self.get(key)
+        if data is None and self.mode == "replay":
+            raise CacheMissError(f"No recorded response for request {key} (LLM cache is in replay mode)")
+        return key, (ChatCompletion.model_validate(data) if data is not None else None)
+
+    def stats(self):
+        with self._lock:
+            return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "api_calls": self.api_calls}
+
+
+class _CachedCompletions:
+    def __init__(self, completions, cache):
+        self._completions = completions
+        self._cache = cache
+
+    def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return self._create(**kwargs)
+        with stage_metrics.measure("completion"):
+            return self._create(**kwargs)
+
+    def _create(self, **kwargs):
+        if not self._cache.is_cacheable(kwargs):
+            self._cache.count_api_call()
+            return self._completions.create(**kwargs)
+        with stage_metrics.measure("cache_lookup"):
+            key, cached = self._cache.lookup(kwargs)
+        if cached is not None:
+            return cached
+        self._cache.count_api_call()
+        response = self._completions.create(**kwargs)
+        self._cache.record(kwargs, key, response.model_dump())
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class _AsyncCachedCompletions(_CachedCompletions):
+    async def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return await self._create(**kwargs)
+        with stage_metrics.measure("completion"):
+            return await self._create(**kwargs)
+
+    async def _create(self, **kwargs):
+        if not self._cache.is_cacheable(kwargs):
+            self._cache.count_api_call()
+            return await self._completions.create(**kwargs)
+        with stage_metrics.measure("cache_lookup"):
+            key, cached = self._cache.lookup(kwargs)
+        if cached is not None:
+            return cached
+        self._cache.count_api_call()
+        response = await self._completions.create(**kwargs)
+        self._cache.record(kwargs, key, response.model_dump())
+        return response
+
+
+class _CachedChat:
+    def __init__(self, chat, completions):
+        self._chat = chat
+        self.completions = completions
+
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+
+class CachedClient:
+    def __init__(self, client, cache, completions_class=_CachedCompletions):
+        self._client = client
+        self.cache = cache
+        self.chat = _CachedChat(client.chat, completions_class(client.chat.completions, cache))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def wrap_client(client):
+    return CachedClient(client, llm_response_cache)
+
+
+def wrap_async_client(client):
+    return CachedClient(client, llm_response_cache, completions_class=_AsyncCachedCompletions)
+
+
+llm_response_cache = LLMResponseCache()
@@ -1,10 +1,64 @@
-from openai import OpenAI
-from config import Config
-
-
-def load_client():
-    client = OpenAI(
-        api_key=Config.API_KEY,
-        base_url=Config.API_URL
-    )
-    return client
\ No newline at end of file
+import asyncio
+import threading
+import weakref
+from config import Config
+from llm_cache import wrap_client, wrap_async_client
+from rate_limited_client import rate_limit_async_client, rate_limit_client
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+_sync_factory = None
+_async_factory = None
+
+
+def load_client():
+    from openai import OpenAI
+
+    # Retries are left to the shared rate limiter, which sits behind the response cache so hits cost no quota.
+    client = OpenAI(
+        api_key=Config.API_KEY,
+        base_url=Config.API_URL,
+        max_retries=0,
+        timeout=Config.LLM_TIMEOUT_SECONDS
+    )
+    return wrap_client(rate_limit_client(client))
+
+
+def load_async_client():
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(
+        api_key=Config.API_KEY,
+        base_url=Config.API_URL,
+        max_retries=0,
+        timeout=Config.LLM_TIMEOUT_SECONDS
+    )
+    return wrap_async_client(rate_limit_async_client(client))
+
+
+def get_client():
+    # Built on first use so importing the pipeline never pays for the openai import or client setup.
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = (_sync_factory or load_client)()
+        return _shared_client
+
+
+def get_async_client():
+    # httpx async connections are bound to the loop that opened them, so keep one client per event loop.
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        _async_clients[loop] = (_async_factory or load_async_client)()
+    return _async_clients[loop]
+
+
+def use_client_factories(sync_factory=None, async_factory=None):
+    # Swaps the client constructors behind get_client/get_async_client (perf_benchmark.py uses stub clients);
+    # calling it without arguments restores the real ones. Clients built so far are dropped.
+    global _shared_client, _sync_factory, _async_factory
+    with _shared_client_lock:
+        _sync_factory, _async_factory = sync_factory, async_factory
+        _shared_client = None
+        _async_clients.clear()
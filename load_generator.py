@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+from collections import Counter
+from datetime import datetime
+from config import Config
+from metrics import percentile
+from mock_llm_server import add_mock_arguments, mock_options, start_mock_server
+from rate_limited_client import get_rate_limiter
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PROMPTS = [
+    "Explain the difference between a process and a thread.",
+    "Write a Python function that checks whether a string is a palindrome.",
+    "Summarize the benefits of connection pooling for HTTP clients.",
+    "What are three ways to reduce tail latency in a web service?",
+    "Suggest a name for a command line tool that benchmarks APIs.",
+]
+# A level counts as saturated once it completes less than this share of the arrival rate it was sent.
+SATURATION_THROUGHPUT_RATIO = 0.9
+SATURATION_ERROR_RATE = 0.05
+
+
+def stub_tools():
+    # Mock tool calls must not start real browsers; search answers instantly instead.
+    from tool_registry import get_tool_registry
+
+    get_tool_registry().register("google_search", lambda query: f"Search results for '{query}': []")
+
+
+async def run_level(rate, duration, timeout, rng):
+    # Open loop: arrivals follow a Poisson process at `rate` no matter how many requests are still in flight,
+    # and latency is measured from the scheduled arrival, so queueing inside the pipeline shows up.
+    from chat_flow import ChatFlow
+
+    loop = asyncio.get_running_loop()
+
+    async def one(index, scheduled):
+        prompt = f"{PROMPTS[index % len(PROMPTS)]} (request {index})"
+        # Any failure (timeout, typed LLMError, a client or parse bug) is an error outcome of this request,
+        # so one bad response cannot abort the level and lose the samples collected so far.
+        error = None
+        try:
+            if await asyncio.wait_for(ChatFlow().achat(prompt), timeout) is None:
+                error = "EmptyResponse"
+        except asyncio.TimeoutError:
+            error = "Timeout"
+        except Exception as e:
+            error = type(e).__name__
+        return error is None, scheduled, loop.time(), error
+
+    tasks = []
+    start = loop.time()
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        await asyncio.sleep(max(0.0, start + offset - loop.time()))
+        tasks.append(asyncio.create_task(one(len(tasks), start + offset)))
+        offset += rng.expovariate(rate)
+    results = await asyncio.gather(*tasks)
+
+    # Throughput is completions per second over a window as long as the sending window, shifted by the median
+    # latency: a pipeline that keeps up completes about everything sent (sent_rps) in it, however slow each chat
+    # is, while an overloaded one completes only its capacity. It can never exceed the requests actually sent.
+    latencies = [done - scheduled for ok, scheduled, done, _ in results if ok]
+    shift = percentile(latencies, 50) or 0.0
+    in_window = [done for ok, _, done, _ in results if ok and start + shift < done <= start + duration + shift]
+    error_types = Counter(error for ok, _, _, error in results if not ok)
+    errors = sum(error_types.values())
+    return {
+        "offered_rps": rate,
+        "sent": len(results),
+        "sent_rps": len(results) / duration,
+        "completed": len(latencies),
+        "errors": errors,
+        "error_rate": errors / len(results) if results else 0.0,
+        "error_types": dict(error_types),
+        "throughput_rps": len(in_window) / duration,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "p99_s": percentile(latencies, 99),
+    }
+
+
+def is_saturated(level):
+    return (level["throughput_rps"] < level["sent_rps"] * SATURATION_THROUGHPUT_RATIO
+            or level["error_rate"] > SATURATION_ERROR_RATE)
+
+
+async def run_load_test(rates, duration, timeout, seed=None):
+    rng = random.Random(seed)
+    levels = []
+    for rate in rates:
+        logging.warning(f"Offering {rate} chats/s for {duration}s")
+        level = await run_level(rate, duration, timeout, rng)
+        levels.append(level)
+        logging.warning(f"{rate} chats/s offered: {level['throughput_rps']:.2f} completed/s, "
+                        f"p95 {level['p95_s'] or 0:.2f}s, {level['errors']} errors {level['error_types'] or ''}")
+    return levels
+
+
+def plot_load_test(levels, filename):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(9, 6))
+    throughput = [level["throughput_rps"] for level in levels]
+    for key, label in (("p50_s", "p50"), ("p95_s", "p95"), ("p99_s", "p99")):
+        ax.plot(throughput, [level[key] or 0 for level in levels], marker="o", label=label)
+    for level in levels:
+        ax.annotate(f"{level['offered_rps']:g}/s", (level["throughput_rps"], level["p95_s"] or 0),
+                    textcoords="offset points", xytext=(4, 4), fontsize=8)
+    ax.set_xlabel("Completed chats per second")
+    ax.set_ylabel("Latency (s)")
+    ax.set_title("ChatFlow throughput vs latency (labels: offered rate)")
+    ax.legend()
+    plt.tight_layout()
+    plt.savefig(filename)
+    plt.close(fig)
+    logging.warning(f"Load test plot saved as {filename}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop load test of ChatFlow at increasing arrival rates.")
+    parser.add_argument("--rates", default="1,2,5,10,20", help="comma separated arrival rates in chats/s")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per rate")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-chat timeout in seconds")
+    parser.add_argument("--mock", action="store_true", help="start mock_llm_server.py in-process and send all traffic there")
+    parser.add_argument("--real-tools", action="store_true", help="run real search/scrape tools instead of stubs")
+    parser.add_argument("--output", default="load_test_results.json")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    from llm_cache import llm_response_cache
+    from load_client import use_client_factories
+
+    logging.getLogger().setLevel(logging.WARNING)
+    llm_response_cache.mode = "off"  # cached responses would hide the load
+    if args.mock:
+        server, Config.API_URL, state = start_mock_server(**mock_options(args))
+        Config.API_KEY = Config.API_KEY or "mock"
+        use_client_factories()
+    if not args.real_tools:
+        stub_tools()
+
+    rates = [float(rate) for rate in args.rates.split(",")]
+    levels = asyncio.run(run_load_test(rates, args.duration, args.timeout, args.seed))
+    saturated = next((level["offered_rps"] for level in levels if is_saturated(level)), None)
+    results = {"api_url": Config.API_URL, "created": datetime.now().isoformat(timespec="seconds"),
+               "duration_s": args.duration, "saturated_at_rps": saturated, "levels": levels}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'offered/s':>10}{'done/s':>9}{'sent':>7}{'errors':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}")
+    for level in levels:
+        print(f"{level['offered_rps']:>10g}{level['throughput_rps']:>9.2f}{level['sent']:>7}{level['errors']:>8}"
+              f"{level['p50_s'] or 0:>8.2f}{level['p95_s'] or 0:>8.2f}{level['p99_s'] or 0:>8.2f}")
+    print(f"Saturates at {saturated:g} chats/s" if saturated is not None else "No saturation within the tested rates")
+    plot_load_test(levels, f"load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+    print(f"LLM client: {get_rate_limiter().stats()}")
+    if args.mock:
+        print(f"Mock server counters: {state.counters}")
+        server.shutdown()
@@ -0,0 +1,155 @@
+import logging
+import math
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class StreamMetrics:
+    def __init__(self, model, stage=None, recorder=None):
+        self.model = model
+        self.stage = stage
+        self.recorder = recorder
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.tokens = 0
+        self.completion_tokens = None
+
+    def on_token(self, text):
+        if not text:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        # Each content delta is one token on Groq/OpenAI streams; usage, when sent, overrides this count.
+        self.tokens += 1
+
+    def on_usage(self, usage):
+        if usage is not None and getattr(usage, "completion_tokens", None):
+            self.completion_tokens = usage.completion_tokens
+
+    @property
+    def ttft(self):
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def token_count(self):
+        return self.completion_tokens if self.completion_tokens is not None else self.tokens
+
+    @property
+    def tokens_per_second(self):
+        if self.first_token_at is None or self.finished_at is None or self.finished_at <= self.first_token_at:
+            return None
+        return self.token_count / (self.finished_at - self.first_token_at)
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+        record = self.as_dict()
+        if self.recorder is not None:
+            self.recorder.add(record)
+        ttft = f"{record['ttft_ms']:.0f} ms" if record["ttft_ms"] is not None else "n/a"
+        rate = f"{record['tokens_per_second']:.1f}" if record["tokens_per_second"] is not None else "n/a"
+        logging.info(f"Stream {self.model} ({self.stage}): TTFT {ttft}, {record['tokens']} tokens, {rate} tokens/s")
+        return record
+
+    def as_dict(self):
+        return {
+            "model": self.model,
+            "stage": self.stage,
+            "ttft_ms": self.ttft * 1000 if self.ttft is not None else None,
+            "tokens": self.token_count,
+            "tokens_per_second": self.tokens_per_second,
+            "total_ms": ((self.finished_at or time.perf_counter()) - self.started_at) * 1000,
+        }
+
+
+class StreamMetricsRecorder:
+    def __init__(self, max_records=1000):
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def summary(self):
+        records = self.records()
+        ttfts = [r["ttft_ms"] for r in records if r["ttft_ms"] is not None]
+        rates = [r["tokens_per_second"] for r in records if r["tokens_per_second"] is not None]
+        return {
+            "calls": len(records),
+            "ttft_p50_ms": statistics.median(ttfts) if ttfts else None,
+            "ttft_max_ms": max(ttfts) if ttfts else None,
+            "tokens_per_second_p50": statistics.median(rates) if rates else None,
+        }
+
+
+def percentile(values, q):
+    # Nearest-rank percentile; values need not be sorted.
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class StageMetrics:
+    # Wall time per pipeline stage (completion, tool_dispatch, grading, ...). When tracemalloc is running,
+    # the net bytes allocated inside each stage are recorded as well.
+    def __init__(self, max_records=10000):
+        self.max_records = max_records
+        self._durations = defaultdict(lambda: deque(maxlen=self.max_records))
+        self._allocations = defaultdict(lambda: deque(maxlen=self.max_records))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage):
+        tracing = tracemalloc.is_tracing()
+        allocated_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._durations[stage].append(elapsed_ms)
+                if tracing and tracemalloc.is_tracing():
+                    self._allocations[stage].append(tracemalloc.get_traced_memory()[0] - allocated_before)
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._allocations.clear()
+
+    def summary(self):
+        with self._lock:
+            durations = {stage: list(values) for stage, values in self._durations.items()}
+            allocations = {stage: list(values) for stage, values in self._allocations.items()}
+        result = {}
+        for stage, values in durations.items():
+            total_ms = sum(values)
+            result[stage] = {
+                "count": len(values),
+                "mean_ms": total_ms / len(values),
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+                "ops_per_second": len(values) / (total_ms / 1000) if total_ms > 0 else None,
+            }
+            if allocations.get(stage):
+                result[stage]["alloc_net_kb_mean"] = statistics.mean(allocations[stage]) / 1024
+        return result
+
+
+stream_metrics = StreamMetricsRecorder()
+stage_metrics = StageMetrics()
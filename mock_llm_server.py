@@ -0,0 +1,275 @@
+import argparse
+import http.server
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MOCK_ANSWER = (
+    "Here is a concise answer produced by the local mock server. It has no knowledge of the question, "
+    "but its length, timing and failure modes behave like a hosted model so the pipeline can be load tested."
+)
+
+
+class LatencyModel:
+    # Parsed from specs like "fixed:200", "uniform:100:400", "exponential:250" or "lognormal:300:0.5" (milliseconds).
+    def __init__(self, spec="fixed:0", rng=None):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.rng = rng or random.Random()
+        expected = {"fixed": 1, "uniform": 2, "exponential": 1, "lognormal": 2}
+        if expected.get(kind) != len(self.params):
+            raise ValueError(f"Invalid latency spec: {spec}")
+
+    def sample_ms(self):
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.params)
+        if self.kind == "exponential":
+            return self.rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+        median, sigma = self.params
+        return self.rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount):
+        self._refill()
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+    def seconds_until(self, amount):
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+
+def estimate_tokens(messages):
+    return sum(len(str(message.get("content") or "")) for message in messages) // 4 + 1
+
+
+class MockLLMState:
+    def __init__(self, latency="fixed:0", tokens_per_second=200.0, error_rate_429=0.0, error_rate_5xx=0.0,
+                 requests_per_minute=0, tokens_per_minute=0, tool_call_rate=0.0, seed=None):
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, self.rng)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate_429 = error_rate_429
+        self.error_rate_5xx = error_rate_5xx
+        self.tool_call_rate = tool_call_rate
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "ok": 0, "rate_limited": 0, "server_errors": 0}
+
+    def admit(self, prompt_tokens):
+        # Returns (status, headers): 200 when the request may proceed, otherwise an injected or enforced error.
+        with self.lock:
+            self.counters["requests"] += 1
+            headers = self.rate_limit_headers()
+            if self.rng.random() < self.error_rate_5xx:
+                self.counters["server_errors"] += 1
+                return self.rng.choice((500, 502, 503)), headers
+            if self.rng.random() < self.error_rate_429:
+                self.counters["rate_limited"] += 1
+                return 429, dict(headers, **{"retry-after": "1"})
+            for bucket, amount in ((self.request_bucket, 1), (self.token_bucket, prompt_tokens)):
+                if bucket is not None and not bucket.take(amount):
+                    self.counters["rate_limited"] += 1
+                    return 429, dict(self.rate_limit_headers(), **{"retry-after": f"{bucket.seconds_until(amount):.2f}"})
+            self.counters["ok"] += 1
+            return 200, self.rate_limit_headers()
+
+    def rate_limit_headers(self):
+        # Same header names as Groq, so clients can pace themselves against the mock.
+        headers = {}
+        for name, bucket in (("requests", self.request_bucket), ("tokens", self.token_bucket)):
+            if bucket is None:
+                continue
+            bucket._refill()
+            headers[f"x-ratelimit-limit-{name}"] = str(int(bucket.capacity))
+            headers[f"x-ratelimit-remaining-{name}"] = str(int(bucket.tokens))
+            headers[f"x-ratelimit-reset-{name}"] = f"{(bucket.capacity - bucket.tokens) / bucket.rate:.2f}s"
+        return headers
+
+    def wants_tool_call(self, request):
+        if not request.get("tools") or request["messages"][-1].get("role") == "tool":
+            return False
+        with self.lock:
+            return self.rng.random() < self.tool_call_rate
+
+    def grade_content(self, request):
+        try:
+            items = json.loads(request["messages"][-1]["content"])["items"]
+        except (KeyError, TypeError, ValueError):
+            items = [{"id": 0}]
+        with self.lock:
+            grades = [{"id": item["id"], "score": round(self.rng.uniform(5, 10), 1), "critique": "Mock critique."} for item in items]
+        return json.dumps({"grades": grades})
+
+
+class MockLLMHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.state.counters)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            messages = request["messages"]
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": {"message": f"Invalid request: {str(e)}", "type": "invalid_request_error"}})
+            return
+
+        prompt_tokens = estimate_tokens(messages)
+        status, headers = self.state.admit(prompt_tokens)
+        if status != 200:
+            kind = "rate_limit_exceeded" if status == 429 else "server_error"
+            self._send_json(status, {"error": {"message": f"Mock {kind}", "type": kind, "code": kind}}, headers)
+            return
+
+        time.sleep(self.state.latency.sample_ms() / 1000)
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            message = {"role": "assistant", "content": self.state.grade_content(request)}
+        elif self.state.wants_tool_call(request):
+            arguments = json.dumps({"query": str(messages[-1].get("content") or "")[:80]})
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                 "function": {"name": "google_search", "arguments": arguments}}
+            ]}
+        else:
+            message = {"role": "assistant", "content": MOCK_ANSWER}
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        completion_tokens = len((message["content"] or "").split()) or 1
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        if request.get("stream"):
+            self._stream(completion_id, request.get("model", "mock"), message, usage, headers)
+            return
+        self._send_json(200, {
+            "id": completion_id, "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": usage,
+        }, headers)
+
+    def _stream(self, completion_id, model, message, usage, headers):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta, finish_reason=None, extra=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            chunk.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        token_delay = 1 / self.state.tokens_per_second if self.state.tokens_per_second else 0
+        send({"role": "assistant", "content": ""})
+        if message.get("tool_calls"):
+            for index, tool_call in enumerate(message["tool_calls"]):
+                send({"tool_calls": [dict(tool_call, index=index)]})
+        else:
+            for word in message["content"].split(" "):
+                time.sleep(token_delay)
+                send({"content": word + " "})
+        send({}, "tool_calls" if message.get("tool_calls") else "stop", {"x_groq": {"usage": usage}})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_mock_server(host="127.0.0.1", port=0, **state_options):
+    # Serves in a daemon thread; point Config.API_URL at the returned base URL.
+    state = MockLLMState(**state_options)
+    handler = type("BoundMockLLMHandler", (MockLLMHandler,), {"state": state})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    logging.info(f"Mock LLM server listening on {base_url}")
+    return server, base_url, state
+
+
+def add_mock_arguments(parser):
+    parser.add_argument("--latency", default="fixed:200", help="fixed:MS, uniform:MIN:MAX, exponential:MEAN or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="streaming speed")
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-5xx", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute limit (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="prompt tokens per minute limit (0 = unlimited)")
+    parser.add_argument("--tool-call-rate", type=float, default=0.0, help="share of tool-enabled requests answered with a google_search call")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def mock_options(args):
+    return {
+        "latency": args.latency, "tokens_per_second": args.tokens_per_second,
+        "error_rate_429": args.error_rate_429, "error_rate_5xx": args.error_rate_5xx,
+        "requests_per_minute": args.rpm, "tokens_per_minute": args.tpm,
+        "tool_call_rate": args.tool_call_rate, "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible /chat/completions mock for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url, state = start_mock_server(args.host, args.port, **mock_options(args))
+    print(f"Set LLM_API_URL={base_url} (and any GROQ_API_KEY) to send the pipeline here. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(60)
+            logging.info(f"Mock LLM server counters: {state.counters}")
+    except KeyboardInterrupt:
+        server.shutdown()
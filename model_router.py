@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import deque
+from config import Config
+from metrics import percentile
+from token_utils import count_message_tokens
+
+# Per task: candidate models from fastest to slowest, each with the longest prompt (in tokens) it is trusted with
+# and a prior quality (0-10 grade) used until enough of its answers have been graded. The last candidate is the
+# fallback and takes any prompt.
+ROUTE_PROFILES = {
+    "tool_routing": [(Config.small_model, 4000, 7.5), (Config.text_gen_funct_call_model, None, 8.5)],
+    "grading": [(Config.small_model, 3000, 7.0), (Config.grading_model, None, 8.5)],
+    "draft": [(Config.small_model, 2000, 6.5), (Config.text_gen_funct_call_model, None, 8.0)],
+    "final_answer": [(Config.text_gen_funct_call_model, None, 8.0)],
+}
+
+
+def usage_tokens(response):
+    return getattr(getattr(response, "usage", None), "total_tokens", None)
+
+
+class ModelRouter:
+    # Picks a model per request from the task's profile: the fastest candidate that fits the prompt length and,
+    # if a quality floor is set, whose graded answers for this task average at least that floor. Every route
+    # records latency, tokens and grades so the profiles can be tuned from stats().
+    def __init__(self, profiles=None, enabled=Config.MODEL_ROUTING != "off", quality_floor=Config.ROUTER_QUALITY_FLOOR,
+                 min_samples=Config.ROUTER_MIN_SAMPLES):
+        self.profiles = profiles or ROUTE_PROFILES
+        self.enabled = enabled
+        self.quality_floor = quality_floor
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def _route(self, task, model):
+        key = (task, model)
+        if key not in self._routes:
+            self._routes[key] = {"chosen": 0, "calls": 0, "latencies": deque(maxlen=1000), "tokens": 0,
+                                 "token_calls": 0, "quality_sum": 0.0, "quality_count": 0}
+        return self._routes[key]
+
+    def expected_quality(self, task, model, prior):
+        with self._lock:
+            route = self._route(task, model)
+            if route["quality_count"] < self.min_samples:
+                return prior
+            return route["quality_sum"] / route["quality_count"]
+
+    def _allowed(self, task, prompt_tokens, floor):
+        # The task's candidates that may take this prompt, fastest first; the fallback always may.
+        candidates = self.profiles[task]
+        allowed = []
+        if self.enabled:
+            for name, max_prompt_tokens, prior in candidates[:-1]:
+                if max_prompt_tokens is not None and prompt_tokens > max_prompt_tokens:
+                    continue
+                if floor is not None and self.expected_quality(task, name, prior) < floor:
+                    continue
+                allowed.append(name)
+        return allowed + [candidates[-1][0]]
+
+    def _count(self, task, model):
+        with self._lock:
+            self._route(task, model)["chosen"] += 1
+
+    def choose(self, task, messages, quality_floor=None):
+        floor = self.quality_floor if quality_floor is None else quality_floor
+        model = self._allowed(task, sum(count_message_tokens(message) for message in messages), floor)[0]
+        self._count(task, model)
+        return model
+
+    def choose_step(self, task, messages, quality_floor=None):
+        # A tool-offering step either calls tools or writes the task's answer. It goes to the tool_routing model
+        # when the task would accept that model's answer too, else straight to the task's own model, so a plain
+        # answer is never thrown away and re-asked. Returns (route, model).
+        floor = self.quality_floor if quality_floor is None else quality_floor
+        prompt_tokens = sum(count_message_tokens(message) for message in messages)
+        route, model = "tool_routing", self._allowed("tool_routing", prompt_tokens, floor)[0]
+        task_models = self._allowed(task, prompt_tokens, floor)
+        if model not in task_models:
+            route, model = task, task_models[0]
+        self._count(route, model)
+        return route, model
+
+    def record(self, task, model, seconds, tokens=None):
+        with self._lock:
+            route = self._route(task, model)
+            route["calls"] += 1
+            route["latencies"].append(seconds)
+            if tokens is not None:
+                route["tokens"] += tokens
+                route["token_calls"] += 1
+
+    def record_quality(self, task, model, score):
+        if score is None:
+            return
+        with self._lock:
+            route = self._route(task, model)
+            route["quality_sum"] += score
+            route["quality_count"] += 1
+
+    def stats(self):
+        with self._lock:
+            summary = {}
+            for (task, model), route in sorted(self._routes.items()):
+                latencies = [seconds * 1000 for seconds in route["latencies"]]
+                summary[f"{task}/{model}"] = {
+                    "chosen": route["chosen"],
+                    "calls": route["calls"],
+                    "p50_ms": percentile(latencies, 50),
+                    "p95_ms": percentile(latencies, 95),
+                    "tokens_mean": route["tokens"] / route["token_calls"] if route["token_calls"] else None,
+                    "quality_mean": route["quality_sum"] / route["quality_count"] if route["quality_count"] else None,
+                    "graded": route["quality_count"],
+                }
+            return summary
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+def routed_completion(client, task, **request):
+    start = time.perf_counter()
+    response = client.chat.completions.create(**request)
+    model_router.record(task, request["model"], time.perf_counter() - start, usage_tokens(response))
+    return response
+
+
+async def arouted_completion(client, task, **request):
+    start = time.perf_counter()
+    response = await client.chat.completions.create(**request)
+    model_router.record(task, request["model"], time.perf_counter() - start, usage_tokens(response))
+    return response
+
+
+model_router = ModelRouter()
@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import http.server
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+from config import Config
+from metrics import stage_metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Prompts containing this marker are graded below the reflection threshold, so they exercise regeneration.
+NEEDS_WORK = "[needs-work]"
+ARTICLE_HTML = "<html><body><article>" + "<p>Benchmark article paragraph with some plain text. </p>" * 200 + "</article></body></html>"
+
+
+class StubCompletions:
+    # Stands in for chat.completions: answers with a search + scrape tool call first, then plain text;
+    # grading requests (json_object responses) get a JSON grade. The small model can be given its own latency.
+    def __init__(self, latency_seconds=0.0, small_latency_seconds=None):
+        self.latency_seconds = latency_seconds
+        self.small_latency_seconds = small_latency_seconds
+
+    def _latency(self, kwargs):
+        if self.small_latency_seconds is not None and kwargs["model"] == Config.small_model:
+            return self.small_latency_seconds
+        return self.latency_seconds
+
+    def _respond(self, kwargs):
+        from openai.types.chat import ChatCompletion
+
+        messages = kwargs["messages"]
+        if (kwargs.get("response_format") or {}).get("type") == "json_object":
+            items = json.loads(messages[-1]["content"])["items"]
+            grades = [{"id": item["id"], "score": 4 if NEEDS_WORK in item["prompt"] else 9, "critique": "Stub critique."} for item in items]
+            message = {"role": "assistant", "content": json.dumps({"grades": grades})}
+        elif kwargs.get("tools") and messages[-1]["role"] != "tool":
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": "call_search", "type": "function",
+                 "function": {"name": "google_search", "arguments": json.dumps({"query": "benchmark"})}},
+                {"id": "call_scrape", "type": "function",
+                 "function": {"name": "scrape_website", "arguments": json.dumps({"url": "stub"})}},
+            ]}
+        else:
+            message = {"role": "assistant", "content": "Stub answer. " * 40}
+        return ChatCompletion.model_validate({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": kwargs["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+        })
+
+    def create(self, **kwargs):
+        time.sleep(self._latency(kwargs))
+        return self._respond(kwargs)
+
+
+class AsyncStubCompletions(StubCompletions):
+    async def create(self, **kwargs):
+        await asyncio.sleep(self._latency(kwargs))
+        return self._respond(kwargs)
+
+
+def stub_client(completions, cache):
+    from llm_cache import CachedClient, _AsyncCachedCompletions, _CachedCompletions
+
+    completions_class = _AsyncCachedCompletions if isinstance(completions, AsyncStubCompletions) else _CachedCompletions
+    return CachedClient(SimpleNamespace(chat=SimpleNamespace(completions=completions)), cache, completions_class)
+
+
+def serve_article():
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = ARTICLE_HTML.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def install_stubs(workdir, llm_latency_ms, tool_latency_ms, small_llm_latency_ms=None):
+    from caching import Cache
+    from llm_cache import LLMResponseCache
+    from load_client import use_client_factories
+    from tool_registry import get_tool_registry
+    from website_scraper import WebsiteScraper
+
+    # Record mode against a scratch directory: every completion pays for a real cache lookup and write.
+    llm_cache = LLMResponseCache(cache_dir=os.path.join(workdir, "llm_cache"), mode="record")
+    small_latency = small_llm_latency_ms / 1000 if small_llm_latency_ms is not None else None
+    use_client_factories(
+        lambda: stub_client(StubCompletions(llm_latency_ms / 1000, small_latency), llm_cache),
+        lambda: stub_client(AsyncStubCompletions(llm_latency_ms / 1000, small_latency), llm_cache),
+    )
+
+    server = serve_article()
+    scraper = WebsiteScraper(cache=Cache(cache_dir=os.path.join(workdir, "cache"), sweep_interval=0))
+    page_counter = iter(range(sys.maxsize))
+    page_url = f"http://127.0.0.1:{server.server_address[1]}/article"
+
+    def google_search_stub(query):
+        time.sleep(tool_latency_ms / 1000)
+        return f"Search results for '{query}': ['https://example.com/a', 'https://example.com/b']"
+
+    def scrape_website_stub(url):
+        # A fresh URL per call so every scrape goes through fetch, extraction and a cache write.
+        content = scraper.scrape(f"{page_url}?page={next(page_counter)}")
+        return f"Content from {url}: {content[:500]}"
+
+    registry = get_tool_registry()
+    registry.register("google_search", google_search_stub)
+    registry.register("scrape_website", scrape_website_stub)
+    return server
+
+
+def run_chats(iterations, regenerate_every, offset=0):
+    from chat_flow import ChatFlow
+
+    for i in range(offset, offset + iterations):
+        marker = NEEDS_WORK if regenerate_every and i % regenerate_every == 0 else ""
+        with stage_metrics.measure("chat"):
+            ChatFlow().chat(f"Benchmark prompt {i} {marker}".strip())
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_perf_benchmark(iterations=200, warmup=10, alloc_iterations=20, regenerate_every=4,
+                       llm_latency_ms=0.0, tool_latency_ms=0.0, small_llm_latency_ms=None):
+    from load_client import use_client_factories
+    from model_router import model_router
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = install_stubs(workdir, llm_latency_ms, tool_latency_ms, small_llm_latency_ms)
+        try:
+            run_chats(warmup, regenerate_every)
+            stage_metrics.reset()
+            model_router.reset()
+            start = time.perf_counter()
+            run_chats(iterations, regenerate_every, offset=warmup)
+            elapsed = time.perf_counter() - start
+            stages = stage_metrics.summary()
+            routes = model_router.stats()
+
+            # Allocations are measured in a separate, shorter pass: tracemalloc slows everything down.
+            stage_metrics.reset()
+            tracemalloc.start()
+            run_chats(alloc_iterations, regenerate_every, offset=warmup + iterations)
+            peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+            for stage, summary in stage_metrics.summary().items():
+                if stage in stages and "alloc_net_kb_mean" in summary:
+                    stages[stage]["alloc_net_kb_mean"] = summary["alloc_net_kb_mean"]
+        finally:
+            server.shutdown()
+            use_client_factories()
+            stage_metrics.reset()
+            model_router.reset()
+
+    return {
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "iterations": iterations,
+        "llm_latency_ms": llm_latency_ms,
+        "tool_latency_ms": tool_latency_ms,
+        "small_llm_latency_ms": small_llm_latency_ms,
+        "chats_per_second": iterations / elapsed,
+        "alloc_peak_kb": peak_kb,
+        "stages": stages,
+        "routes": routes,
+    }
+
+
+def find_regressions(results, baseline, threshold=Config.PERF_REGRESSION_THRESHOLD,
+                     min_delta_ms=Config.PERF_REGRESSION_MIN_MS):
+    # A stage regresses when its p95 grows by more than threshold (relative) and min_delta_ms (absolute);
+    # the absolute floor keeps sub-millisecond stages from failing on timer noise.
+    regressions = []
+    for stage, previous in baseline.get("stages", {}).items():
+        current = results["stages"].get(stage)
+        if current is None:
+            continue
+        delta = current["p95_ms"] - previous["p95_ms"]
+        if current["p95_ms"] > previous["p95_ms"] * (1 + threshold) and delta > min_delta_ms:
+            regressions.append(f"{stage}: p95 {previous['p95_ms']:.2f} ms -> {current['p95_ms']:.2f} ms (+{delta:.2f} ms)")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage latency of the chat pipeline against a stub LLM and stub tools.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--alloc-iterations", type=int, default=20)
+    parser.add_argument("--regenerate-every", type=int, default=4, help="every Nth prompt is graded low and regenerated")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--small-llm-latency-ms", type=float, help="latency of the small routed model (default: --llm-latency-ms)")
+    parser.add_argument("--tool-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", default="perf_results.json")
+    parser.add_argument("--baseline", help="results JSON of an earlier commit to compare against")
+    parser.add_argument("--threshold", type=float, default=Config.PERF_REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    # Per-call INFO logging (tool calls, cache writes) would dominate the timings.
+    logging.getLogger().setLevel(logging.WARNING)
+    results = run_perf_benchmark(args.iterations, args.warmup, args.alloc_iterations, args.regenerate_every,
+                                 args.llm_latency_ms, args.tool_latency_ms, args.small_llm_latency_ms)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'net KB':>10}")
+    for stage, summary in sorted(results["stages"].items()):
+        alloc = summary.get("alloc_net_kb_mean")
+        print(f"{stage:<16}{summary['count']:>7}{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}"
+              f"{summary['p99_ms']:>10.2f}{summary['ops_per_second'] or 0:>10.1f}{alloc if alloc is not None else 0:>10.1f}")
+    print(f"\n{'route':<44}{'chosen':>7}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}{'quality':>9}")
+    for route, summary in results["routes"].items():
+        quality = summary["quality_mean"]
+        print(f"{route:<44}{summary['chosen']:>7}{summary['calls']:>7}{summary['p50_ms'] or 0:>10.2f}{summary['p95_ms'] or 0:>10.2f}"
+              f"{quality if quality is not None else float('nan'):>9.2f}")
+    print(f"{results['chats_per_second']:.1f} chats/s, results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.threshold)
+        if regressions:
+            for regression in regressions:
+                logging.error(f"Regression: {regression}")
+            sys.exit(1)
+        print(f"No stage regressed by more than {args.threshold:.0%} against {args.baseline}")
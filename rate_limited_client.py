@@ -0,0 +1,536 @@
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from config import Config
+from token_utils import CHARS_PER_TOKEN
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)?")
+DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+class LLMError(Exception):
+    # Base of the typed errors raised by the rate-limited client in place of the SDK's exceptions.
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMRateLimitError(LLMError):
+    pass
+
+
+class LLMServerError(LLMError):
+    pass
+
+
+class LLMTimeoutError(LLMError):
+    pass
+
+
+class LLMConnectionError(LLMError):
+    pass
+
+
+class LLMRequestError(LLMError):
+    # Any other 4xx: the request itself is wrong, so it is never retried.
+    pass
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+RETRYABLE_ERRORS = (LLMRateLimitError, LLMServerError, LLMTimeoutError, LLMConnectionError)
+
+
+def parse_duration(value):
+    # Seconds from header values like "1", "7.66s", "2m59.56s" or "120ms"; None when missing or unreadable.
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit or "s"] for number, unit in parts)
+
+
+def classify_error(error):
+    # Maps an openai SDK exception to a typed LLMError; returns None for anything else (e.g. CacheMissError).
+    import openai
+
+    if isinstance(error, LLMError):
+        return error
+    if isinstance(error, openai.APITimeoutError):
+        return LLMTimeoutError(f"LLM request timed out: {str(error)}")
+    if isinstance(error, openai.APIConnectionError):
+        return LLMConnectionError(f"Could not reach the LLM API: {str(error)}")
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        retry_after = parse_duration(error.response.headers.get("retry-after"))
+        if status == 429:
+            return LLMRateLimitError(f"Rate limited by the LLM API: {str(error)}", status, retry_after)
+        if status >= 500:
+            return LLMServerError(f"LLM API server error {status}: {str(error)}", status, retry_after)
+        return LLMRequestError(f"LLM API rejected the request ({status}): {str(error)}", status)
+    return None
+
+
+def estimate_tokens(request):
+    # Cheap estimate for the token bucket; exact counts would cost more than they save here.
+    chars = sum(len(str(message.get("content") or "")) for message in request.get("messages", []))
+    return chars // CHARS_PER_TOKEN + 1 + (request.get("max_tokens") or 0)
+
+
+class RateBucket:
+    # Client-side mirror of one server limit, refreshed from the x-ratelimit-* headers of every response. The server
+    # reports remaining capacity and the time until it is full again, which gives the refill rate. Until the first
+    # response reports the limit, nothing is throttled.
+    def __init__(self):
+        self.capacity = None
+        self.tokens = 0.0
+        self.rate = 0.0
+        self.updated = time.monotonic()
+
+    def observe(self, limit, remaining, reset_seconds, now):
+        # A response reports `remaining` as of when the server handled it, before requests that were reserved here
+        # since then; so the server can only lower the local count, never raise it.
+        if self.capacity is None:
+            self.tokens = remaining
+        else:
+            self.tokens = min(remaining, self.tokens + (now - self.updated) * self.rate)
+        self.capacity = limit
+        self.updated = now
+        if reset_seconds and limit > remaining:
+            self.rate = (limit - remaining) / reset_seconds
+        elif not self.rate:
+            self.rate = limit / 60.0
+
+    def reserve(self, amount, now):
+        # Takes `amount` now and returns how long to wait before it is actually available.
+        if self.capacity is None:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate if self.rate else 1.0
+
+
+class AdaptiveConcurrency:
+    # AIMD limit on requests in flight, shared by threads and event loops: it grows by about one per limit's worth
+    # of successes and halves on a rate limit or timeout. Only requests started since the last decrease can
+    # trigger another, so one overload burst halves the limit once.
+    def __init__(self, initial=Config.LLM_INITIAL_CONCURRENCY, maximum=Config.LLM_MAX_CONCURRENCY, minimum=1):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.epoch = 0
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+    def _has_room(self):
+        return self.in_flight < max(self.minimum, int(self.limit))
+
+    def _wake(self):
+        # Hands free slots to waiters in arrival order; must be called with the lock held.
+        while self._waiters and self._has_room():
+            waiter = self._waiters.popleft()
+            self.in_flight += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+                continue
+            loop, future = waiter
+            try:
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+            except RuntimeError:
+                self.in_flight -= 1  # the waiter's loop is closed
+
+    def acquire(self):
+        with self._lock:
+            if self._has_room() and not self._waiters:
+                self.in_flight += 1
+                return self.epoch
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+        return self.epoch
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._has_room() and not self._waiters:
+                self.in_flight += 1
+                return self.epoch
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            self.release()  # the slot was handed over just before the cancellation
+            raise
+        return self.epoch
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def on_success(self):
+        with self._lock:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._wake()
+
+    def on_overload(self, epoch):
+        with self._lock:
+            if epoch == self.epoch:
+                self.limit = max(self.minimum, self.limit / 2)
+                self.epoch += 1
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive server errors or timeouts and fails fast for `cooldown` seconds;
+    # then one trial request is let through, which closes the circuit on success or reopens it on failure. A trial
+    # that never reports back (e.g. cancelled) stops blocking others after another cooldown.
+    def __init__(self, failure_threshold=Config.LLM_CIRCUIT_FAILURES, cooldown=Config.LLM_CIRCUIT_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open":
+                remaining = self.opened_at + self.cooldown - now
+                if remaining > 0:
+                    raise CircuitOpenError(f"LLM circuit is open after {self.failures} consecutive failures; "
+                                           f"retry in {remaining:.1f}s", retry_after=remaining)
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial_started is not None and now - self._trial_started < self.cooldown:
+                    raise CircuitOpenError("LLM circuit is half-open and its trial request is still running")
+                self._trial_started = now
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logging.warning(f"Opening LLM circuit after {self.failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._trial_started = None
+
+    def record_neutral(self):
+        # Rate limits and rejected requests say nothing about the endpoint's health, but end a trial request.
+        with self._lock:
+            self._trial_started = None
+
+
+class RateLimiter:
+    # Shared by every LLM client in the process: per-model request and token buckets, the AIMD concurrency limit,
+    # the circuit breaker and jittered retries.
+    def __init__(self, max_retries=Config.LLM_MAX_RETRIES, retry_base=Config.LLM_RETRY_BASE_SECONDS,
+                 retry_max=Config.LLM_RETRY_MAX_SECONDS, concurrency=None, breaker=None, rng=None):
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.breaker = breaker or CircuitBreaker()
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._paused_until = {}
+        self.counters = {"requests": 0, "succeeded": 0, "retries": 0, "rate_limited": 0, "server_errors": 0,
+                         "timeouts": 0, "connection_errors": 0, "rejected": 0, "circuit_open": 0, "throttled": 0}
+        self.throttle_seconds = 0.0
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _model_buckets(self, model):
+        if model not in self._buckets:
+            self._buckets[model] = {"requests": RateBucket(), "tokens": RateBucket()}
+        return self._buckets[model]
+
+    def reserve(self, request):
+        # Seconds to wait before sending `request`, from the model's buckets and any server-requested pause.
+        model = request.get("model")
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._model_buckets(model)
+            wait = max(buckets["requests"].reserve(1, now), buckets["tokens"].reserve(estimate_tokens(request), now),
+                       self._paused_until.get(model, 0.0) - now)
+            if wait > 0:
+                self.counters["throttled"] += 1
+                self.throttle_seconds += wait
+            return max(0.0, wait)
+
+    def observe(self, model, headers):
+        if not headers:
+            return
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._model_buckets(model)
+            for name, bucket in buckets.items():
+                limit = headers.get(f"x-ratelimit-limit-{name}")
+                remaining = headers.get(f"x-ratelimit-remaining-{name}")
+                if limit is None or remaining is None:
+                    continue
+                try:
+                    bucket.observe(float(limit), float(remaining), parse_duration(headers.get(f"x-ratelimit-reset-{name}")), now)
+                except ValueError:
+                    continue
+
+    def backoff(self, attempt, retry_after=None):
+        # Full jitter, but never sooner than the server asked for.
+        delay = self.rng.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def _record_failure(self, model, error, epoch):
+        if isinstance(error, LLMRateLimitError):
+            self._count("rate_limited")
+            self.concurrency.on_overload(epoch)
+            self.breaker.record_neutral()
+            if error.retry_after:
+                with self._lock:
+                    self._paused_until[model] = max(self._paused_until.get(model, 0.0), time.monotonic() + error.retry_after)
+        elif isinstance(error, (LLMServerError, LLMTimeoutError, LLMConnectionError)):
+            name = {LLMServerError: "server_errors", LLMTimeoutError: "timeouts"}.get(type(error), "connection_errors")
+            self._count(name)
+            if isinstance(error, LLMTimeoutError):
+                self.concurrency.on_overload(epoch)
+            self.breaker.record_failure()
+        else:
+            self._count("rejected")
+            self.breaker.record_neutral()
+
+    def _handle_error(self, model, error, epoch, attempt):
+        # Returns the delay before the next attempt, or raises the typed error.
+        typed = classify_error(error)
+        if typed is None:
+            self.breaker.record_neutral()
+            raise error
+        response = getattr(error, "response", None)
+        if response is not None:
+            self.observe(model, response.headers)
+        self._record_failure(model, typed, epoch)
+        if not isinstance(typed, RETRYABLE_ERRORS) or attempt >= self.max_retries:
+            raise typed from error
+        self._count("retries")
+        delay = self.backoff(attempt, typed.retry_after)
+        logging.warning(f"{type(typed).__name__} on {model} (attempt {attempt + 1}), retrying in {delay:.2f}s")
+        return delay
+
+    def _before(self):
+        try:
+            self.breaker.before_request()
+        except CircuitOpenError:
+            self._count("circuit_open")
+            raise
+        self._count("requests")
+
+    def _on_response(self, model, headers, result, stream):
+        self.observe(model, headers)
+        self.breaker.record_success()
+        self.concurrency.on_success()
+        self._count("succeeded")
+        if stream:
+            # A stream keeps its slot until it has been read to the end.
+            return ReleasingStream(result, self.concurrency.release)
+        self.concurrency.release()
+        return result
+
+    def call(self, send, request):
+        # `send(**request)` returns (result, headers) or raises an SDK error.
+        model = request.get("model")
+        for attempt in range(self.max_retries + 1):
+            self._before()
+            epoch = self.concurrency.acquire()
+            try:
+                # Reserved only once a slot is free, so the buckets reflect the latest headers by then.
+                wait = self.reserve(request)
+                if wait:
+                    time.sleep(wait)
+                result, headers = send(**request)
+            except Exception as e:
+                self.concurrency.release()
+                time.sleep(self._handle_error(model, e, epoch, attempt))
+                continue
+            except BaseException:
+                self.concurrency.release()
+                raise
+            return self._on_response(model, headers, result, request.get("stream"))
+
+    async def acall(self, send, request):
+        model = request.get("model")
+        for attempt in range(self.max_retries + 1):
+            self._before()
+            epoch = await self.concurrency.aacquire()
+            try:
+                wait = self.reserve(request)
+                if wait:
+                    await asyncio.sleep(wait)
+                result, headers = await send(**request)
+            except Exception as e:
+                self.concurrency.release()
+                await asyncio.sleep(self._handle_error(model, e, epoch, attempt))
+                continue
+            except BaseException:
+                self.concurrency.release()
+                raise
+            return self._on_response(model, headers, result, request.get("stream"))
+
+    def stats(self):
+        with self._lock:
+            buckets = {
+                model: {name: {"capacity": bucket.capacity, "available": round(bucket.tokens, 1),
+                               "per_second": round(bucket.rate, 3)}
+                        for name, bucket in model_buckets.items() if bucket.capacity is not None}
+                for model, model_buckets in self._buckets.items()
+            }
+            return {
+                **self.counters,
+                "throttle_seconds": round(self.throttle_seconds, 3),
+                "concurrency_limit": round(self.concurrency.limit, 2),
+                "in_flight": self.concurrency.in_flight,
+                "circuit": self.breaker.state,
+                "buckets": buckets,
+            }
+
+
+class ReleasingStream:
+    # Wraps a sync or async completion stream and releases its concurrency slot once it is consumed or closed.
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+        self._released = False
+        self._release_lock = threading.Lock()
+
+    def _done(self):
+        with self._release_lock:
+            if self._released:
+                return
+            self._released = True
+        self._release()
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self._done()
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            self._done()
+
+    def close(self):
+        self._done()
+        return self._stream.close()
+
+    def __del__(self):
+        self._done()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _RateLimitedCompletions:
+    def __init__(self, completions, limiter):
+        self._completions = completions
+        self._limiter = limiter
+
+    def _send(self, **kwargs):
+        # with_raw_response exposes the rate-limit headers; clients without it (test doubles) just get no headers.
+        raw = getattr(self._completions, "with_raw_response", None)
+        if raw is None:
+            return self._completions.create(**kwargs), {}
+        response = raw.create(**kwargs)
+        return response.parse(), response.headers
+
+    def create(self, **kwargs):
+        return self._limiter.call(self._send, kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class _AsyncRateLimitedCompletions(_RateLimitedCompletions):
+    async def _send(self, **kwargs):
+        raw = getattr(self._completions, "with_raw_response", None)
+        if raw is None:
+            return await self._completions.create(**kwargs), {}
+        response = await raw.create(**kwargs)
+        return response.parse(), response.headers
+
+    async def create(self, **kwargs):
+        return await self._limiter.acall(self._send, kwargs)
+
+
+class _RateLimitedChat:
+    def __init__(self, chat, completions):
+        self._chat = chat
+        self.completions = completions
+
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+
+class RateLimitedClient:
+    def __init__(self, client, limiter, completions_class=_RateLimitedCompletions):
+        self._client = client
+        self.limiter = limiter
+        self.chat = _RateLimitedChat(client.chat, completions_class(client.chat.completions, limiter))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
+
+
+def rate_limit_client(client):
+    return RateLimitedClient(client, get_rate_limiter())
+
+
+def rate_limit_async_client(client):
+    return RateLimitedClient(client, get_rate_limiter(), completions_class=_AsyncRateLimitedCompletions)
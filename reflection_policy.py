@@ -0,0 +1,74 @@
+import threading
+from config import Config
+
+# Without a policy every chat made exactly three calls: answer, grade, regenerate.
+BASELINE_CALLS_PER_CHAT = 3
+
+
+class ReflectionPolicy:
+    def __init__(self, threshold=Config.REFLECTION_SCORE_THRESHOLD, max_rounds=Config.REFLECTION_MAX_ROUNDS,
+                 include_critique=True):
+        self.threshold = threshold
+        self.max_rounds = max_rounds
+        self.include_critique = include_critique
+
+    def should_grade(self, rounds):
+        # Grading after the last allowed regeneration could not change anything, so skip the call.
+        return rounds < self.max_rounds
+
+    def should_regenerate(self, grade, rounds):
+        if rounds >= self.max_rounds or grade.get("graded") is False:
+            return False
+        # An unparseable grade is treated as failing, which matches the old always-regenerate behaviour.
+        return grade["score"] is None or grade["score"] < self.threshold
+
+    def build_retry_prompt(self, user_prompt, response, grade):
+        if not self.include_critique:
+            return user_prompt
+        score = f"{grade['score']:.1f}/10" if grade["score"] is not None else "ungraded"
+        return (
+            f"{user_prompt}\n\n"
+            f"A previous answer to this request scored {score}.\n"
+            f"Previous answer:\n{response}\n\n"
+            f"Reviewer critique:\n{grade['critique']}\n\n"
+            f"Write an improved answer that addresses the critique."
+        )
+
+
+class ReflectionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chats = 0
+        self.calls = 0
+        self.grades = 0
+        self.regenerations = 0
+        self.early_exits = 0
+        self.regeneration_seconds = 0.0
+
+    def record(self, grades, regenerations, early_exit, regeneration_seconds):
+        with self._lock:
+            self.chats += 1
+            self.grades += grades
+            self.regenerations += regenerations
+            self.calls += 1 + grades + regenerations
+            self.early_exits += 1 if early_exit else 0
+            self.regeneration_seconds += regeneration_seconds
+
+    def summary(self):
+        with self._lock:
+            baseline_calls = self.chats * BASELINE_CALLS_PER_CHAT
+            avg_regeneration = self.regeneration_seconds / self.regenerations if self.regenerations else 0.0
+            return {
+                "chats": self.chats,
+                "calls": self.calls,
+                "baseline_calls": baseline_calls,
+                "calls_saved": baseline_calls - self.calls,
+                "grades": self.grades,
+                "regenerations": self.regenerations,
+                "early_exits": self.early_exits,
+                # Every early exit skips one regeneration; estimate its cost from the regenerations that did run.
+                "estimated_seconds_saved": self.early_exits * avg_regeneration,
+            }
+
+
+reflection_stats = ReflectionStats()
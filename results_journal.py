@@ -0,0 +1,80 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def sample_id(benchmark, prompt):
+    return hashlib.sha256(f"{benchmark}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def journal_path(run_id, journal_dir=None):
+    return os.path.join(journal_dir or Config.BENCHMARK_JOURNAL_DIR, f"{run_id}.jsonl")
+
+
+class ResultsJournal:
+    # Append-only JSONL log of per-sample benchmark results. Every record is flushed and fsynced as soon as the
+    # sample finishes, so a crashed run loses at most the sample in flight; reopening the same file resumes it.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}
+        self._file = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        # A crash mid-write leaves a partial last line; cut it off so the next append starts on a clean line.
+        complete = data[:data.rfind(b"\n") + 1]
+        if len(complete) != len(data):
+            logging.warning(f"Dropping incomplete last record of {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(len(complete))
+        for line in complete.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Skipping unreadable record in {self.path}")
+                continue
+            self._records[(record["benchmark"], record["sample_id"])] = record
+        logging.info(f"Loaded {len(self._records)} records from {self.path}")
+
+    def get(self, benchmark, sample_id):
+        with self._lock:
+            return self._records.get((benchmark, sample_id))
+
+    def is_done(self, benchmark, sample_id):
+        record = self.get(benchmark, sample_id)
+        return record is not None and record.get("status") == "ok"
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._records[(record["benchmark"], record["sample_id"])] = record
+
+    def records(self, benchmark=None):
+        with self._lock:
+            return [record for (name, _), record in self._records.items() if benchmark is None or name == benchmark]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,101 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from results_journal import ResultsJournal, journal_path
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def parse_shard(spec):
+    # "i/N" -> (i, N), with 0 <= i < N
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got: {spec}")
+    if not 0 <= index < count:
+        raise ValueError(f"Shard index must be in [0, {count}), got: {spec}")
+    return index, count
+
+
+def shard_run_id(run_id, index, count):
+    return f"{run_id}.shard-{index}-of-{count}"
+
+
+def run_shard(run_id, index, count, num_samples, seed=None, llm_cache_mode=None):
+    # Runs every benchmark on one shard of the samples; the shard's journal is its result.
+    from benchmark_testing import BenchmarkTesting
+
+    benchmark = BenchmarkTesting(llm_cache_mode=llm_cache_mode, seed=seed, shard=(index, count),
+                                 run_id=shard_run_id(run_id, index, count))
+    start = time.perf_counter()
+    benchmark.run_all_benchmarks(num_samples)
+    benchmark.journal.close()
+    logging.info(f"Shard {index}/{count} finished in {time.perf_counter() - start:.1f}s")
+    return benchmark.journal.path
+
+
+def merge_shards(run_id, count):
+    # Aggregates are recomputed from the union of all shard journals, so they equal an unsharded run's.
+    from benchmark_testing import BenchmarkTesting
+
+    records = []
+    for index in range(count):
+        path = journal_path(shard_run_id(run_id, index, count))
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Missing journal for shard {index}/{count}: {path}")
+        records.extend(ResultsJournal(path).records())
+    logging.info(f"Merging {len(records)} records from {count} shards of run {run_id}")
+    return BenchmarkTesting(run_id=run_id).aggregate(records)
+
+
+def run_sharded(run_id, workers, num_samples, seed=None, llm_cache_mode=None):
+    # Spawned workers start clean: no inherited event loop threads, browser pools or open SQLite handles.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(run_shard, run_id, index, workers, num_samples, seed, llm_cache_mode)
+                   for index in range(workers)]
+        for future in futures:
+            future.result()
+    return merge_shards(run_id, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmarks split into shards, locally or across machines.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--workers", type=int, help="run all shards in a local process pool and merge them")
+    mode.add_argument("--shard", help="run only shard i/N (one independent worker invocation)")
+    mode.add_argument("--merge", type=int, metavar="N", help="merge the journals of all N shards of --run-id")
+    parser.add_argument("--run-id", help="shared by all shards of one run; defaults to a timestamp")
+    parser.add_argument("--num-samples", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--llm-cache-mode", default="record")
+    parser.add_argument("--plot", action="store_true")
+    args = parser.parse_args()
+
+    if (args.shard or args.merge) and not args.run_id:
+        parser.error("--shard and --merge need the --run-id shared by all shards")
+    run_id = args.run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+    if args.shard:
+        index, count = parse_shard(args.shard)
+        path = run_shard(run_id, index, count, args.num_samples, args.seed, args.llm_cache_mode)
+        print(f"Shard {index}/{count} of run {run_id} journaled in {path}")
+        print(f"Once all shards are done: python sharded_benchmark.py --merge {count} --run-id {run_id}")
+        sys.exit(0)
+
+    if args.workers:
+        results = run_sharded(run_id, args.workers, args.num_samples, args.seed, args.llm_cache_mode)
+    else:
+        results = merge_shards(run_id, args.merge)
+
+    print(f"\nBenchmark Results (run {run_id}):")
+    print(f"Question Answering: BLEU {results['qa'].get('bleu', 0):.4f}, ROUGE {results['qa'].get('rouge', {})}")
+    print(f"Summarization: ROUGE {results['summarization']}")
+    print(f"Sentiment Analysis: Accuracy {results['sentiment_analysis']:.4f}")
+    if args.plot:
+        from benchmark_testing import BenchmarkTesting
+        BenchmarkTesting(run_id=run_id).plot_results(results)
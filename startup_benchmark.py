@@ -0,0 +1,86 @@
+import argparse
+import json
+import logging
+import statistics
+import subprocess
+import sys
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CORE_MODULES = [
+    "config",
+    "load_client",
+    "function_calling_usage",
+    "grade_response_with_llm",
+    "image_vision_usage",
+    "chat_flow",
+    "generate_idea",
+    "process_generated_ideas",
+    "benchmark_testing",
+]
+
+# Runs in a fresh interpreter: network is blocked so any import-time API call or download fails loudly,
+# and the thread count catches background workers started at import.
+PROBE = """
+import json, socket, sys, threading, time
+def _blocked(*args, **kwargs):
+    raise RuntimeError("network access during import")
+socket.socket.connect = _blocked
+socket.create_connection = _blocked
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "threads": threading.active_count()}}))
+"""
+
+
+def measure_import(module, repeats):
+    timings = []
+    threads = 1
+    for _ in range(repeats):
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "unknown error"
+            return {"module": module, "error": error}
+        probe = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(probe["seconds"])
+        threads = max(threads, probe["threads"])
+    return {"module": module, "median_ms": statistics.median(timings) * 1000, "threads": threads}
+
+
+def run_startup_benchmark(modules=CORE_MODULES, budget_ms=Config.STARTUP_IMPORT_BUDGET_MS, repeats=5):
+    results = [measure_import(module, repeats) for module in modules]
+    failures = []
+    for result in results:
+        if "error" in result:
+            failures.append(f"{result['module']}: import failed ({result['error']})")
+        elif result["median_ms"] > budget_ms:
+            failures.append(f"{result['module']}: {result['median_ms']:.1f} ms exceeds budget of {budget_ms} ms")
+        elif result["threads"] > 1:
+            failures.append(f"{result['module']}: started {result['threads'] - 1} background thread(s) at import")
+    return results, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if cold import time of the core modules exceeds the budget.")
+    parser.add_argument("--budget-ms", type=float, default=Config.STARTUP_IMPORT_BUDGET_MS)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=CORE_MODULES)
+    args = parser.parse_args()
+
+    results, failures = run_startup_benchmark(args.modules, args.budget_ms, args.repeats)
+    for result in results:
+        if "error" in result:
+            print(f"{result['module']:<28} ERROR  {result['error']}")
+        else:
+            print(f"{result['module']:<28} {result['median_ms']:8.1f} ms")
+
+    if failures:
+        for failure in failures:
+            logging.error(failure)
+        sys.exit(1)
+    print(f"All modules imported within {args.budget_ms} ms")
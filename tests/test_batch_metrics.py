@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from batch_metrics import BatchMetrics, lcs_length
+
+REFERENCES = [
+    "The cat sat on the mat near the door.",
+    "Running quickly, the runners ran past the finish line.",
+    "A short answer.",
+    "Nothing in common here at all.",
+    "",
+    "the quick brown fox jumps over the lazy dog today",
+]
+CANDIDATES = [
+    "The cat was sitting on the mat by the door.",
+    "The runner runs quickly past the line.",
+    "A short answer.",
+    "Completely different words entirely.",
+    "Some text.",
+    "the quick brown fox jumped over the lazy dog today",
+]
+
+
+def split_tokenize(texts):
+    # Avoids nltk's punkt data, which word_tokenize needs.
+    return [text.split() for text in texts]
+
+
+def dp_lcs(a, b):
+    table = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            table[i + 1][j + 1] = table[i][j] + 1 if x == y else max(table[i][j + 1], table[i + 1][j])
+    return table[-1][-1]
+
+
+def test_lcs_length_matches_dynamic_programming():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        a = rng.integers(0, 5, size=rng.integers(0, 80))
+        b = rng.integers(0, 5, size=rng.integers(0, 80))
+        assert lcs_length(a, b) == dp_lcs(a.tolist(), b.tolist())
+
+
+def test_rouge_matches_rouge_score():
+    rouge_scorer = pytest.importorskip("rouge_score.rouge_scorer")
+    scorer = rouge_scorer.RougeScorer(["rouge1", "rouge2", "rougeL"], use_stemmer=True)
+    scores = BatchMetrics(bleu_tokenize=split_tokenize).rouge(REFERENCES, CANDIDATES)
+    for i, (reference, candidate) in enumerate(zip(REFERENCES, CANDIDATES)):
+        expected = scorer.score(reference, candidate)
+        for key in ("rouge1", "rouge2", "rougeL"):
+            assert scores[key][i] == pytest.approx(expected[key].fmeasure), (key, i)
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")  # nltk warns about every pair without 4-gram overlaps
+def test_bleu_matches_nltk():
+    bleu_score = pytest.importorskip("nltk.translate.bleu_score")
+    scores = BatchMetrics(bleu_tokenize=split_tokenize).bleu(REFERENCES, CANDIDATES)
+    for i, (reference, candidate) in enumerate(zip(REFERENCES, CANDIDATES)):
+        expected = bleu_score.sentence_bleu([reference.split()], candidate.split())
+        assert scores[i] == pytest.approx(expected, abs=1e-9), i
+    assert 0.4 < scores[-1] < 1
+
+
+def test_repeated_texts_are_tokenized_once():
+    calls = []
+
+    def tokenize(texts):
+        calls.append(list(texts))
+        return split_tokenize(texts)
+
+    metrics = BatchMetrics(bleu_tokenize=tokenize)
+    metrics.bleu(["same reference", "same reference"], ["one", "two"])
+    metrics.bleu(["same reference"], ["one"])
+    assert calls == [["same reference"], ["one", "two"]]
+
+
+def test_averages():
+    assert BatchMetrics.averages({"bleu": np.array([0.5, 1.0]), "rouge1": np.array([])}) == {"bleu": 0.75, "rouge1": 0.0}
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from benchmark_datasets import LocalDataset
+
+ROWS = [{"id": i} for i in range(10)]
+
+
+def write_jsonl(path, rows, blank_every=0):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, row in enumerate(rows):
+            f.write(json.dumps(row) + "\n")
+            if blank_every and i % blank_every == 0:
+                f.write("\n   \n")
+    return str(path)
+
+
+def ids(dataset):
+    return [row["id"] for row in dataset]
+
+
+def test_sequential_read_honors_num_samples(tmp_path):
+    path = write_jsonl(tmp_path / "split.jsonl", ROWS)
+    assert ids(LocalDataset(path, num_samples=3)) == [0, 1, 2]
+
+
+@pytest.mark.parametrize("seed", [None, 7])
+def test_blank_lines_do_not_change_the_selection(tmp_path, seed):
+    clean = write_jsonl(tmp_path / "clean.jsonl", ROWS)
+    padded = write_jsonl(tmp_path / "padded.jsonl", ROWS, blank_every=2)
+    assert ids(LocalDataset(padded, num_samples=6, seed=seed)) == ids(LocalDataset(clean, num_samples=6, seed=seed))
+
+
+@pytest.mark.parametrize("seed", [None, 3])
+def test_shards_cover_the_unsharded_run(tmp_path, seed):
+    path = write_jsonl(tmp_path / "split.jsonl", ROWS, blank_every=3)
+    full = ids(LocalDataset(path, num_samples=8, seed=seed))
+    shards = [ids(LocalDataset(path, num_samples=8, seed=seed, shard=(i, 3))) for i in range(3)]
+    assert sorted(sum(shards, [])) == sorted(full)
+    assert [len(shard) for shard in shards] == [3, 3, 2]
+
+
+def test_json_array_file(tmp_path):
+    path = tmp_path / "split.json"
+    path.write_text(json.dumps(ROWS), encoding="utf-8")
+    assert ids(LocalDataset(str(path), num_samples=4)) == [0, 1, 2, 3]
+    assert sorted(ids(LocalDataset(str(path), seed=1))) == list(range(10))
+
+
+def test_invalid_shard():
+    with pytest.raises(ValueError):
+        LocalDataset("split.jsonl", shard=(3, 3))
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+import caching
+from caching import Cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_cache(tmp_path, **kwargs):
+    return Cache(cache_dir=str(tmp_path), sweep_interval=0, **kwargs)
+
+
+def test_running_totals_track_sets_and_replacements(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 20)
+    cache.set("a", "z" * 5)
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == len('"zzzzz"') + len('"' + "y" * 20 + '"')
+    assert (stats["entries"], stats["bytes"]) == tuple(cache._totals())
+    cache.close()
+
+
+def test_entry_cap_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_entries=3)
+    for i in range(5):
+        cache.set(f"key{i}", i)
+    assert cache.stats()["entries"] == 3
+    assert cache.get("key0") is None
+    assert cache.get("key4") == 4
+    cache.close()
+
+
+def test_sweep_reconciles_totals(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("old", "value", expiry_hours=-1)
+    cache.set("new", "value")
+    assert cache.sweep() == 1
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+
+def test_import_has_no_side_effects(tmp_path):
+    # Importing the module must neither create cache/ nor start the sweeper thread.
+    probe = "import threading, caching; print(threading.active_count())"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, "-c", probe], cwd=tmp_path, env=env, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "1"
+    assert not (tmp_path / "cache").exists()
+
+
+def test_shared_cache_is_built_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(caching, "_cache", None)
+    shared = caching.get_cache()
+    assert caching.get_cache() is shared
+    assert (tmp_path / "cache").is_dir()
+    shared.close()
@@ -0,0 +1,65 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from chat_flow import ChatFlow
+from load_client import use_client_factories
+from reflection_policy import ReflectionPolicy
+
+
+class StubAsyncClient:
+    # Answers each prompt after a random delay, recording every request and how many ran at once.
+    def __init__(self, log):
+        self.log = log
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **request):
+        self.log["running"] += 1
+        self.log["peak"] = max(self.log["peak"], self.log["running"])
+        self.log["requests"].append(request["messages"])
+        await asyncio.sleep(random.uniform(0.001, 0.02))
+        self.log["running"] -= 1
+        message = SimpleNamespace(content=f"answer to {request['messages'][-1]['content']}", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def log():
+    log = {"running": 0, "peak": 0, "requests": [], "clients": 0}
+
+    def make_client():
+        log["clients"] += 1
+        return StubAsyncClient(log)
+
+    use_client_factories(async_factory=make_client)
+    yield log
+    use_client_factories()
+
+
+def no_grading():
+    return ReflectionPolicy(max_rounds=0)
+
+
+def test_abatch_keeps_each_prompt_separate(log):
+    flow = ChatFlow(policy=no_grading())
+    prompts = [f"prompt {i}" for i in range(20)]
+    assert asyncio.run(flow.abatch(prompts)) == [f"answer to {prompt}" for prompt in prompts]
+    assert sorted(messages[-1]["content"] for messages in log["requests"]) == sorted(prompts)
+    assert all([message["role"] for message in messages] == ["user"] for messages in log["requests"])
+    assert flow.messages == []
+
+
+def test_abatch_honours_max_concurrency(log):
+    asyncio.run(ChatFlow(policy=no_grading()).abatch([f"prompt {i}" for i in range(12)], max_concurrency=3))
+    assert len(log["requests"]) == 12
+    assert log["peak"] == 3
+
+
+def test_sync_chat_runs_on_one_background_loop(log):
+    flow = ChatFlow(policy=no_grading())
+    assert flow.chat("first") == "answer to first"
+    assert flow.chat("second") == "answer to second"
+    assert [message["content"] for message in flow.messages] == ["first", "answer to first", "second", "answer to second"]
+    assert log["clients"] == 1  # the loop, and with it the async client, is reused between calls
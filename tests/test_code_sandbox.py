@@ -0,0 +1,62 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import code_sandbox
+import tool_registry
+from code_sandbox import CodeSandbox
+
+FAILED_RUN = {"ok": False, "exit_code": None, "stdout": "", "stderr": "Timed out after 30s", "timed_out": True,
+              "duration_s": 30.0}
+
+
+class NoCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, **kwargs):
+        pass
+
+
+class CountingSandbox(CodeSandbox):
+    # Records how many snippets execute at once instead of starting interpreters.
+    def __init__(self, **kwargs):
+        super().__init__(cache=NoCache(), **kwargs)
+        self.running = self.peak = 0
+        self.executions = []
+
+    def _execute(self, code):
+        with self._lock:
+            self.executions.append(code)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self._lock:
+            self.running -= 1
+        return dict(FAILED_RUN)
+
+
+def test_direct_runs_share_the_worker_limit():
+    sandbox = CountingSandbox(max_workers=2)
+    threads = [threading.Thread(target=sandbox.run, args=(f"print({i})",)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    sandbox.run_many(["print('a')", "print('b')"])
+    for thread in threads:
+        thread.join()
+    sandbox.shutdown()
+    assert len(sandbox.executions) == 8
+    assert sandbox.peak == 2
+
+
+def test_failing_test_code_is_reported_without_running_again(monkeypatch):
+    sandbox = CountingSandbox(max_workers=1)
+    reported = []
+    handler = SimpleNamespace(report=lambda code, result: reported.append((code, result)) or "debugged",
+                              test_code=lambda code: sandbox.run(code))
+    monkeypatch.setattr(code_sandbox, "get_code_sandbox", lambda: sandbox)
+    monkeypatch.setattr(tool_registry, "get_autogen_handler", lambda: handler)
+
+    assert tool_registry.test_code_tool("while True: pass") == "Code test results:\ndebugged"
+    assert sandbox.executions == ["while True: pass"]
+    assert reported[0][1]["timed_out"]
@@ -0,0 +1,98 @@
+import pytest
+
+from content_extractor import ContentExtractor, available_backends, extract_chunks, render_chunks, select_chunks
+
+ARTICLE = "<p>Main article text that explains the topic in full sentences.</p>"
+
+
+def collect(html, backend):
+    extractor = ContentExtractor(backend=backend)
+    extractor.feed(html)
+    extractor.close()
+    return [(block["text"], block["boilerplate"]) for block in extractor.collector.blocks]
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_bare_text_in_boilerplate_tags_is_its_own_block(backend):
+    html = (f"<html><body><main>{ARTICLE}Closing remark after the paragraph</main>"
+            "<aside>Related reading about other topics</aside>"
+            "<footer>Copyright 2024 Example Corp all rights</footer></body></html>")
+    assert collect(html, backend) == [
+        ("Main article text that explains the topic in full sentences.", False),
+        ("Closing remark after the paragraph", False),
+        ("Related reading about other topics", True),
+        ("Copyright 2024 Example Corp all rights", True),
+    ]
+    assert [chunk["text"] for chunk in extract_chunks(html, backend=backend)] == [
+        "Main article text that explains the topic in full sentences.\nClosing remark after the paragraph"
+    ]
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_inline_boilerplate_is_split_from_surrounding_text(backend):
+    html = "<p>Shared text before <span class='share'>Share this on social media</span> and after</p>"
+    assert collect(html, backend) == [
+        ("Shared text before", False),
+        ("Share this on social media", True),
+        ("and after", False),
+    ]
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_hidden_and_link_heavy_text_is_dropped(backend):
+    html = (f"<html><head><title>Title</title><style>p {{color: red}}</style></head><body>"
+            f"<script>var tracking = 1;</script><div style='display: none'>Hidden promo text here</div>"
+            f"<ul><li><a href='/a'>Link one here</a></li><li><a href='/b'>Link two here</a></li></ul>"
+            f"{ARTICLE}</body></html>")
+    assert [chunk["text"] for chunk in extract_chunks(html, backend=backend)] == [
+        "Main article text that explains the topic in full sentences."
+    ]
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_boilerplate_is_used_when_nothing_else_is_left(backend):
+    html = "<body><nav>Only navigation text on this page</nav></body>"
+    assert [chunk["text"] for chunk in extract_chunks(html, backend=backend)] == ["Only navigation text on this page"]
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_headings_start_chunks_and_long_blocks_are_split(backend):
+    sentence = "This sentence has exactly eight short words in it. "
+    html = f"<h1>First</h1><p>{sentence * 30}</p><h2>Second</h2><p>Short closing paragraph.</p><pre>a  b\n  c</pre>"
+    chunks = extract_chunks(html, chunk_tokens=64, backend=backend)
+    assert all(chunk["tokens"] <= 64 for chunk in chunks)
+    assert {chunk["heading"] for chunk in chunks[:-1]} == {"First"}
+    assert chunks[-1]["heading"] == "Second"
+    assert chunks[-1]["text"] == "Short closing paragraph.\na  b\n  c"
+    assert [chunk["index"] for chunk in chunks] == list(range(len(chunks)))
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_streamed_pieces_give_the_same_chunks(backend):
+    html = "".join(f"<h2>Part {i}</h2><p>Paragraph {i} has a few words, and a full stop.</p>" for i in range(50))
+    assert extract_chunks(html, backend=backend, piece_chars=7) == extract_chunks(html, backend=backend)
+
+
+def test_input_past_max_chars_is_ignored():
+    extractor = ContentExtractor(max_chars=len(ARTICLE), backend="html.parser")
+    extractor.feed(ARTICLE)
+    extractor.feed("<p>Text past the limit that is never parsed.</p>")
+    assert extractor.truncated
+    assert [chunk["text"] for chunk in extractor.close()] == ["Main article text that explains the topic in full sentences."]
+
+
+def chunk(index, text, tokens, score, heading=""):
+    return {"index": index, "heading": heading, "text": text, "tokens": tokens, "score": score}
+
+
+def test_select_chunks_keeps_the_best_that_fit_in_page_order():
+    chunks = [chunk(0, "intro", 50, 0.5), chunk(1, "about solar panels", 50, 0.4), chunk(2, "best part", 50, 0.9)]
+    assert [c["index"] for c in select_chunks(chunks, token_budget=100)] == [0, 2]
+    assert [c["index"] for c in select_chunks(chunks, token_budget=100, query="solar panels")] == [1, 2]
+    oversized = select_chunks([chunk(0, "word " * 500, 500, 0.5)], token_budget=20)
+    assert oversized[0]["tokens"] == 20 and len(oversized[0]["text"]) < 500 * 5
+
+
+def test_render_chunks_marks_gaps_and_repeats_headings_only_for_new_sections():
+    chunks = [chunk(0, "one", 1, 1, "A"), chunk(1, "two", 1, 1, "A"), chunk(3, "four", 1, 1, "A"), chunk(4, "five", 1, 1, "B")]
+    assert render_chunks(chunks) == "A\none\n\ntwo\n\n[...]\n\nA\nfour\n\nB\nfive"
@@ -0,0 +1,71 @@
+import os
+import time
+
+from conversation_memory import ArtifactStore, ConversationMemory
+
+
+def make_memory(tmp_path, **kwargs):
+    return ConversationMemory(artifact_store=ArtifactStore(str(tmp_path)), **kwargs)
+
+
+def test_history_stays_within_budget(tmp_path):
+    memory = make_memory(tmp_path, token_budget=200, summary_token_limit=50)
+    for i in range(50):
+        memory.append({"role": "user", "content": f"Message number {i}. " + "word " * 20})
+    assert memory.total_tokens <= 200
+    assert memory.compactions > 0
+    assert memory.messages()[0]["role"] == "system"
+    assert memory.messages()[-1]["content"].startswith("Message number 49.")
+
+
+def test_recent_messages_survive_compaction(tmp_path):
+    memory = make_memory(tmp_path, token_budget=50, min_recent_messages=2)
+    for i in range(5):
+        memory.append({"role": "user", "content": f"Turn {i}. " + "word " * 30})
+    assert len(memory) >= 2
+
+
+def test_large_content_is_stored_out_of_line(tmp_path):
+    memory = make_memory(tmp_path, inline_token_limit=20)
+    content = "scraped page text " * 100
+    memory.append({"role": "tool", "content": content})
+    message = memory.messages()[-1]
+    assert "ref=" in message["content"]
+    assert memory.resolve(message["artifact_ref"]) == content
+    assert memory.for_model() == []
+
+
+def test_chat_flow_keeps_an_empty_custom_memory(tmp_path):
+    from chat_flow import ChatFlow
+
+    memory = make_memory(tmp_path, token_budget=123)
+    assert len(memory) == 0
+    assert ChatFlow(memory=memory).memory is memory
+
+
+def test_artifacts_are_capped_least_recently_used_first(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=2500, max_age_hours=1)
+    first, second = store.put("a" * 1000), store.put("b" * 1000)
+    assert store.get(first) == "a" * 1000  # now more recently used than the second
+    third = store.put("c" * 1000)
+    assert store.get(second) is None
+    assert store.get(first) == "a" * 1000 and store.get(third) == "c" * 1000
+    assert store.stats() == {"artifacts": 2, "bytes": 2000}
+    assert sorted(os.listdir(tmp_path)) == sorted([f"{first}.txt", f"{third}.txt"])
+
+
+def test_artifacts_expire_and_survive_restarts(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_age_hours=1)
+    old = store.put("old page text")
+    stale = time.time() - 7200
+    os.utime(tmp_path / f"{old}.txt", (stale, stale))
+
+    reopened = ArtifactStore(str(tmp_path), max_age_hours=1)
+    assert reopened.stats()["artifacts"] == 1
+    new = reopened.put("new page text")
+    assert reopened.get(old) is None and reopened.get(new) == "new page text"
+    assert os.listdir(tmp_path) == [f"{new}.txt"]
+
+
+def test_memories_share_one_artifact_store():
+    assert ConversationMemory().artifact_store is ConversationMemory().artifact_store
@@ -0,0 +1,43 @@
+import asyncio
+
+from generate_idea import CallBudget, IdeaGenerator
+
+
+class StubGenerator(IdeaGenerator):
+    # Skips the real constructor (ChatFlow, idea store, index); candidates score higher every round.
+    def __init__(self):
+        self.best_idea = None
+        self.best_score = 0
+        self.saved = []
+        self.generated = 0
+
+    async def agenerate_candidate(self, semaphore, budget, parent=None, angle=None):
+        self.generated += 1
+        return {"idea": f"idea {self.generated}", "evaluation": "", "score": min(7.0, self.generated / 10),
+                "sentiment": 0.0, "duplicate": False}
+
+    def save_idea(self, idea, evaluation, score, sentiment, iteration):
+        self.saved.append(iteration)
+
+
+def test_population_search_returns_rounds_run():
+    generator = StubGenerator()
+    rounds = asyncio.run(generator.apopulation_search(population_size=4, beam_width=2, max_rounds=3, call_budget=100))
+    assert rounds == 3
+    assert len(generator.saved) == 12
+    assert generator.best_idea == "idea 12"
+
+
+def test_population_search_stops_when_budget_runs_out():
+    generator = StubGenerator()
+    rounds = asyncio.run(generator.apopulation_search(population_size=4, beam_width=2, max_rounds=5, call_budget=16))
+    assert rounds == 2
+
+
+def test_call_budget_reserve_and_refund():
+    budget = CallBudget(3)
+    assert budget.reserve(2)
+    assert not budget.reserve(2)
+    budget.refund(1)
+    assert budget.reserve(2)
+    assert budget.used == 3
@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from grading_engine import GradingEngine, parse_grade
+from load_client import use_client_factories
+from rate_limited_client import CircuitOpenError
+from reflection_policy import ReflectionPolicy
+
+
+def stub_client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+@pytest.fixture
+def client(request):
+    use_client_factories(lambda: stub_client(request.param))
+    yield
+    use_client_factories()
+
+
+def open_breaker(**request):
+    raise CircuitOpenError("circuit open")
+
+
+def grade_all(**request):
+    items = json.loads(request["messages"][-1]["content"])["items"]
+    return completion(json.dumps({"grades": [{"id": item["id"], "score": 8, "critique": "ok"} for item in items]}))
+
+
+def grade_nothing(**request):
+    return completion("not json")
+
+
+@pytest.mark.parametrize("client", [open_breaker], indirect=True)
+def test_unreachable_grader_is_not_graded_and_not_regenerated(client):
+    engine = GradingEngine(model="grader")
+    grades = engine.grade_batch([("question", "answer"), ("question 2", "answer 2")])
+    assert all(grade["graded"] is False and grade["score"] is None for grade in grades)
+    assert engine.calls == 1
+    assert not ReflectionPolicy(threshold=7, max_rounds=2).should_regenerate(grades[0], 0)
+
+
+@pytest.mark.parametrize("client", [grade_all], indirect=True)
+def test_batch_is_graded_in_one_call(client):
+    engine = GradingEngine(model="grader")
+    grades = engine.grade_batch([("q", "a"), ("q2", "a2"), ("q3", "a3")])
+    assert [grade["score"] for grade in grades] == [8, 8, 8]
+    assert engine.calls == 1
+
+
+@pytest.mark.parametrize("client", [grade_nothing], indirect=True)
+def test_unparseable_reply_is_retried_once_and_counts_as_failing(client):
+    engine = GradingEngine(model="grader")
+    grade = engine.grade("q", "a")
+    assert grade["score"] is None and "graded" not in grade
+    assert engine.calls == 2
+    assert ReflectionPolicy(threshold=7, max_rounds=2).should_regenerate(grade, 0)
+
+
+def test_parse_grade_falls_back_to_score_pattern():
+    assert parse_grade('```json\n{"score": 12, "critique": "fine"}\n```') == {"score": 10.0, "critique": "fine"}
+    assert parse_grade("Overall score: 6.5/10")["score"] == 6.5
+    assert parse_grade("no grade here")["score"] is None
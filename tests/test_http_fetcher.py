@@ -0,0 +1,83 @@
+import http.server
+import threading
+
+import pytest
+
+from caching import Cache
+from http_fetcher import HTTPFetcher
+from website_scraper import WebsiteScraper
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Mon, 05 Oct 2026 10:00:00 GMT"
+PAGE = "<html><body><main><p>" + "Static page content in plain sentences. " * 20 + "</p></main></body></html>"
+
+
+class PageHandler(http.server.BaseHTTPRequestHandler):
+    # Serves PAGE with validators and answers 304 to a matching conditional request.
+    requests = []
+
+    def do_GET(self):
+        PageHandler.requests.append({"if_none_match": self.headers.get("If-None-Match"),
+                                     "if_modified_since": self.headers.get("If-Modified-Since")})
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        body = PAGE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NoBrowserPool:
+    def lease(self):
+        raise AssertionError("the page should not need a browser")
+
+
+@pytest.fixture
+def url(monkeypatch):
+    monkeypatch.setattr(PageHandler, "requests", [])
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/article.html"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_sends_validators_and_reads_304(url):
+    fetcher = HTTPFetcher()
+    first = fetcher.fetch(url)
+    assert first.ok and first.is_html and "Static page content" in first.text
+    assert first.validators == {"etag": ETAG, "last_modified": LAST_MODIFIED}
+    second = fetcher.fetch(url, first.validators)
+    assert second.not_modified and second.text is None
+    assert PageHandler.requests[1] == {"if_none_match": ETAG, "if_modified_since": LAST_MODIFIED}
+    fetcher.close()
+
+
+def test_stale_scrape_is_revalidated_and_reuses_the_cached_body(url, tmp_path):
+    cache = Cache(cache_dir=str(tmp_path), sweep_interval=0)
+    scraper = WebsiteScraper(pool=NoBrowserPool(), fetcher=HTTPFetcher(), cache=cache)
+    key = f"scrape_chunks_{url}"
+
+    chunks = scraper.scrape_chunks(url)
+    assert chunks and "Static page content" in chunks[0]["text"]
+    assert cache.get_entry(key)["validators"] == {"etag": ETAG, "last_modified": LAST_MODIFIED}
+
+    cache.refresh(key, expiry_hours=-1)  # expire it, keeping it for revalidation
+    assert cache.get(key) is None and cache.get_entry(key)["expired"]
+    assert scraper.scrape_chunks(url) == chunks
+    assert PageHandler.requests[-1]["if_none_match"] == ETAG
+    assert not cache.get_entry(key)["expired"]
+
+    assert scraper.scrape_chunks(url) == chunks
+    assert len(PageHandler.requests) == 2  # the refreshed entry is a plain cache hit
+    cache.close()
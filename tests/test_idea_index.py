@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from idea_index import IdeaIndex, shingles
+
+IDEA = ("Measure how retrieval augmented generation changes factual accuracy of small language models "
+        "on long tail questions drawn from recent news articles")
+REWORDED = IDEA + " in several languages"
+OTHER = "Train a reinforcement learning agent to schedule batch jobs on a shared GPU cluster with preemption"
+
+
+def jaccard(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def test_shingles():
+    assert shingles("One two, THREE four") == {"one two three", "two three four"}
+    assert shingles("Just two") == {"just two"}
+    assert shingles("!!") == set()
+
+
+def test_signature_estimates_jaccard_similarity():
+    index = IdeaIndex(path=None)
+    estimate = (index.signature(IDEA) == index.signature(REWORDED)).mean()
+    assert estimate == pytest.approx(jaccard(IDEA, REWORDED), abs=0.1)
+    assert (index.signature(IDEA) == index.signature(OTHER)).mean() < 0.1
+    assert np.array_equal(index.signature(IDEA), IdeaIndex(path=None).signature(IDEA))
+
+
+def test_find_duplicate_only_above_threshold():
+    index = IdeaIndex(path=None, threshold=0.6)
+    assert index.find_duplicate(IDEA) is None
+    index.add(IDEA, title="rag")
+    duplicate = index.find_duplicate(REWORDED)
+    assert duplicate["title"] == "rag" and duplicate["id"] == 0 and duplicate["similarity"] >= 0.6
+    assert index.find_duplicate(OTHER) is None
+    strict = IdeaIndex(path=None, threshold=0.95)
+    strict.add(IDEA)
+    assert strict.find_duplicate(REWORDED) is None
+
+
+def test_index_is_reloaded_from_its_file(tmp_path):
+    path = str(tmp_path / "ideas" / "index.jsonl")
+    index = IdeaIndex(path=path)
+    index.add(IDEA, title="rag")
+    index.add(OTHER, title="scheduler")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("{not json\n")
+
+    reloaded = IdeaIndex(path=path)
+    assert len(reloaded) == 2
+    assert reloaded.find_duplicate(OTHER)["title"] == "scheduler"
+    assert reloaded.add("A third unrelated idea about compilers and register allocation") == 2
+
+
+def test_num_perm_must_split_into_bands():
+    with pytest.raises(ValueError):
+        IdeaIndex(path=None, num_perm=100, bands=16)
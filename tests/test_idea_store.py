@@ -0,0 +1,45 @@
+import pytest
+
+from idea_store import IdeaStore, idea_text
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = IdeaStore(str(tmp_path / "ideas.db"))
+    yield store
+    store.close()
+
+
+def test_search_treats_user_text_as_words(store):
+    store.add("An open-source toolkit for benchmarking LLM agents", "Useful", 8.0, 0.5, 1, run_id="a")
+    store.add('A "quoted" idea about closed models', "Niche", 6.0, 0.1, 2, run_id="a")
+    assert [idea["iteration"] for idea in store.search("open-source")] == [1]
+    assert [idea["iteration"] for idea in store.search('"quoted')] == [2]
+    assert [idea["iteration"] for idea in store.search('idea "about" OR NEAR(')] == []
+    assert store.search("   ") == []
+
+
+def write_idea_file(folder, iteration, idea, score):
+    with open(folder / f"idea_{iteration:03d}_score_{score:.2f}.txt", "w", encoding="utf-8") as f:
+        f.write(idea_text(idea, "Evaluation text", score, 0.25))
+
+
+def test_text_files_are_imported_once_even_into_a_used_store(store, tmp_path):
+    folder = tmp_path / "generated_ideas"
+    folder.mkdir()
+    # Saved since the store existed: the idea is in both the store and a file.
+    store.add("Already stored idea", "Evaluation text", 7.0, 0.25, 3, run_id="new")
+    write_idea_file(folder, 3, "Already stored idea", 7.0)
+    write_idea_file(folder, 1, "Legacy idea one", 6.5)
+    write_idea_file(folder, 2, "Legacy idea two", 9.0)
+
+    assert store.import_text_files(str(folder)) == 2
+    assert [(idea["idea"], idea["run_id"]) for idea in store.top(2)] == [("Legacy idea two", "legacy"),
+                                                                          ("Already stored idea", "new")]
+    write_idea_file(folder, 4, "Written after the migration", 5.0)
+    assert store.import_text_files(str(folder)) == 0
+    assert len(store) == 3
+
+    reopened = IdeaStore(store.path)
+    assert reopened.import_text_files(str(folder)) == 0
+    reopened.close()
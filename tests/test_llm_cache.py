@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+from llm_cache import CachedClient, LLMResponseCache
+
+
+def tool_turn(call_id, arguments, result):
+    return [
+        {"role": "user", "content": "Find the capital of France"},
+        {"role": "assistant", "content": "", "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "google_search", "arguments": arguments}},
+        ]},
+        {"role": "tool", "tool_call_id": call_id, "content": result},
+    ]
+
+
+def test_replay_key_ignores_tool_call_ids_and_tool_output(tmp_path):
+    cache = LLMResponseCache(cache_dir=str(tmp_path), mode="replay")
+    first = cache.make_key({"model": "m", "messages": tool_turn("call_1", '{"query": "paris"}', "results on Monday")})
+    second = cache.make_key({"model": "m", "messages": tool_turn("call_2", '{"query": "paris"}', "results on Tuesday")})
+    assert first == second
+
+
+def test_record_key_includes_tool_output(tmp_path):
+    cache = LLMResponseCache(cache_dir=str(tmp_path), mode="record")
+    first = cache.make_key({"model": "m", "messages": tool_turn("call_1", '{"query": "paris"}', "results on Monday")})
+    assert first == cache.make_key({"model": "m", "messages": tool_turn("call_2", '{"query": "paris"}', "results on Monday")})
+    assert first != cache.make_key({"model": "m", "messages": tool_turn("call_1", '{"query": "paris"}', "results on Tuesday")})
+
+
+def test_key_changes_with_tool_arguments_and_model(tmp_path):
+    cache = LLMResponseCache(cache_dir=str(tmp_path), mode="record")
+    base = cache.make_key({"model": "m", "messages": tool_turn("call_1", '{"query": "paris"}', "results")})
+    assert base != cache.make_key({"model": "m", "messages": tool_turn("call_1", '{"query": "rome"}', "results")})
+    assert base != cache.make_key({"model": "other", "messages": tool_turn("call_1", '{"query": "paris"}', "results")})
+
+
+def test_record_then_replay_round_trip(tmp_path):
+    recorder = LLMResponseCache(cache_dir=str(tmp_path), mode="record")
+    key = recorder.make_key({"model": "m", "messages": [{"role": "user", "content": "hi"}]})
+    recorder.set(key, {"answer": 1})
+    replayer = LLMResponseCache(cache_dir=str(tmp_path), mode="replay")
+    assert replayer.get(key) == {"answer": 1}
+    assert replayer.get("missing") is None
+    assert replayer.stats()["hits"] == 1 and replayer.stats()["misses"] == 1
+
+
+def test_recorded_tool_answers_replay_but_are_not_reused_for_new_tool_output(tmp_path):
+    ChatCompletion = pytest.importorskip("openai.types.chat").ChatCompletion
+    answers = iter(["Paris", "Paris, per the new results"])
+    calls = []
+
+    def create(**request):
+        calls.append(request)
+        message = {"role": "assistant", "content": next(answers)}
+        return ChatCompletion.model_validate({"id": "c", "object": "chat.completion", "created": 0, "model": "m",
+                                              "choices": [{"index": 0, "finish_reason": "stop", "message": message}]})
+
+    recorder = LLMResponseCache(cache_dir=str(tmp_path), mode="record")
+    client = CachedClient(SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))), recorder)
+    monday = {"model": "m", "messages": tool_turn("call_1", '{"query": "paris"}', "results on Monday")}
+    tuesday = {"model": "m", "messages": tool_turn("call_2", '{"query": "paris"}', "results on Tuesday")}
+    client.chat.completions.create(**monday)
+    assert client.chat.completions.create(**monday).choices[0].message.content == "Paris"
+    assert client.chat.completions.create(**tuesday).choices[0].message.content == "Paris, per the new results"
+    assert len(calls) == 2
+
+    replayer = LLMResponseCache(cache_dir=str(tmp_path), mode="replay")
+    replay_client = CachedClient(SimpleNamespace(chat=SimpleNamespace(completions=None)), replayer)
+    friday = {"model": "m", "messages": tool_turn("call_9", '{"query": "paris"}', "results on Friday")}
+    assert replay_client.chat.completions.create(**friday).choices[0].message.content == "Paris, per the new results"
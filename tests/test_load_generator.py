@@ -0,0 +1,59 @@
+import asyncio
+import random
+
+import chat_flow
+from load_generator import is_saturated, run_level
+
+
+class FlakyChatFlow:
+    async def achat(self, prompt):
+        await asyncio.sleep(0.001)
+        if prompt.endswith("0)"):
+            raise ValueError("unparseable response")
+        return "answer"
+
+
+def test_unexpected_errors_are_recorded_not_raised(monkeypatch):
+    monkeypatch.setattr(chat_flow, "ChatFlow", FlakyChatFlow)
+    level = asyncio.run(run_level(200, 0.25, 5, random.Random(1)))
+    assert level["sent"] > 10
+    assert level["errors"] == (level["sent"] + 9) // 10
+    assert level["error_types"] == {"ValueError": level["errors"]}
+    assert level["completed"] == level["sent"] - level["errors"]
+    assert level["throughput_rps"] <= level["sent_rps"]
+    assert is_saturated(level)
+
+
+class SlowChatFlow:
+    # Every chat takes the same, long time, but any number can run at once: the pipeline keeps up.
+    async def achat(self, prompt):
+        await asyncio.sleep(0.3)
+        return "answer"
+
+
+class SerialChatFlow:
+    # One chat at a time, 10 ms each: capacity is about 100 chats/s.
+    lock = None
+
+    async def achat(self, prompt):
+        SerialChatFlow.lock = SerialChatFlow.lock or asyncio.Lock()
+        async with SerialChatFlow.lock:
+            await asyncio.sleep(0.01)
+        return "answer"
+
+
+def test_slow_chats_that_keep_up_are_not_saturated(monkeypatch):
+    monkeypatch.setattr(chat_flow, "ChatFlow", SlowChatFlow)
+    level = asyncio.run(run_level(100, 0.5, 5, random.Random(2)))
+    assert level["errors"] == 0 and level["p50_s"] >= 0.3
+    assert level["throughput_rps"] <= level["sent_rps"]
+    assert not is_saturated(level)
+
+
+def test_a_pipeline_behind_its_arrivals_is_saturated(monkeypatch):
+    monkeypatch.setattr(chat_flow, "ChatFlow", SerialChatFlow)
+    monkeypatch.setattr(SerialChatFlow, "lock", None)
+    level = asyncio.run(run_level(300, 0.5, 5, random.Random(3)))
+    assert level["errors"] == 0
+    assert level["throughput_rps"] < 0.6 * level["sent_rps"]
+    assert is_saturated(level)
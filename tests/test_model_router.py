@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from function_calling_usage import function_calling_usage
+from load_client import use_client_factories
+from model_router import ModelRouter, model_router
+
+SMALL = Config.small_model
+LARGE = Config.text_gen_funct_call_model
+SHORT = [{"role": "user", "content": "What is the capital of France?"}]
+
+
+def test_choose_step_uses_the_small_model_when_the_task_accepts_it():
+    assert ModelRouter(enabled=True, quality_floor=None).choose_step("draft", SHORT) == ("tool_routing", SMALL)
+
+
+def test_choose_step_goes_to_the_task_model_when_the_task_rejects_the_small_model():
+    router = ModelRouter(enabled=True, quality_floor=None)
+    assert router.choose_step("final_answer", SHORT) == ("final_answer", LARGE)
+    assert router.choose_step("draft", SHORT, quality_floor=7.0) == ("draft", LARGE)
+    long_prompt = [{"role": "user", "content": "word " * 3000}]
+    assert router.choose_step("draft", long_prompt) == ("draft", LARGE)
+
+
+def test_choose_step_falls_back_when_routing_is_off():
+    assert ModelRouter(enabled=False).choose_step("draft", SHORT)[1] == LARGE
+
+
+def test_graded_quality_overrides_the_prior():
+    router = ModelRouter(enabled=True, quality_floor=6.0, min_samples=2)
+    for _ in range(2):
+        router.record_quality("draft", SMALL, 3)
+    assert router.choose_step("draft", SHORT)[1] == LARGE
+
+
+@pytest.fixture
+def calls():
+    made = []
+
+    def create(**request):
+        made.append(request["model"])
+        message = SimpleNamespace(content=f"answer from {request['model']}", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    use_client_factories(lambda: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    yield made
+    use_client_factories()
+
+
+@pytest.mark.parametrize("task, model", [("draft", SMALL), ("final_answer", LARGE)])
+def test_a_plain_answer_takes_one_call(calls, monkeypatch, task, model):
+    monkeypatch.setattr(model_router, "enabled", True)
+    monkeypatch.setattr(model_router, "quality_floor", None)
+    routes = []
+    assert function_calling_usage("What is the capital of France?", task=task, routes=routes) == f"answer from {model}"
+    assert calls == [model]
+    assert routes == [(task, model)]
@@ -0,0 +1,150 @@
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limited_client
+from rate_limited_client import (AdaptiveConcurrency, CircuitBreaker, CircuitOpenError, LLMRateLimitError,
+                                 LLMRequestError, LLMServerError, RateBucket, RateLimiter, parse_duration)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Replaces the module's clock and sleep, so cooldowns and backoffs pass instantly.
+    now = SimpleNamespace(value=100.0, slept=[])
+
+    def sleep(seconds):
+        now.slept.append(seconds)
+        now.value += seconds
+
+    monkeypatch.setattr(rate_limited_client, "time", SimpleNamespace(monotonic=lambda: now.value, sleep=sleep))
+    return now
+
+
+@pytest.mark.parametrize("value, seconds", [("1", 1.0), ("7.66s", 7.66), ("2m59.56s", 179.56), ("120ms", 0.12),
+                                            (None, None), ("soon", None)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_concurrency_grows_additively_and_halves_once_per_overload_burst():
+    concurrency = AdaptiveConcurrency(initial=4, maximum=8)
+    for _ in range(4):
+        concurrency.on_success()
+    assert 4.9 < concurrency.limit < 5.0
+    epoch = concurrency.epoch
+    concurrency.on_overload(epoch)
+    concurrency.on_overload(epoch)  # a request started before the first decrease
+    assert 2.4 < concurrency.limit < 2.5
+    concurrency.on_overload(concurrency.epoch)
+    assert 1.2 < concurrency.limit < 1.25
+    for _ in range(3):
+        concurrency.on_overload(concurrency.epoch)
+    assert concurrency.limit == 1
+    for _ in range(200):
+        concurrency.on_success()
+    assert concurrency.limit == 8
+
+
+def test_concurrency_limits_requests_in_flight():
+    concurrency = AdaptiveConcurrency(initial=2, maximum=2)
+    concurrency.acquire()
+    concurrency.acquire()
+    assert concurrency.in_flight == 2 and not concurrency._has_room()
+    concurrency.release()
+    assert concurrency._has_room()
+
+
+def test_breaker_opens_fails_fast_then_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=10)
+    for _ in range(2):
+        breaker.before_request()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_request()
+    assert error.value.retry_after == pytest.approx(10)
+
+    clock.value += 10
+    breaker.before_request()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+    breaker.before_request()
+
+
+def test_failed_trial_reopens_and_stuck_trial_expires(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock.value += 10
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    clock.value += 10
+    breaker.before_request()  # this trial never reports back
+    clock.value += 10
+    breaker.before_request()
+    assert breaker.state == "half_open"
+
+
+def test_neutral_outcomes_do_not_count_as_failures():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=10)
+    breaker.record_failure()
+    breaker.record_neutral()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_bucket_throttles_once_the_server_reports_a_limit():
+    bucket = RateBucket()
+    assert bucket.reserve(5, now=0.0) == 0.0
+    bucket.observe(limit=60, remaining=1, reset_seconds=59, now=0.0)
+    assert bucket.rate == pytest.approx(1.0)
+    assert bucket.reserve(1, now=0.0) == 0.0
+    assert bucket.reserve(1, now=0.0) == pytest.approx(1.0)
+    # A later response cannot hand back capacity already reserved here.
+    bucket.observe(limit=60, remaining=30, reset_seconds=30, now=0.0)
+    assert bucket.tokens == -1
+
+
+def limiter(**kwargs):
+    return RateLimiter(max_retries=2, retry_base=0.5, retry_max=4, concurrency=AdaptiveConcurrency(initial=4, maximum=8),
+                       breaker=CircuitBreaker(failure_threshold=5, cooldown=10), **kwargs)
+
+
+def test_retries_halve_concurrency_and_succeed(clock):
+    rate_limiter = limiter()
+    responses = [LLMRateLimitError("slow down", 429, retry_after=2), LLMServerError("oops", 503), ("ok", {})]
+
+    def send(**request):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert rate_limiter.call(send, {"model": "m", "messages": []}) == "ok"
+    stats = rate_limiter.stats()
+    assert (stats["requests"], stats["retries"], stats["rate_limited"], stats["server_errors"], stats["succeeded"]) == (3, 2, 1, 1, 1)
+    assert clock.slept[0] >= 2  # never sooner than retry-after
+    assert stats["concurrency_limit"] == 2.5  # halved by the 429 only, then one success
+    assert stats["in_flight"] == 0 and stats["circuit"] == "closed"
+
+
+def test_rejected_requests_are_not_retried(clock):
+    rate_limiter = limiter()
+    calls = []
+
+    def send(**request):
+        calls.append(request)
+        raise LLMRequestError("bad request", 400)
+
+    with pytest.raises(LLMRequestError):
+        rate_limiter.call(send, {"model": "m", "messages": []})
+    assert len(calls) == 1 and rate_limiter.stats()["rejected"] == 1 and rate_limiter.stats()["in_flight"] == 0
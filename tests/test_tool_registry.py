@@ -0,0 +1,61 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from tool_registry import ToolRegistry
+
+
+def tool_call(call_id, name, **arguments):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+def slow_search(query):
+    time.sleep(0.3)
+    return f"results for {query}"
+
+
+def stuck_scrape(url, query=None):
+    time.sleep(1.0)
+    return "too late"
+
+
+@pytest.fixture
+def registry():
+    registry = ToolRegistry(max_workers=8, default_timeout=5)
+    registry.register("google_search", slow_search)
+    registry.register("scrape_website", stuck_scrape, timeout=0.2)
+    yield registry
+    registry._executor.shutdown(wait=False)
+
+
+def run(registry, calls, use_async):
+    if use_async:
+        return asyncio.run(registry.arun_tool_calls(calls))
+    return registry.run_tool_calls(calls)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_tool_calls_run_concurrently(registry, use_async):
+    calls = [tool_call(f"call_{i}", "google_search", query=f"q{i}") for i in range(3)]
+    start = time.perf_counter()
+    messages = run(registry, calls, use_async)
+    assert time.perf_counter() - start < 0.6  # about the slowest call, not the 0.9 s sum
+    assert [message["content"] for message in messages] == ["results for q0", "results for q1", "results for q2"]
+    assert [message["tool_call_id"] for message in messages] == ["call_0", "call_1", "call_2"]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_timeouts_and_bad_arguments_become_tool_messages(registry, use_async):
+    calls = [tool_call("call_0", "scrape_website", url="https://example.com"),
+             tool_call("call_1", "google_search", query="fast enough"),
+             tool_call("call_2", "google_search", limit=3)]
+    start = time.perf_counter()
+    messages = run(registry, calls, use_async)
+    assert time.perf_counter() - start < 0.6
+    assert [message["role"] for message in messages] == ["tool"] * 3
+    assert messages[0]["content"] == "Tool scrape_website timed out after 0.2 seconds"
+    assert messages[1]["content"] == "results for fast enough"
+    assert messages[2]["content"] == "Missing required arguments for google_search: query"
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import website_scraper
+from website_scraper import WebsiteScraper
+
+PAGE = "<html><body><p>" + "Plain page text in full sentences. " * 20 + "</p></body></html>"
+
+
+class DictCache:
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def get_entry(self, key):
+        return None
+
+    def set(self, key, value, **kwargs):
+        self.values[key] = value
+
+
+class Fetcher:
+    def __init__(self):
+        self.urls = []
+
+    def fetch(self, url, validators=None):
+        self.urls.append(url)
+        return SimpleNamespace(not_modified=False, ok=True, is_html=True, text=PAGE, status_code=200, validators=None)
+
+
+class Browser:
+    def __init__(self):
+        self.loads = 0
+
+    def load(self, url):
+        self.loads += 1
+        return PAGE
+
+
+class Pool:
+    def __init__(self):
+        self.browser = Browser()
+
+    def lease(self):
+        pool = self
+
+        class Lease:
+            def __enter__(self):
+                return pool.browser
+
+            def __exit__(self, *exc):
+                return False
+
+        return Lease()
+
+
+def test_a_cached_empty_page_is_a_hit():
+    fetcher = Fetcher()
+    scraper = WebsiteScraper(pool=Pool(), fetcher=fetcher, cache=DictCache({"scrape_chunks_https://example.com": []}))
+    assert scraper.scrape_chunks("https://example.com") == []
+    assert fetcher.urls == []
+
+
+def test_an_extraction_error_falls_back_to_the_browser(monkeypatch):
+    real_extract = website_scraper.extract_chunks
+    calls = []
+
+    def extract_once_failing(html):
+        calls.append(html)
+        if len(calls) == 1:
+            raise ValueError("parser gave up")
+        return real_extract(html)
+
+    monkeypatch.setattr(website_scraper, "extract_chunks", extract_once_failing)
+    pool = Pool()
+    scraper = WebsiteScraper(pool=pool, fetcher=Fetcher(), cache=DictCache())
+    assert "Plain page text" in scraper.scrape("https://example.com")
+    assert pool.browser.loads == 1 and len(calls) == 2
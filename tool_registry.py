@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config import Config
+from metrics import stage_metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+TOOLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools_functions.json")
+
+JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+
+class ToolArgumentError(ValueError):
+    pass
+
+
+class ToolRegistry:
+    def __init__(self, tools_path=TOOLS_PATH, max_workers=Config.TOOL_MAX_WORKERS,
+                 default_timeout=Config.TOOL_TIMEOUT_SECONDS):
+        with open(tools_path, "r") as f:
+            self.schemas = json.load(f)
+        self._parameters = {tool["function"]["name"]: tool["function"].get("parameters", {}) for tool in self.schemas}
+        self._handlers = {}
+        self._timeouts = {}
+        self.default_timeout = default_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+
+    def register(self, name, handler, timeout=None):
+        if name not in self._parameters:
+            raise KeyError(f"No schema for tool: {name}")
+        self._handlers[name] = handler
+        if timeout is not None:
+            self._timeouts[name] = timeout
+
+    def timeout_for(self, name):
+        return self._timeouts.get(name, self.default_timeout)
+
+    def validate(self, name, raw_arguments):
+        if name not in self._handlers:
+            raise ToolArgumentError(f"Unknown function: {name}")
+        try:
+            arguments = json.loads(raw_arguments or "{}")
+        except json.JSONDecodeError as e:
+            raise ToolArgumentError(f"Arguments for {name} are not valid JSON: {str(e)}")
+        if not isinstance(arguments, dict):
+            raise ToolArgumentError(f"Arguments for {name} must be a JSON object")
+
+        parameters = self._parameters[name]
+        properties = parameters.get("properties", {})
+        missing = [field for field in parameters.get("required", []) if field not in arguments]
+        if missing:
+            raise ToolArgumentError(f"Missing required arguments for {name}: {', '.join(missing)}")
+        for field, value in arguments.items():
+            expected = JSON_TYPES.get(properties.get(field, {}).get("type"))
+            if expected and (not isinstance(value, expected) or (expected is not bool and isinstance(value, bool))):
+                raise ToolArgumentError(f"Argument '{field}' for {name} must be of type {properties[field]['type']}")
+        # Drop anything the schema does not declare so handlers never see unexpected keyword arguments.
+        return {field: value for field, value in arguments.items() if field in properties}
+
+    def _invoke(self, name, arguments):
+        logging.info(f"Function called: {name}")
+        logging.info(f"Function arguments: {arguments}")
+        return self._handlers[name](**arguments)
+
+    @staticmethod
+    def _tool_message(tool_call, content):
+        return {"role": "tool", "tool_call_id": tool_call.id, "name": tool_call.function.name, "content": content}
+
+    def run_tool_calls(self, tool_calls):
+        with stage_metrics.measure("tool_dispatch"):
+            return self._run_tool_calls(tool_calls)
+
+    def _run_tool_calls(self, tool_calls):
+        pending = []
+        messages = [None] * len(tool_calls)
+        started = time.monotonic()
+        for index, tool_call in enumerate(tool_calls):
+            name = tool_call.function.name
+            try:
+                arguments = self.validate(name, tool_call.function.arguments)
+            except ToolArgumentError as e:
+                messages[index] = self._tool_message(tool_call, str(e))
+                continue
+            pending.append((index, tool_call, self._executor.submit(self._invoke, name, arguments)))
+
+        # All calls run at once; each one is only waited on until its own deadline.
+        for index, tool_call, future in pending:
+            name = tool_call.function.name
+            remaining = max(0.0, started + self.timeout_for(name) - time.monotonic())
+            try:
+                content = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                logging.error(f"Tool {name} timed out after {self.timeout_for(name)}s")
+                content = f"Tool {name} timed out after {self.timeout_for(name)} seconds"
+            except Exception as e:
+                logging.error(f"Error in tool {name}: {str(e)}")
+                content = f"Tool {name} failed: {str(e)}"
+            messages[index] = self._tool_message(tool_call, content)
+        return messages
+
+    async def arun_tool_calls(self, tool_calls):
+        async def run_one(tool_call):
+            name = tool_call.function.name
+            try:
+                arguments = self.validate(name, tool_call.function.arguments)
+            except ToolArgumentError as e:
+                return self._tool_message(tool_call, str(e))
+            loop = asyncio.get_running_loop()
+            try:
+                content = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, self._invoke, name, arguments),
+                    timeout=self.timeout_for(name)
+                )
+            except asyncio.TimeoutError:
+                logging.error(f"Tool {name} timed out after {self.timeout_for(name)}s")
+                content = f"Tool {name} timed out after {self.timeout_for(name)} seconds"
+            except Exception as e:
+                logging.error(f"Error in tool {name}: {str(e)}")
+                content = f"Tool {name} failed: {str(e)}"
+            return self._tool_message(tool_call, content)
+
+        with stage_metrics.measure("tool_dispatch"):
+            return list(await asyncio.gather(*(run_one(tool_call) for tool_call in tool_calls)))
+
+
+_autogen_handler = None
+_autogen_handler_lock = threading.Lock()
+
+def get_autogen_handler():
+    # autogen is slow to import and only needed for the code tools, so build the handler on first use.
+    global _autogen_handler
+    with _autogen_handler_lock:
+        if _autogen_handler is None:
+            from autogen_code_handler import AutogenCodeHandler
+            _autogen_handler = AutogenCodeHandler()
+        return _autogen_handler
+
+def google_search_tool(query):
+    from google_search_return_urls import google_search
+    search_results = google_search(query)
+    return f"Search results for '{query}': {search_results}"
+
+def scrape_website_tool(url, query=None):
+    from website_scraper import WebsiteScraper
+    scraper = WebsiteScraper()
+    content = scraper.scrape(url, query=query)
+    if content:
+        return f"Content from {url}: {content}"
+    else:
+        return f"Failed to scrape content from {url}"
+
+def analyze_and_improve_code_tool(code):
+    analysis = get_autogen_handler().analyze_and_improve_code(code)
+    return f"Code analysis and improvement suggestions:\n{analysis}"
+
+def test_code_tool(code):
+    # Code that runs cleanly needs no model, so autogen is only loaded to debug a failing run.
+    from code_sandbox import describe_run, get_code_sandbox
+    result = get_code_sandbox().run(code)
+    test_results = describe_run(result) if result["ok"] else get_autogen_handler().report(code, result)
+    return f"Code test results:\n{test_results}"
+
+def debug_code_tool(code, error_message):
+    debug_result = get_autogen_handler().debug_code(code, error_message)
+    return f"Code debugging results:\n{debug_result}"
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_tool_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            registry = ToolRegistry()
+            registry.register("google_search", google_search_tool)
+            registry.register("scrape_website", scrape_website_tool)
+            registry.register("analyze_and_improve_code", analyze_and_improve_code_tool, timeout=Config.CODE_TOOL_TIMEOUT_SECONDS)
+            registry.register("test_code", test_code_tool, timeout=Config.CODE_TOOL_TIMEOUT_SECONDS)
+            registry.register("debug_code", debug_code_tool, timeout=Config.CODE_TOOL_TIMEOUT_SECONDS)
+            _registry = registry
+        return _registry
@@ -1,42 +1,80 @@
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-from urllib.parse import urlparse
-import logging
-from caching import cache
-
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
-
-class WebsiteScraper:
-    def __init__(self):
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        self.driver = webdriver.Chrome(options=chrome_options)
-
-    def scrape(self, url):
-        cache_key = f"scrape_{url}"
-        cached_result = cache.get(cache_key)
-        if cached_result:
-            logging.info(f"Returning cached result for URL: {url}")
-            return cached_result
-
-        try:
-            self.driver.get(url)
-            WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            text_content = soup.get_text(separator=' ', strip=True)
-            
-            cache.set(cache_key, text_content)
-            return text_content
-        except Exception as e:
-            logging.error(f"Error scraping {url}: {str(e)}")
-            return None
-
-    def __del__(self):
-        self.driver.quit()
\ No newline at end of file
+import time
+from urllib.parse import urlparse
+import logging
+from caching import get_cache
+from browser_pool import get_browser_pool
+from config import Config
+from content_extractor import extract_chunks, render_chunks, select_chunks
+from http_fetcher import get_http_fetcher, needs_javascript
+from metrics import stage_metrics
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class WebsiteScraper:
+    def __init__(self, pool=None, fetcher=None, cache=None):
+        # Browsers are leased from a pool per scrape; the scraper itself owns no Chrome process.
+        self.pool = pool
+        self.fetcher = fetcher
+        self.cache = cache if cache is not None else get_cache()
+
+    def extract_chunks(self, page_source):
+        with stage_metrics.measure("extraction"):
+            return extract_chunks(page_source)
+
+    def fetch_over_http(self, url, cache_key, stale_entry):
+        # Returns the page's chunks, or None when the page has to be rendered in a browser.
+        import requests
+
+        validators = stale_entry["validators"] if stale_entry else None
+        try:
+            result = (self.fetcher or get_http_fetcher()).fetch(url, validators)
+        except requests.RequestException as e:
+            logging.warning(f"HTTP fetch failed for {url}, falling back to browser: {str(e)}")
+            return None
+
+        if result.not_modified and stale_entry:
+            self.cache.refresh(cache_key)
+            return stale_entry["value"]
+        if not result.ok or not result.is_html or needs_javascript(result.text):
+            logging.info(f"HTTP fetch of {url} not usable (status {result.status_code}), rendering in browser")
+            return None
+
+        try:
+            chunks = self.extract_chunks(result.text)
+        except Exception as e:
+            logging.warning(f"Could not extract {url} fetched over HTTP, falling back to browser: {str(e)}")
+            return None
+        self.cache.set(cache_key, chunks, validators=result.validators)
+        return chunks
+
+    def scrape(self, url, query=None, token_budget=Config.SCRAPE_TOKEN_BUDGET):
+        # The page's best content chunks that fit token_budget, in page order; with a query, the chunks most
+        # related to it. Returns None when the page could not be scraped.
+        with stage_metrics.measure("scraping"):
+            chunks = self.scrape_chunks(url)
+        if chunks is None:
+            return None
+        return render_chunks(select_chunks(chunks, token_budget, query))
+
+    def scrape_chunks(self, url):
+        # Extracted chunks are cached rather than page text, so a cache hit skips parsing as well as fetching.
+        cache_key = f"scrape_chunks_{url}"
+        cached_result = self.cache.get(cache_key)
+        if cached_result is not None:
+            logging.info(f"Returning cached result for URL: {url}")
+            return cached_result
+
+        chunks = self.fetch_over_http(url, cache_key, self.cache.get_entry(cache_key))
+        if chunks:
+            return chunks
+
+        try:
+            with (self.pool or get_browser_pool()).lease() as browser:
+                page_source = browser.load(url)
+            chunks = self.extract_chunks(page_source)
+
+            self.cache.set(cache_key, chunks)
+            return chunks
+        except Exception as e:
+            logging.error(f"Error scraping {url}: {str(e)}")
+            return None